@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# Compares the real-time factor (processing time / audio duration) of the
+# inference backends for several model sizes on the same audio.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import BACKENDS, create_backend, iter_audio_file
+from fake_audio import synthetic_speech
+
+SAMPLE_RATE = 16000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Real-time factor per backend and model size.")
+    parser.add_argument("--audio", help="WAV/FLAC file (default: 10 s of synthetic speech)")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--models", nargs="+", default=["tiny", "base", "small"])
+    parser.add_argument("--device", default="auto")
+    parser.add_argument("--compute-type", default="auto")
+    parser.add_argument("--cpu-threads", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.audio:
+        audio = np.concatenate(list(iter_audio_file(args.audio, SAMPLE_RATE)))
+    else:
+        audio = synthetic_speech(10.0)
+    duration = len(audio) / SAMPLE_RATE
+    results = []
+
+    print(f"{'backend':<20} {'model':<8} {'load s':>8} {'RTF':>8} {'text'}")
+    for backend_name in args.backends:
+        for model_name in args.models:
+            try:
+                start = time.perf_counter()
+                backend = create_backend(backend_name, model_name, args.device, args.compute_type, args.cpu_threads)
+                load_time = time.perf_counter() - start
+            except Exception as e:
+                print(f"{backend_name:<20} {model_name:<8} unavailable: {e}")
+                continue
+            options = dict(language="en", condition_on_previous_text=False)
+            backend.transcribe(audio, **options)
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                result = backend.transcribe(audio, **options)
+                timings.append(time.perf_counter() - start)
+            rtf = float(np.median(timings)) / duration
+            print(f"{backend_name:<20} {model_name:<8} {load_time:>8.1f} {rtf:>8.3f} {result['text'][:40]!r}")
+            results.append({
+                "backend": backend_name,
+                "model": model_name,
+                "device": backend.device,
+                "compute_type": backend.compute_type,
+                "load_seconds": load_time,
+                "rtf": rtf,
+                "timings": timings,
+            })
+            del backend
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"audio_seconds": duration, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
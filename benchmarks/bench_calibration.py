@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# Fixed gain and VAD thresholds versus the adaptive noise-floor calibration
+# in rooms of different loudness: how many segments (inference runs) and
+# seconds of audio reach the model, how many utterances are missed, and
+# what the calibration costs per chunk. The segmenter is fed offline, as
+# fast as it runs; the first seconds of every session are the warmup the
+# engine does not transcribe, which calibration uses to seed the noise
+# floor.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import VoxtarixEngine, NoiseFloorTracker, Segmenter, create_vad
+from fake_audio import SAMPLE_RATE, background_noise, synthetic_speech
+
+BLOCKSIZE = 1024
+
+# (speech level, noise level) of the raw signal before gain; a speech
+# level of 0 is a room nobody talks in
+SCENARIOS = {
+    "idle fan": (0.0, 0.005),
+    "quiet room": (0.3, 0.002),
+    "soft talker": (0.005, 0.0003),
+    "fan": (0.3, 0.005),
+    "open office": (0.3, 0.01),
+    "loud noise": (0.3, 0.03),
+}
+
+
+def session(speech_level, noise_level, seconds, warmup, seed):
+    # Utterances of 1-4 s at random pauses of 5-20 s, in continuous noise
+    rng = np.random.default_rng(seed)
+    length = int(seconds * SAMPLE_RATE)
+    audio = background_noise(seconds, level=noise_level, seed=seed)
+    utterances = []
+    position = int((warmup + 1.0) * SAMPLE_RATE)
+    while speech_level:
+        duration = rng.uniform(1.0, 4.0)
+        end = position + int(duration * SAMPLE_RATE)
+        if end >= length - 3 * SAMPLE_RATE:
+            break
+        audio[position:end] += synthetic_speech(duration, level=speech_level, seed=len(utterances))[:end - position]
+        utterances.append((position, end))
+        position = end + int(rng.uniform(5.0, 20.0) * SAMPLE_RATE)
+    return audio, utterances
+
+
+def run(audio, utterances, warmup, calibrate):
+    engine = VoxtarixEngine(language="en")
+    segments = []
+    vad = create_vad(engine)
+    calibration = NoiseFloorTracker(SAMPLE_RATE, vad.frame_size, engine.GAIN, engine.CALIBRATION_MARGIN,
+                                    engine.CALIBRATION_TARGET, engine.CALIBRATION_MIN_GAIN,
+                                    engine.CALIBRATION_MAX_GAIN, engine.CALIBRATION_WINDOW) if calibrate else None
+    segmenter = Segmenter(engine, segments.append, vad=vad, calibration=calibration)
+    gain = engine.GAIN
+    skip = int(warmup * SAMPLE_RATE)
+    elapsed = 0.0
+    for i in range(0, len(audio), BLOCKSIZE):
+        chunk = np.clip(audio[i:i + BLOCKSIZE] * gain, -1.0, 1.0).astype(np.float32)
+        if i < skip:
+            if calibration is not None:
+                calibration.observe(chunk)
+                calibration.apply(vad)
+                gain = calibration.gain
+            continue
+        start = time.perf_counter()
+        segmenter.feed(chunk)
+        elapsed += time.perf_counter() - start
+        if calibration is not None:
+            gain = calibration.gain
+    segmenter.flush()
+
+    # Segment positions count from the first sample fed
+    spans = [(skip + segment.position, skip + segment.position + len(segment.audio)) for segment in segments]
+    missed = sum(not any(start < end_ and start_ < end for start_, end_ in spans) for start, end in utterances)
+    # Segments without any of the utterances in them
+    noise = sum(not any(start < end_ and start_ < end for start_, end_ in utterances) for start, end in spans)
+    chunks = (len(audio) - skip) // BLOCKSIZE
+    return {
+        "runs": len(segments),
+        "seconds": sum(len(segment.audio) for segment in segments) / SAMPLE_RATE,
+        "missed": missed,
+        "noise": noise,
+        "feed_us": elapsed / chunks * 1e6,
+        "baseline": (segmenter.baseline.segments, segmenter.baseline.samples / SAMPLE_RATE) if calibrate else None,
+        "state": calibration.describe() if calibrate else "",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed versus calibrated gain and VAD thresholds.")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS),
+                        help="Rooms to simulate")
+    parser.add_argument("--seconds", type=float, default=600.0, help="Session length per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Warmup seconds at the start of a session")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the utterance timing")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the engine's log output")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    if not args.verbose:
+        sys.stdout = sys.stderr = open(os.devnull, "w")
+    print(f"{'scenario':<12} {'utts':>5} | {'fixed runs':>10} {'noise':>5} {'audio s':>8} {'missed':>6} "
+          f"{'feed us':>7} | {'calib runs':>10} {'noise':>5} {'audio s':>8} {'missed':>6} {'feed us':>7} | "
+          f"{'runs avoided':>12} {'s avoided':>9}  calibrated to", file=out, flush=True)
+    for name in args.scenarios:
+        audio, utterances = session(*SCENARIOS[name], args.seconds, args.warmup, args.seed)
+        fixed = run(audio, utterances, args.warmup, calibrate=False)
+        adaptive = run(audio, utterances, args.warmup, calibrate=True)
+        # What the engine reports: the baseline VAD runs next to the calibrated one
+        runs, seconds = adaptive["baseline"]
+        print(f"{name:<12} {len(utterances):>5} | {fixed['runs']:>10} {fixed['noise']:>5} {fixed['seconds']:>8.1f} "
+              f"{fixed['missed']:>6} {fixed['feed_us']:>7.1f} | {adaptive['runs']:>10} {adaptive['noise']:>5} "
+              f"{adaptive['seconds']:>8.1f} {adaptive['missed']:>6} {adaptive['feed_us']:>7.1f} | "
+              f"{runs - adaptive['runs']:>12} {seconds - adaptive['seconds']:>9.1f}  {adaptive['state']}",
+              file=out, flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# End-to-end benchmark of VoxtarixEngine without a microphone. A simulated
+# input stream plays WAV fixtures or synthetic speech/silence patterns on a
+# real-time clock; the harness reports end-of-speech -> text latency
+# percentiles, real-time factor, queue depths, peak RSS and CPU usage per
+# configuration and saves them as JSON for comparison across commits.
+#
+# Every configuration runs in its own process so peak RSS and CPU time are
+# not polluted by earlier runs.
+
+import argparse
+import json
+import os
+import platform
+import queue
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from voxtarix import (VoxtarixEngine, TranscriptionBackend, TextRecognizedEvent, InferenceQueueEvent,
+                      create_backend)
+from fake_audio import SAMPLE_RATE, FakeInputStream, synthetic_source, wav_source
+
+DEFAULT_PATTERN = "silence:1,speech:2,silence:3,speech:1,silence:3,speech:4,silence:3"
+
+# Simulated backends isolate the pipeline's own overhead from model cost;
+# rtf > 1 shows how the engine behaves when inference falls behind. The
+# "-nospec" runs wait for the full silence before decoding.
+DEFAULT_MATRIX = [
+    {"name": "simulated-rtf0.1", "backend": "simulated", "rtf": 0.1},
+    {"name": "simulated-rtf0.5", "backend": "simulated", "rtf": 0.5},
+    {"name": "simulated-rtf1.5", "backend": "simulated", "rtf": 1.5},
+    {"name": "simulated-rtf0.5-nospec", "backend": "simulated", "rtf": 0.5,
+     "engine": {"SPECULATION_ENABLED": False}},
+]
+
+
+class SimulatedBackend(TranscriptionBackend):
+    name = "simulated"
+
+    def __init__(self, rtf):
+        super().__init__("simulated", "cpu", "none")
+        self.rtf = rtf
+
+    def transcribe(self, audio, **options):
+        seconds = len(audio) / SAMPLE_RATE
+        # Busy-wait so CPU usage looks like real inference
+        deadline = time.perf_counter() + seconds * self.rtf
+        while time.perf_counter() < deadline:
+            pass
+        return {"text": f"utterance of {seconds:.2f} seconds", "segments": [], "language": "en"}
+
+
+class TimedBackend:
+    # Records audio and inference seconds of every call for the RTF
+    def __init__(self, backend):
+        self.backend = backend
+        self.calls = []
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def transcribe(self, audio, **options):
+        start = time.perf_counter()
+        result = self.backend.transcribe(audio, **options)
+        self.calls.append((len(audio) / SAMPLE_RATE, time.perf_counter() - start))
+        return result
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = np.asarray(values) * 1000.0
+    return {"p50": float(np.percentile(values, 50)), "p90": float(np.percentile(values, 90)),
+            "p99": float(np.percentile(values, 99)), "max": float(values.max()), "count": len(values)}
+
+
+def load_source(args):
+    if args.wav:
+        return wav_source(args.wav)
+    return synthetic_source(args.pattern, repeat=args.repeat)
+
+
+def run_configuration(config, args):
+    audio, speech_ends = load_source(args)
+    events = queue.Queue()
+    engine = VoxtarixEngine(language=config.get("language", "en"), event_queue=events)
+    engine.WARMUP_TIME = 0.0
+    engine.HISTORY_ENABLED = False
+    for key, value in config.get("engine", {}).items():
+        setattr(engine, key, value)
+
+    if config.get("backend", "simulated") == "simulated":
+        backend = SimulatedBackend(config.get("rtf", 0.3))
+    else:
+        backend = create_backend(config["backend"], config.get("model", "tiny"), config.get("device", "cpu"),
+                                 config.get("compute_type", "auto"), config.get("cpu_threads", 0))
+    engine.backend = TimedBackend(backend)
+
+    streams = []
+
+    def stream_factory(**kwargs):
+        streams.append(FakeInputStream(audio, speed=args.speed, **kwargs))
+        return streams[-1]
+
+    engine.stream_factory = stream_factory
+    cpu_start = os.times()
+    wall_start = time.perf_counter()
+    engine.start()
+    stream = streams[0]
+
+    # Play the source, then allow the endpoint and pending inference to finish
+    deadline = stream.time_of(len(audio)) + engine.SILENCE_DURATION + args.drain
+    recognized = []
+    depths = []
+    while time.perf_counter() < deadline:
+        try:
+            event = events.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        if isinstance(event, TextRecognizedEvent):
+            recognized.append(time.perf_counter())
+        elif isinstance(event, InferenceQueueEvent):
+            depths.append(event.depth)
+        if len(recognized) >= len(speech_ends) and engine.inference_queue.empty():
+            break
+
+    engine.should_terminate = True
+    stream.stop()
+    wall = time.perf_counter() - wall_start
+    cpu_end = os.times()
+
+    # Attribute every result to the latest speech end before it; speech
+    # stretches merged into one utterance count once.
+    latencies = []
+    ends = [stream.time_of(end) for end in speech_ends]
+    next_end = 0
+    for arrived in recognized:
+        matched = None
+        while next_end < len(ends) and ends[next_end] <= arrived:
+            matched = ends[next_end]
+            next_end += 1
+        if matched is not None:
+            latencies.append(arrived - matched)
+
+    speculation = {name: engine.metrics.get(f"speculation_{name}")
+                   for name in ("decodes", "hits", "wasted", "wasted_seconds", "cancelled")}
+    audio_seconds = sum(call[0] for call in engine.backend.calls)
+    inference_seconds = sum(call[1] for call in engine.backend.calls)
+    cpu_seconds = (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system)
+    return {
+        "name": config.get("name", "default"),
+        "config": config,
+        "speech_segments": len(speech_ends),
+        "recognized": len(recognized),
+        "dropped": engine.segments_dropped,
+        "latency_ms": percentiles(latencies),
+        "callback_lateness_ms": percentiles(stream.lateness),
+        "rtf": inference_seconds / audio_seconds if audio_seconds else None,
+        "queue_depth": {"max": max(depths, default=0), "mean": float(np.mean(depths)) if depths else 0.0},
+        "speculation": speculation,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "cpu_percent": 100.0 * cpu_seconds / wall,
+        "wall_seconds": wall,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_latency(result):
+    latency = result["latency_ms"]
+    if not latency:
+        return f"{'-':>8} {'-':>8} {'-':>8}"
+    return f"{latency['p50']:>8.0f} {latency['p90']:>8.0f} {latency['p99']:>8.0f}"
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {result["name"]: result for result in json.load(f)["results"]}
+    print(f"\nCompared with {previous_path}:")
+    for result in results:
+        old = previous.get(result["name"])
+        if not old or not old["latency_ms"] or not result["latency_ms"]:
+            continue
+        delta = result["latency_ms"]["p90"] - old["latency_ms"]["p90"]
+        rss = result["peak_rss_mb"] - old["peak_rss_mb"]
+        print(f"{result['name']:<24} p90 latency {delta:+8.0f} ms, peak RSS {rss:+7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end engine benchmark with a simulated microphone.")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help="Synthetic source, e.g. 'speech:2,silence:3'")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions of the synthetic pattern")
+    parser.add_argument("--wav", help="Play this WAV/FLAC fixture instead of the synthetic pattern")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed relative to real time")
+    parser.add_argument("--drain", type=float, default=10.0, help="Seconds to wait for pending results at the end")
+    parser.add_argument("--matrix", help="JSON file with a list of configurations")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the engine's log output")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        result = run_configuration(json.loads(args.run_one), args)
+        with open(args.result_file, "w") as f:
+            json.dump(result, f)
+        return
+
+    matrix = DEFAULT_MATRIX
+    if args.matrix:
+        with open(args.matrix) as f:
+            matrix = json.load(f)
+
+    passthrough = ["--pattern", args.pattern, "--repeat", str(args.repeat), "--speed", str(args.speed),
+                   "--drain", str(args.drain)] + (["--wav", args.wav] if args.wav else [])
+    results = []
+    print(f"{'configuration':<24} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'RTF':>6} {'maxQ':>5} "
+          f"{'RSS MB':>7} {'CPU %':>6} {'recog':>7} {'spec hit':>9} {'wasted s':>8}")
+    for config in matrix:
+        with tempfile.NamedTemporaryFile(suffix=".json") as result_file:
+            subprocess.run([sys.executable, os.path.abspath(__file__), *passthrough, "--run-one", json.dumps(config),
+                            "--result-file", result_file.name], check=True, stdout=subprocess.DEVNULL,
+                           stderr=None if args.verbose else subprocess.DEVNULL)
+            with open(result_file.name) as f:
+                result = json.load(f)
+        results.append(result)
+        rtf = f"{result['rtf']:.2f}" if result["rtf"] is not None else "-"
+        speculation = result["speculation"]
+        hits = f"{speculation['hits']}/{speculation['decodes']}" if speculation["decodes"] else "-"
+        print(f"{result['name']:<24} {format_latency(result)} {rtf:>6} {result['queue_depth']['max']:>5} "
+              f"{result['peak_rss_mb']:>7.1f} {result['cpu_percent']:>6.1f} "
+              f"{result['recognized']:>3}/{result['speech_segments']:<3} {hits:>9} "
+              f"{speculation['wasted_seconds']:>8.2f}")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
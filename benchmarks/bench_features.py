@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Log-mel work left at the endpoint: computing Whisper's features from
+# scratch once an utterance has ended (what whisper.transcribe() does,
+# including its 30 s of zero padding) versus finishing the features that
+# LogMelFeatures computed while the audio was captured. Also reports the
+# per-chunk cost of the incremental updates on the capture path and checks
+# that both give the same features.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import LogMelFeatures
+
+SAMPLE_RATE = 16000
+BLOCKSIZE = 1024
+N_FFT = 400
+HOP = 160
+PADDING = 30 * SAMPLE_RATE
+
+
+def mel_filterbank(n_mels):
+    # Whisper ships its filterbank with the package; use it when installed,
+    # otherwise a triangular bank of the same shape (the cost is identical)
+    try:
+        import whisper
+        return whisper.audio.mel_filters("cpu", n_mels).numpy()
+    except ImportError:
+        bins = N_FFT // 2 + 1
+        edges = np.linspace(0, bins - 1, n_mels + 2)
+        filters = np.zeros((n_mels, bins), dtype=np.float32)
+        for i in range(n_mels):
+            left, centre, right = edges[i:i + 3]
+            k = np.arange(bins)
+            filters[i] = np.clip(np.minimum((k - left) / (centre - left), (right - k) / (right - centre)), 0, None)
+        return filters
+
+
+def from_scratch(audio, filters):
+    # whisper.audio.log_mel_spectrogram(audio, padding=N_SAMPLES) in NumPy
+    signal = np.pad(np.concatenate((audio, np.zeros(PADDING, dtype=np.float32))), N_FFT // 2, mode="reflect")
+    windows = np.lib.stride_tricks.sliding_window_view(signal, N_FFT)[::HOP][:-1]
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(N_FFT) / N_FFT)).astype(np.float32)
+    spectrum = np.fft.rfft(windows * window, axis=1)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+    log_spec = np.log10(np.maximum(power @ filters.T, 1e-10))
+    log_spec = np.maximum(log_spec, log_spec.max() - 8.0)
+    return ((log_spec + 4.0) / 4.0).T[:, :len(audio) // HOP]
+
+
+def whisper_scratch(audio, n_mels):
+    try:
+        import whisper
+    except ImportError:
+        return None
+    start = time.perf_counter()
+    whisper.log_mel_spectrogram(audio, n_mels, padding=PADDING)
+    return time.perf_counter() - start
+
+
+def run(seconds, filters, trailing_silence, repeats):
+    rng = np.random.default_rng(int(seconds * 10))
+    pre_roll = int(0.3 * SAMPLE_RATE)
+    length = int(seconds * SAMPLE_RATE)
+    audio = np.concatenate((
+        rng.uniform(-0.01, 0.01, pre_roll), rng.uniform(-0.3, 0.3, length),
+        rng.uniform(-0.01, 0.01, int(trailing_silence * SAMPLE_RATE)),
+    )).astype(np.float32)
+    end = pre_roll + length
+
+    updates = []
+    finishes = []
+    for _ in range(repeats):
+        features = LogMelFeatures(filters, 60 * SAMPLE_RATE)
+        features.start(0)
+        for position in range(BLOCKSIZE, len(audio) + 1, BLOCKSIZE):
+            start = time.perf_counter()
+            features.update(audio[:position])
+            updates.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        incremental = features.finish(audio, 0, end)
+        finishes.append(time.perf_counter() - start)
+
+    scratch = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        reference = from_scratch(audio[:end], filters)
+        scratch.append(time.perf_counter() - start)
+    whisper_time = whisper_scratch(audio[:end], filters.shape[0])
+    return {
+        "scratch_ms": np.median(scratch) * 1000,
+        "whisper_ms": whisper_time * 1000 if whisper_time is not None else None,
+        "finish_ms": np.median(finishes) * 1000,
+        "update_us": np.median(updates) * 1e6,
+        "max_error": float(np.abs(incremental - reference).max()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log-mel work at the endpoint, from scratch versus incremental.")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[1, 3, 10, 25], help="Utterance lengths in seconds")
+    parser.add_argument("--n-mels", type=int, default=80, choices=(80, 128), help="Mel bands (128 for large-v3)")
+    parser.add_argument("--silence", type=float, default=2.0, help="Trailing silence before the endpoint fires")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per length")
+    args = parser.parse_args()
+
+    filters = mel_filterbank(args.n_mels)
+    print(f"{'length':>7} {'scratch ms':>11} {'whisper ms':>11} {'finish ms':>10} {'update us':>10} {'max err':>9}")
+    for seconds in args.lengths:
+        result = run(seconds, filters, args.silence, args.repeats)
+        whisper_ms = f"{result['whisper_ms']:.2f}" if result["whisper_ms"] is not None else "-"
+        print(f"{seconds:>7.1f} {result['scratch_ms']:>11.2f} {whisper_ms:>11} {result['finish_ms']:>10.3f} "
+              f"{result['update_us']:>10.1f} {result['max_error']:>9.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# Per-insert cost of the transcription history as it grows to 10k entries:
+# the SQLite HistoryStore insert and page lookups, and (when GTK is
+# available) the Wayland applet's history list, comparing the old
+# clear-and-rebuild update with the incremental one.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import types
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import HistoryStore
+
+CHECKPOINTS = (100, 1000, 5000, 10000)
+
+
+def sample_text(i):
+    return f"entry {i}: the quick brown fox jumps over the lazy dog number {i}"
+
+
+def bench_store(path, entries, memory_limit):
+    store = HistoryStore(path, memory_limit)
+    timings = np.empty(entries)
+    for i in range(entries):
+        start = time.perf_counter()
+        store.add(sample_text(i))
+        timings[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store.page(limit=50)
+    recent_page = time.perf_counter() - start
+    start = time.perf_counter()
+    store.page(before_id=entries // 2, limit=50)
+    old_page = time.perf_counter() - start
+    start = time.perf_counter()
+    hits = store.search("fox 4242")
+    search = time.perf_counter() - start
+    store.close()
+    return timings, recent_page, old_page, search, len(hits)
+
+
+def bench_gtk(entries, memory_limit, rebuild_limit):
+    import gi
+    gi.require_version("Gtk", "3.0")
+    from gi.repository import Gtk
+    if not Gtk.init_check()[0]:
+        return None
+    import voxtarix_applet_wayland as applet_module
+
+    def make_applet():
+        applet = applet_module.VoxtarixWaylandApplet.__new__(applet_module.VoxtarixWaylandApplet)
+        applet.engine = types.SimpleNamespace(HISTORY_MEMORY_LIMIT=memory_limit, history=None)
+        applet.scrolled_window = Gtk.ScrolledWindow()
+        applet.history_listbox = Gtk.ListBox()
+        applet.scrolled_window.add(applet.history_listbox)
+        applet.history_rows = applet_module.collections.deque()
+        applet.oldest_history_id = None
+        applet.history_exhausted = False
+        return applet
+
+    def rebuild(applet, history, text):
+        # The previous add_to_history: every widget is destroyed and recreated
+        history.insert(0, text)
+        for child in applet.history_listbox.get_children():
+            applet.history_listbox.remove(child)
+        for item_text in history:
+            applet.create_history_item(item_text)
+
+    def run(update, count):
+        timings = np.full(entries, np.nan)
+        for i in range(count):
+            start = time.perf_counter()
+            update(sample_text(i))
+            while Gtk.events_pending():
+                Gtk.main_iteration()
+            timings[i] = time.perf_counter() - start
+        return timings
+
+    incremental = make_applet()
+    rebuilt = make_applet()
+    history = []
+    incremental_timings = run(lambda text: incremental.add_to_history(text, None), entries)
+    # The rebuild is quadratic in the history length, so it is cut short
+    rebuild_timings = run(lambda text: rebuild(rebuilt, history, text), min(entries, rebuild_limit))
+    return incremental_timings, rebuild_timings
+
+
+def report(name, timings, checkpoints):
+    window = 50
+    cells = []
+    for n in checkpoints:
+        values = timings[max(0, n - window):n]
+        values = values[~np.isnan(values)]
+        cells.append(f"{np.median(values) * 1e6:>10.1f}" if len(values) else f"{'-':>10}")
+    print(f"{name:<28}" + "".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-insert cost of the transcription history.")
+    parser.add_argument("-n", "--entries", type=int, default=10000, help="Entries to insert")
+    parser.add_argument("--memory-limit", type=int, default=200, help="In-memory entries / rows kept")
+    parser.add_argument("--rebuild-limit", type=int, default=2000,
+                        help="Stop the rebuild-all comparison after this many entries")
+    parser.add_argument("--no-gtk", action="store_true", help="Skip the GTK list benchmark")
+    args = parser.parse_args()
+
+    checkpoints = [n for n in CHECKPOINTS if n <= args.entries] or [args.entries]
+    print(f"median us per insert around entry n (memory limit {args.memory_limit})")
+    print(f"{'':<28}" + "".join(f"{'n=' + str(n):>10}" for n in checkpoints))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings, recent_page, old_page, search, hits = bench_store(
+            os.path.join(tmp, "history.db"), args.entries, args.memory_limit
+        )
+    report("HistoryStore.add", timings, checkpoints)
+
+    if not args.no_gtk:
+        try:
+            results = bench_gtk(args.entries, args.memory_limit, args.rebuild_limit)
+        except (ImportError, ValueError) as e:
+            results = None
+            print(f"GTK unavailable ({e}), skipping the UI benchmark", file=sys.stderr)
+        if results:
+            incremental, rebuilt = results
+            report("UI incremental row", incremental, checkpoints)
+            report("UI rebuild all rows", rebuilt, checkpoints)
+
+    print(f"\npage of 50, newest: {recent_page * 1e6:.0f} us; "
+          f"from the middle: {old_page * 1e6:.0f} us; "
+          f"full-text search: {search * 1e6:.0f} us ({hits} hits)")
+
+
+if __name__ == "__main__":
+    main()
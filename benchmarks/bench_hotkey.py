@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# Always-on capture versus push-to-talk in a room with coughs, keyboard
+# clatter and a colleague talking in the background: how many inference
+# runs and seconds of audio reach the model, and how long after the end of
+# each dictated utterance its text arrives. The hotkey is held from shortly
+# before each utterance until shortly after it, like a person would.
+# Playback runs faster than real time (--speed); latencies are reported in
+# seconds of audio.
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import VoxtarixEngine, TranscriptionBackend, TextRecognizedEvent
+from fake_audio import SAMPLE_RATE, FakeInputStream, background_noise, synthetic_speech
+
+
+class SimulatedBackend(TranscriptionBackend):
+    name = "simulated"
+
+    def __init__(self, rtf, speed):
+        super().__init__("simulated", "cpu", "none")
+        self.rtf = rtf
+        self.speed = speed
+        self.lengths = []
+
+    def transcribe(self, audio, **options):
+        seconds = len(audio) / SAMPLE_RATE
+        self.lengths.append(seconds)
+        time.sleep(seconds * self.rtf / self.speed)
+        return {"text": "hello", "segments": [], "language": "en"}
+
+
+def session(seconds, seed):
+    # Dictated utterances of 2-4 s every 8-15 s; distractors in between
+    rng = np.random.default_rng(seed)
+    audio = background_noise(seconds, level=0.002, seed=seed)
+    utterances = []
+    distractors = 0
+    position = 2 * SAMPLE_RATE
+    while position < len(audio) - 8 * SAMPLE_RATE:
+        duration = rng.uniform(2.0, 4.0)
+        end = position + int(duration * SAMPLE_RATE)
+        audio[position:end] += synthetic_speech(duration, seed=len(utterances))[:end - position]
+        utterances.append((position, end))
+        gap_end = end + int(rng.uniform(8.0, 15.0) * SAMPLE_RATE)
+        # One distractor in the middle of the pause
+        start = (end + gap_end) // 2
+        kind = distractors % 3
+        if kind == 0:
+            # Cough: a loud burst of noise
+            length = int(0.4 * SAMPLE_RATE)
+            audio[start:start + length] += (rng.normal(0, 0.2, length) * np.hanning(length)).astype(np.float32)
+        elif kind == 1:
+            # Keyboard: clicks for two seconds
+            for click in start + np.sort(rng.integers(0, 2 * SAMPLE_RATE, 20)):
+                audio[click:click + 80] += rng.normal(0, 0.3, 80).astype(np.float32)
+        else:
+            # A colleague two desks away
+            voice = synthetic_speech(2.5, level=0.1, seed=1000 + distractors)
+            audio[start:start + len(voice)] += voice[:len(audio) - start]
+        distractors += 1
+        position = gap_end
+    return np.clip(audio, -1.0, 1.0), utterances, distractors
+
+
+def press_keys(engine, stream, utterances, stop, lead, hold):
+    for start, end in utterances:
+        for position, gate_open in ((start - int(lead * SAMPLE_RATE), True), (end + int(hold * SAMPLE_RATE), False)):
+            delay = stream.time_of(position) - time.perf_counter()
+            if stop.wait(max(0.0, delay)):
+                return
+            engine.set_gate(gate_open)
+
+
+def run(audio, utterances, push_to_talk, args):
+    events = queue.Queue()
+    engine = VoxtarixEngine(language="en", event_queue=events)
+    engine.WARMUP_TIME = 0.0
+    engine.HISTORY_ENABLED = False
+    engine.SPECULATION_ENABLED = False
+    engine.backend = SimulatedBackend(args.rtf, args.speed)
+    streams = []
+
+    def stream_factory(**kwargs):
+        streams.append(FakeInputStream(audio, speed=args.speed, **kwargs))
+        return streams[-1]
+
+    engine.stream_factory = stream_factory
+    # What start_hotkey() does once the pynput listener runs
+    for source in engine.sources:
+        source.gate_open = not push_to_talk
+    engine.start()
+    stream = streams[0]
+    stop = threading.Event()
+    if push_to_talk:
+        threading.Thread(target=press_keys, args=(engine, stream, utterances, stop, args.lead, args.hold),
+                         daemon=True).start()
+
+    arrivals = []
+    deadline = stream.time_of(len(audio)) + args.drain / args.speed
+    while time.perf_counter() < deadline:
+        try:
+            event = events.get(timeout=0.02)
+        except queue.Empty:
+            continue
+        if isinstance(event, TextRecognizedEvent):
+            arrivals.append(time.perf_counter())
+    stop.set()
+    engine.should_terminate = True
+    engine.stop_streams()
+
+    # The first text after the end of each utterance and before the next one
+    latencies = []
+    ends = [stream.time_of(end) for _, end in utterances] + [float("inf")]
+    for end, next_end in zip(ends, ends[1:]):
+        arrived = [arrival for arrival in arrivals if end <= arrival < next_end]
+        if arrived:
+            latencies.append((arrived[0] - end) * args.speed)
+    return {
+        "runs": len(engine.backend.lengths),
+        "seconds": sum(engine.backend.lengths),
+        "recognized": len(latencies),
+        "latency_p50": np.median(latencies) if latencies else float("nan"),
+        "latency_max": max(latencies, default=float("nan")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Always-on capture versus push-to-talk.")
+    parser.add_argument("--seconds", type=float, default=120.0, help="Session length")
+    parser.add_argument("--lead", type=float, default=0.15, help="Seconds the key goes down before speech")
+    parser.add_argument("--hold", type=float, default=0.2, help="Seconds the key stays down after speech")
+    parser.add_argument("--rtf", type=float, default=0.2, help="Simulated real-time factor")
+    parser.add_argument("--speed", type=float, default=4.0, help="Playback speed relative to real time")
+    parser.add_argument("--drain", type=float, default=5.0, help="Audio seconds to wait for results at the end")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the session")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the engine's log output")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    if not args.verbose:
+        sys.stdout = sys.stderr = open(os.devnull, "w")
+    audio, utterances, distractors = session(args.seconds, args.seed)
+    print(f"{len(utterances)} dictated utterances, {distractors} distractors\n", file=out)
+    print(f"{'capture':<14} {'runs':>5} {'audio s':>8} {'recog':>6} {'text p50 s':>10} {'max s':>6}", file=out, flush=True)
+    for push_to_talk in (False, True):
+        result = run(audio, utterances, push_to_talk, args)
+        print(f"{'push-to-talk' if push_to_talk else 'always on':<14} {result['runs']:>5} {result['seconds']:>8.1f} "
+              f"{result['recognized']:>3}/{len(utterances):<2} {result['latency_p50']:>10.2f} "
+              f"{result['latency_max']:>6.2f}", file=out, flush=True)
+
+
+if __name__ == "__main__":
+    main()
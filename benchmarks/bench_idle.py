@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# Steady-state cost of the engine while nobody speaks: CPU, wakeups
+# (context switches) and resident memory while listening to silence, while
+# muted, and once the idle policy has unloaded the model, followed by the
+# time it takes to bring the model back on the next speech onset. Muting
+# used to leave capture and segmentation running, so the "listening" row is
+# also what "muted" cost before. The model is simulated by a backend that
+# holds --model-mb of weights and takes --load-seconds to load.
+
+import argparse
+import os
+import queue
+import resource
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import VoxtarixEngine, TranscriptionBackend, TextRecognizedEvent, process_rss
+from fake_audio import SAMPLE_RATE, FakeInputStream, synthetic_source
+
+
+class SimulatedBackend(TranscriptionBackend):
+    name = "simulated"
+
+    def __init__(self, model_mb, rtf):
+        super().__init__("simulated", "cpu", "none")
+        # Touch every page so the weights are resident
+        self.weights = np.ones(int(model_mb * 2 ** 20) // 4, dtype=np.float32)
+        self.rtf = rtf
+
+    def transcribe(self, audio, **options):
+        time.sleep(len(audio) / SAMPLE_RATE * self.rtf)
+        return {"text": "hello", "segments": [], "language": "en"}
+
+
+def measure(seconds):
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    time.sleep(seconds)
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    elapsed = time.perf_counter() - start
+    cpu = after.ru_utime + after.ru_stime - usage.ru_utime - usage.ru_stime
+    switches = after.ru_nvcsw + after.ru_nivcsw - usage.ru_nvcsw - usage.ru_nivcsw
+    return {"cpu": 100 * cpu / elapsed, "switches": switches / elapsed, "rss": process_rss() / 2 ** 20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine cost while idle, muted and with the model unloaded.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Measured seconds per phase")
+    parser.add_argument("--model-mb", type=float, default=300.0, help="Size of the simulated model")
+    parser.add_argument("--load-seconds", type=float, default=2.0, help="Load time of the simulated model")
+    parser.add_argument("--rtf", type=float, default=0.2, help="Simulated real-time factor")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the engine's log output")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    if not args.verbose:
+        sys.stdout = sys.stderr = open(os.devnull, "w")
+
+    # Silence for the listening and parked phases, then one utterance; the
+    # stream does not advance while muted
+    idle_seconds = args.seconds * 2 + 5.0
+    audio, _ = synthetic_source(f"silence:{idle_seconds},speech:2,silence:5")
+
+    events = queue.Queue()
+    engine = VoxtarixEngine(language="en", event_queue=events)
+    engine.WARMUP_TIME = 0.0
+    engine.HISTORY_ENABLED = False
+    engine.IDLE_POLICY = "unload"
+    engine.IDLE_MINUTES = 1e6
+
+    def load_model():
+        time.sleep(args.load_seconds)
+        engine.backend = SimulatedBackend(args.model_mb, args.rtf)
+        engine.model_ready.set()
+        loaded.append(time.perf_counter())
+
+    loaded = []
+    engine.load_model = load_model
+    engine.backend = SimulatedBackend(args.model_mb, args.rtf)
+    engine.model_ready.set()
+    onsets = []
+    note_activity = engine.note_activity
+
+    def record_onset():
+        onsets.append(time.perf_counter())
+        note_activity()
+
+    engine.note_activity = record_onset
+    streams = []
+
+    def stream_factory(**kwargs):
+        streams.append(FakeInputStream(audio, **kwargs))
+        return streams[-1]
+
+    engine.stream_factory = stream_factory
+    engine.start()
+    time.sleep(1.0)
+
+    phases = [("listening", measure(args.seconds))]
+    engine.muted = True
+    time.sleep(1.0)
+    phases.append(("muted", measure(args.seconds)))
+    engine.muted = False
+    # Park on the next idle check of the inference thread
+    engine.IDLE_MINUTES = 0.0
+    while engine.model_parked is None:
+        time.sleep(0.1)
+    engine.IDLE_MINUTES = 1e6
+    phases.append(("model unloaded", measure(args.seconds)))
+
+    print(f"{'phase':<16} {'cpu %':>6} {'wakeups/s':>10} {'rss MB':>8}", file=out)
+    for name, result in phases:
+        print(f"{name:<16} {result['cpu']:>6.2f} {result['switches']:>10.1f} {result['rss']:>8.0f}", file=out)
+
+    onsets.clear()
+    speech_end = None
+    deadline = time.perf_counter() + 2 * idle_seconds + 30.0
+    while time.perf_counter() < deadline:
+        try:
+            event = events.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if isinstance(event, TextRecognizedEvent):
+            speech_end = time.perf_counter()
+            break
+    engine.should_terminate = True
+    engine.listening.set()
+    engine.stop_streams()
+    if not onsets or speech_end is None:
+        print("\nno transcript after the model was unloaded", file=out)
+        return
+    # The endpoint fires SILENCE_DURATION after the utterance; a reload that
+    # finishes before it costs the transcript nothing
+    endpoint = 2.0 + engine.SILENCE_DURATION
+    print(f"\nreload on speech onset: model ready {loaded[-1] - onsets[0]:.2f}s, text {speech_end - onsets[0]:.2f}s "
+          f"after the onset (endpoint at {endpoint:.2f}s)", file=out)
+
+
+if __name__ == "__main__":
+    main()
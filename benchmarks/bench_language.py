@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# Decode time per utterance with Whisper's language identification (what
+# every utterance paid before the language was kept) versus decoding with
+# the language given. Utterances are decoded the way the engine does it,
+# with incremental log-mel features where the backend takes them; both
+# variants alternate so drifting clocks and caches affect them equally.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import LogMelFeatures, create_backend, iter_audio_file
+from fake_audio import SAMPLE_RATE, synthetic_speech
+
+
+def load_utterances(args):
+    if args.wav:
+        return [(os.path.basename(path), np.concatenate(list(iter_audio_file(path, SAMPLE_RATE))))
+                for path in args.wav]
+    return [(f"synthetic {seconds:g}s", synthetic_speech(seconds, seed=i)) for i, seconds in enumerate(args.lengths)]
+
+
+def features_for(backend, audio):
+    if not backend.supports_features:
+        return {}
+    features = LogMelFeatures(backend.mel_filters, len(audio))
+    features.start(0)
+    features.update(audio)
+    return {"features": features.finish(audio, 0, len(audio))}
+
+
+def timed(backend, audio, language):
+    options = features_for(backend, audio)
+    start = time.perf_counter()
+    result = backend.transcribe(audio, language=language, condition_on_previous_text=False, **options)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode time with and without language identification.")
+    parser.add_argument("--backend", default="auto", help="auto, openai-whisper, faster-whisper or whisper-quantized")
+    parser.add_argument("--model", default="tiny", help="Whisper model size")
+    parser.add_argument("--device", default="auto", help="auto, cuda or cpu")
+    parser.add_argument("--wav", nargs="+", help="Speech recordings, one utterance each")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[1, 2, 4, 8],
+                        help="Synthetic utterance lengths in seconds, without --wav")
+    parser.add_argument("--language", help="Language to decode with; default: the detected one")
+    parser.add_argument("--repeats", type=int, default=5, help="Decodes per utterance and variant")
+    args = parser.parse_args()
+
+    backend = create_backend(args.backend, args.model, args.device)
+    utterances = load_utterances(args)
+    # Warm up kernels and caches
+    timed(backend, utterances[0][1], None)
+
+    print(f"{'utterance':<24} {'language':>8} {'prob':>5} {'detect ms':>10} {'kept ms':>8} {'saved ms':>9} "
+          f"{'saved %':>8}")
+    savings = []
+    for name, audio in utterances:
+        _, result = timed(backend, audio, None)
+        language = args.language or result.get("language")
+        probability = result.get("language_probability")
+        detect, kept = [], []
+        for _ in range(args.repeats):
+            detect.append(timed(backend, audio, None)[0])
+            kept.append(timed(backend, audio, language)[0])
+        detect_ms, kept_ms = np.median(detect) * 1000, np.median(kept) * 1000
+        savings.append(detect_ms - kept_ms)
+        print(f"{name:<24} {language or '-':>8} {'-' if probability is None else f'{probability:.2f}':>5} "
+              f"{detect_ms:>10.1f} {kept_ms:>8.1f} {detect_ms - kept_ms:>9.1f} "
+              f"{100 * (detect_ms - kept_ms) / detect_ms:>7.1f}%")
+    print(f"\n{backend.describe()}: {np.mean(savings):.1f} ms saved per utterance on average")
+
+
+if __name__ == "__main__":
+    main()
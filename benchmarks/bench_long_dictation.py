@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# Continuous dictation without a pause long enough to end the utterance:
+# how long until the first text arrives, how long after the speaker stops
+# the rest arrives, and how much memory the segmentation holds, with
+# forced cuts at max_segment and without them (max_segment = 0).
+# Playback runs faster than real time (--speed) so that minutes of speech
+# take seconds; latencies are reported in seconds of audio.
+
+import argparse
+import os
+import queue
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import VoxtarixEngine, TranscriptionBackend, TextRecognizedEvent
+from fake_audio import SAMPLE_RATE, FakeInputStream, synthetic_source
+
+
+class SimulatedBackend(TranscriptionBackend):
+    name = "simulated"
+
+    def __init__(self, rtf, speed):
+        super().__init__("simulated", "cpu", "none")
+        self.rtf = rtf
+        self.speed = speed
+        self.lengths = []
+
+    def transcribe(self, audio, **options):
+        seconds = len(audio) / SAMPLE_RATE
+        self.lengths.append(seconds)
+        time.sleep(seconds * self.rtf / self.speed)
+        return {"text": f"utterance of {seconds:.2f} seconds", "segments": [], "language": "en"}
+
+
+def held_bytes(engine):
+    # Audio and feature buffers of the segmenters
+    total = 0
+    for source in engine.sources:
+        segmenter = source.segmenter
+        if segmenter is None:
+            continue
+        total += segmenter.buffer.data.nbytes
+        if segmenter.features is not None:
+            total += segmenter.features.frames.nbytes
+    return total
+
+
+def run(seconds, max_segment, args):
+    audio, speech_ends = synthetic_source(f"silence:1,speech:{seconds},silence:3")
+    events = queue.Queue()
+    engine = VoxtarixEngine(language="en", event_queue=events)
+    engine.WARMUP_TIME = 0.0
+    engine.HISTORY_ENABLED = False
+    engine.SPECULATION_ENABLED = False
+    engine.MAX_SEGMENT = max_segment
+    engine.SEGMENT_OVERLAP = args.overlap
+    # Room for the whole dictation, as the buffer would grow to it anyway
+    engine.UTTERANCE_CAPACITY = 10.0
+    engine.backend = SimulatedBackend(args.rtf, args.speed)
+
+    streams = []
+
+    def stream_factory(**kwargs):
+        streams.append(FakeInputStream(audio, speed=args.speed, **kwargs))
+        return streams[-1]
+
+    engine.stream_factory = stream_factory
+    engine.start()
+    stream = streams[0]
+
+    speech_start = stream.time_of(SAMPLE_RATE)
+    speech_end = stream.time_of(speech_ends[-1])
+    deadline = stream.time_of(len(audio)) + (engine.SILENCE_DURATION + args.drain) / args.speed
+    arrivals = []
+    peak = 0
+    while time.perf_counter() < deadline:
+        peak = max(peak, held_bytes(engine))
+        try:
+            event = events.get(timeout=0.02)
+        except queue.Empty:
+            continue
+        if isinstance(event, TextRecognizedEvent):
+            arrivals.append(time.perf_counter())
+        if arrivals and arrivals[-1] > speech_end and engine.inference_queue.empty():
+            break
+    engine.should_terminate = True
+    engine.stop_streams()
+
+    # Wall time on the sped-up clock back to seconds of audio
+    to_audio = args.speed
+    return {
+        "segments": len(engine.backend.lengths),
+        "longest": max(engine.backend.lengths, default=0.0),
+        "first_text": (arrivals[0] - speech_start) * to_audio if arrivals else None,
+        "last_text": (arrivals[-1] - speech_end) * to_audio if arrivals else None,
+        "peak_mb": peak / 2 ** 20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continuous dictation with and without forced cuts.")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[60, 180, 600],
+                        help="Seconds of uninterrupted speech")
+    parser.add_argument("--max-segment", type=float, default=28.0, help="Forced cut length in seconds")
+    parser.add_argument("--overlap", type=float, default=1.0, help="Overlap of consecutive cuts in seconds")
+    parser.add_argument("--rtf", type=float, default=0.2, help="Simulated real-time factor")
+    parser.add_argument("--speed", type=float, default=8.0, help="Playback speed relative to real time")
+    parser.add_argument("--drain", type=float, default=30.0, help="Audio seconds to wait for results at the end")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the engine's log output")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    if not args.verbose:
+        sys.stdout = sys.stderr = open(os.devnull, "w")
+    print(f"{'speech s':>8} {'max seg':>8} {'segments':>8} {'longest s':>9} {'first text s':>12} "
+          f"{'after end s':>11} {'buffers MB':>10}", file=out, flush=True)
+    for seconds in args.lengths:
+        for max_segment in (0.0, args.max_segment):
+            result = run(seconds, max_segment, args)
+            first = f"{result['first_text']:.1f}" if result["first_text"] is not None else "-"
+            last = f"{result['last_text']:.1f}" if result["last_text"] is not None else "-"
+            print(f"{seconds:>8.0f} {max_segment or '-':>8} {result['segments']:>8} {result['longest']:>9.1f} "
+                  f"{first:>12} {last:>11} {result['peak_mb']:>10.1f}", file=out, flush=True)
+
+
+if __name__ == "__main__":
+    main()
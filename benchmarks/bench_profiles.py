@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# The latency/accuracy tradeoff of the decoding profiles in settings.conf:
+# decode time per utterance with each profile, decoded the way the engine
+# does it, and how far each profile's text is from the reference profile's
+# (word error rate against it, or against --text when the real transcripts
+# are known). Profiles alternate per repeat so drifting clocks and caches
+# affect them equally.
+
+import argparse
+import configparser
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import DecodingProfile, LogMelFeatures, create_backend, iter_audio_file, normalize_word
+from fake_audio import SAMPLE_RATE, synthetic_speech
+
+
+def load_profiles(path):
+    config = configparser.ConfigParser()
+    config.read(path)
+    return {section.split(".", 1)[1]: DecodingProfile.from_section(section.split(".", 1)[1], config[section])
+            for section in config.sections() if section.startswith("profile.")}
+
+
+def load_utterances(args):
+    if args.wav:
+        return [(os.path.basename(path), np.concatenate(list(iter_audio_file(path, SAMPLE_RATE))))
+                for path in args.wav]
+    return [(f"synthetic {seconds:g}s", synthetic_speech(seconds, seed=i)) for i, seconds in enumerate(args.lengths)]
+
+
+def features_for(backend, audio):
+    if not backend.supports_features:
+        return {}
+    features = LogMelFeatures(backend.mel_filters, len(audio))
+    features.start(0)
+    features.update(audio)
+    return {"features": features.finish(audio, 0, len(audio))}
+
+
+def timed(backend, audio, profile, language):
+    options = dict(features_for(backend, audio), **profile.options())
+    start = time.perf_counter()
+    result = backend.transcribe(audio, language=language, condition_on_previous_text=False, **options)
+    return time.perf_counter() - start, result["text"]
+
+
+def word_error_rate(reference, hypothesis):
+    reference = [normalize_word(word) for word in reference.split()]
+    hypothesis = [normalize_word(word) for word in hypothesis.split()]
+    if not reference:
+        return float(bool(hypothesis))
+    distances = list(range(len(hypothesis) + 1))
+    for i, word in enumerate(reference, 1):
+        previous, distances[0] = distances[0], i
+        for j, other in enumerate(hypothesis, 1):
+            substitution = previous + (word != other)
+            previous, distances[j] = distances[j], min(distances[j] + 1, distances[j - 1] + 1, substitution)
+    return distances[-1] / len(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode time and accuracy of the decoding profiles.")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                         "settings.conf"), help="settings.conf with the profiles")
+    parser.add_argument("--profiles", nargs="+", help="Profiles to compare (default: all)")
+    parser.add_argument("--reference", help="Profile whose text the others are compared with (default: the last)")
+    parser.add_argument("--backend", default="auto", help="auto, openai-whisper, faster-whisper or whisper-quantized")
+    parser.add_argument("--model", default="tiny", help="Whisper model size")
+    parser.add_argument("--device", default="auto", help="auto, cuda or cpu")
+    parser.add_argument("--wav", nargs="+", help="Speech recordings, one utterance each")
+    parser.add_argument("--text", nargs="+", help="Transcripts of the --wav recordings, in the same order")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[2, 5, 10],
+                        help="Synthetic utterance lengths in seconds, without --wav")
+    parser.add_argument("--language", default="en", help="Language to decode with")
+    parser.add_argument("--repeats", type=int, default=3, help="Decodes per utterance and profile")
+    args = parser.parse_args()
+
+    profiles = load_profiles(args.config)
+    names = args.profiles or list(profiles)
+    reference = args.reference or names[-1]
+    backend = create_backend(args.backend, args.model, args.device)
+    utterances = load_utterances(args)
+    # Warm up kernels and caches
+    timed(backend, utterances[0][1], profiles[names[0]], args.language)
+
+    seconds = {name: [] for name in names}
+    texts = {name: [] for name in names}
+    audio_seconds = sum(len(audio) for _, audio in utterances) / SAMPLE_RATE
+    for _, audio in utterances:
+        times = {name: [] for name in names}
+        decoded = {}
+        for _ in range(args.repeats):
+            for name in names:
+                elapsed, decoded[name] = timed(backend, audio, profiles[name], args.language)
+                times[name].append(elapsed)
+        for name in names:
+            seconds[name].append(np.median(times[name]))
+            texts[name].append(decoded[name])
+
+    against = "transcripts" if args.text else f"'{reference}'"
+    print(f"{backend.describe()}, {len(utterances)} utterances, {audio_seconds:.1f}s of audio\n")
+    print(f"{'profile':<12} {'ms/utt':>8} {'RTF':>6} {'vs ' + reference:>12} {'WER vs ' + against:>20}  settings")
+    for name in names:
+        references = args.text or texts[reference]
+        wer = np.mean([word_error_rate(ref, text) for ref, text in zip(references, texts[name])])
+        total = sum(seconds[name])
+        print(f"{name:<12} {np.mean(seconds[name]) * 1000:>8.1f} {total / audio_seconds:>6.3f} "
+              f"{total / sum(seconds[reference]):>11.2f}x {wer * 100:>19.1f}%  {profiles[name].describe()}")
+
+
+if __name__ == "__main__":
+    main()
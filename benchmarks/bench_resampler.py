@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# Cost and quality of the streaming PolyphaseResampler that converts native
+# capture rates to the engine's 16 kHz: share of one core when fed in
+# capture-sized blocks, whether the output depends on how the input is split
+# into blocks, and how well a tone above the 8 kHz output Nyquist frequency
+# is rejected compared with the linear interpolation used before.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import PolyphaseResampler
+
+TARGET_RATE = 16000
+SPLITS = (1, 7, 160, 1000, 4096)
+
+
+def linear(audio, source_rate, target_rate):
+    positions = np.arange(0, len(audio), source_rate / target_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def core_share(rate, seconds, block_seconds):
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.5, 0.5, int(seconds * rate)).astype(np.float32)
+    blocksize = max(1, int(block_seconds * rate))
+    resampler = PolyphaseResampler(rate, TARGET_RATE)
+    start = time.process_time()
+    for i in range(0, len(audio), blocksize):
+        resampler.process(audio[i:i + blocksize])
+    return (time.process_time() - start) / seconds
+
+
+def block_invariant(rate):
+    rng = np.random.default_rng(1)
+    audio = rng.uniform(-0.5, 0.5, rate).astype(np.float32)
+    reference = PolyphaseResampler(rate, TARGET_RATE).process(audio)
+    for split in SPLITS:
+        resampler = PolyphaseResampler(rate, TARGET_RATE)
+        output = np.concatenate([resampler.process(audio[i:i + split]) for i in range(0, len(audio), split)])
+        if not np.array_equal(output, reference):
+            return False
+    return True
+
+
+def alias_db(resample, rate, frequency):
+    # Level of what a full-scale tone the output can't represent folds into
+    if frequency >= rate / 2:
+        return None
+    t = np.arange(rate * 2) / rate
+    tone = np.sin(2 * np.pi * frequency * t).astype(np.float32)
+    output = resample(tone, rate, TARGET_RATE)[TARGET_RATE // 2:-TARGET_RATE // 2]
+    rms = np.sqrt(np.mean(output.astype(np.float64) ** 2))
+    return 20 * np.log10(max(rms * np.sqrt(2), 1e-12))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost and quality of the streaming resampler.")
+    parser.add_argument("--rates", type=int, nargs="+", default=[8000, 22050, 32000, 44100, 48000, 96000],
+                        help="Capture rates to convert to 16 kHz")
+    parser.add_argument("--seconds", type=float, default=30.0, help="Seconds of audio per rate")
+    parser.add_argument("--block", type=float, default=0.064, help="Capture block length in seconds")
+    parser.add_argument("--alias-frequency", type=float, default=11000.0,
+                        help="Test tone above the output Nyquist frequency, in Hz")
+    args = parser.parse_args()
+
+    print(f"{'rate':>6} {'taps':>5} {'% core':>7} {'block-invariant':>16} "
+          f"{'alias dB':>9} {'linear alias dB':>16}")
+    for rate in args.rates:
+        resampler = PolyphaseResampler(rate, TARGET_RATE)
+        share = core_share(rate, args.seconds, args.block)
+        stable = block_invariant(rate)
+        polyphase = alias_db(lambda a, s, t: PolyphaseResampler(s, t).process(a), rate, args.alias_frequency)
+        interpolated = alias_db(linear, rate, args.alias_frequency) if rate != TARGET_RATE else None
+        print(f"{rate:>6} {resampler.taps:>5} {share * 100:>7.3f} {'yes' if stable else 'NO':>16} "
+              f"{'-' if polyphase is None else f'{polyphase:.1f}':>9} "
+              f"{'-' if interpolated is None else f'{interpolated:.1f}':>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# Micro-benchmark for the capture path: per-chunk cost of accumulating an
+# utterance with np.append versus the preallocated UtteranceBuffer, and the
+# cost of the in-place AudioRingBuffer write done in the PortAudio callback.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import AudioRingBuffer, UtteranceBuffer
+
+SAMPLE_RATE = 16000
+BLOCKSIZE = 1024
+GAIN = 8.0
+
+
+def per_chunk_cost_append(seconds, chunk):
+    buffer = np.array([], dtype=np.float32)
+    chunks = int(seconds * SAMPLE_RATE / BLOCKSIZE)
+    timings = np.empty(chunks)
+    for i in range(chunks):
+        start = time.perf_counter()
+        buffer = np.append(buffer, chunk)
+        timings[i] = time.perf_counter() - start
+    return timings
+
+
+def per_chunk_cost_ring(seconds, indata):
+    ring = AudioRingBuffer(10 * SAMPLE_RATE)
+    buffer = UtteranceBuffer(60 * SAMPLE_RATE)
+    chunks = int(seconds * SAMPLE_RATE / BLOCKSIZE)
+    timings = np.empty(chunks)
+    for i in range(chunks):
+        start = time.perf_counter()
+        ring.write(indata[:, 0], GAIN)
+        buffer.append(ring.read(BLOCKSIZE))
+        timings[i] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-chunk cost of utterance accumulation.")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[1, 5, 15, 30, 60],
+                        help="Utterance lengths in seconds")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    indata = rng.uniform(-0.1, 0.1, size=(BLOCKSIZE, 1)).astype(np.float32)
+    chunk = np.clip(indata[:, 0] * GAIN, -1.0, 1.0)
+
+    print(f"{'length':>8} {'np.append last-chunk us':>24} {'ring last-chunk us':>20}")
+    for seconds in args.lengths:
+        appended = per_chunk_cost_append(seconds, chunk)
+        ring = per_chunk_cost_ring(seconds, indata)
+        # Compare the cost of the final second of each utterance, which is
+        # where quadratic growth shows up.
+        tail = max(1, SAMPLE_RATE // BLOCKSIZE)
+        print(f"{seconds:>7.0f}s {np.median(appended[-tail:]) * 1e6:>24.1f} "
+              f"{np.median(ring[-tail:]) * 1e6:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
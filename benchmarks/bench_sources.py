@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# Throughput of the engine as the number of capture sources grows. Each
+# source is one channel of a simulated multi-channel device playing the
+# same speech/silence pattern with a different start offset, so
+# utterances from different sources overlap without ending together.
+# The simulated backend costs like a GPU: one pass over the longest
+# segment in a call plus a small share for every extra segment. Runs with
+# batching (max_batch > 1) and without it are compared.
+
+import argparse
+import os
+import queue
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import VoxtarixEngine, TranscriptionBackend, TextRecognizedEvent
+from fake_audio import SAMPLE_RATE, FakeInputStream, synthetic_source
+
+DEFAULT_PATTERN = "speech:2,silence:3,speech:1,silence:3,speech:3,silence:3"
+
+
+class SimulatedBatchBackend(TranscriptionBackend):
+    name = "simulated-batch"
+    supports_batching = True
+
+    def __init__(self, rtf, batch_cost):
+        super().__init__("simulated", "cuda", "none")
+        self.rtf = rtf
+        self.batch_cost = batch_cost
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        return self.transcribe_batch([audio], **options)[0]
+
+    def transcribe_batch(self, audios, **options):
+        longest = max(len(audio) for audio in audios) / SAMPLE_RATE
+        cost = self.rtf * longest * (1 + self.batch_cost * (len(audios) - 1))
+        # Sleep rather than spin: the work would run on the GPU
+        time.sleep(cost)
+        self.calls.append((len(audios), sum(len(audio) for audio in audios) / SAMPLE_RATE, cost))
+        return [{"text": f"utterance of {len(audio) / SAMPLE_RATE:.2f} seconds", "segments": [], "language": "en"}
+                for audio in audios]
+
+
+def build_sources(count, pattern, repeat, stagger):
+    channels = []
+    ends = []
+    for index in range(count):
+        offset = f"silence:{index * stagger:.3f}," if index else ""
+        audio, speech_ends = synthetic_source(offset + pattern, repeat=repeat)
+        channels.append(audio)
+        ends.append(speech_ends)
+    length = max(len(audio) for audio in channels)
+    audio = np.zeros((length, count), dtype=np.float32)
+    for index, channel in enumerate(channels):
+        audio[:len(channel), index] = channel
+    return audio, ends
+
+
+def run(count, max_batch, args):
+    audio, speech_ends = build_sources(count, args.pattern, args.repeat, args.stagger)
+    events = queue.Queue()
+    engine = VoxtarixEngine(language="en", event_queue=events)
+    engine.WARMUP_TIME = 0.0
+    engine.HISTORY_ENABLED = False
+    engine.CHANNELS = count
+    engine.CHANNEL_MODE = "split"
+    engine.INFERENCE_MAX_BATCH = max_batch
+    engine.inference_queue = queue.Queue(maxsize=args.queue_size)
+    engine.sources = engine.create_sources()
+    engine.backend = SimulatedBatchBackend(args.rtf, args.batch_cost)
+
+    streams = []
+
+    def stream_factory(**kwargs):
+        streams.append(FakeInputStream(audio, **kwargs))
+        return streams[-1]
+
+    engine.stream_factory = stream_factory
+    wall_start = time.perf_counter()
+    engine.start()
+    stream = streams[0]
+
+    expected = sum(len(ends) for ends in speech_ends)
+    deadline = stream.time_of(len(audio)) + engine.SILENCE_DURATION + args.drain
+    recognized = {source.name: [] for source in engine.sources}
+    while time.perf_counter() < deadline:
+        try:
+            event = events.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        if isinstance(event, TextRecognizedEvent):
+            recognized[event.source].append(time.perf_counter())
+        if sum(map(len, recognized.values())) >= expected and engine.inference_queue.empty():
+            break
+    engine.should_terminate = True
+    engine.stop_streams()
+    wall = time.perf_counter() - wall_start
+
+    # Every silence in the pattern ends an utterance, so results pair up
+    # with speech ends in order, even when a backlog delays them past the
+    # next speech end. Dropped utterances make the pairing meaningless, so
+    # those runs report no latency.
+    latencies = []
+    for source, ends in zip(engine.sources, speech_ends):
+        arrivals = recognized[source.name]
+        if len(arrivals) == len(ends):
+            latencies.extend(arrived - stream.time_of(end) for arrived, end in zip(arrivals, ends))
+
+    calls = engine.backend.calls
+    audio_seconds = sum(seconds for _, seconds, _ in calls)
+    model_seconds = sum(cost for _, _, cost in calls)
+    return {
+        "sources": count,
+        "max_batch": max_batch,
+        "recognized": sum(map(len, recognized.values())),
+        "expected": expected,
+        "dropped": engine.segments_dropped,
+        "calls": len(calls),
+        "mean_batch": float(np.mean([size for size, _, _ in calls])) if calls else 0.0,
+        # Seconds of audio transcribed per second of model time: the
+        # throughput one model could sustain at this load
+        "audio_per_model_second": audio_seconds / model_seconds if model_seconds else 0.0,
+        "wall_seconds": wall,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000 if latencies else None,
+        "p90_ms": float(np.percentile(latencies, 90)) * 1000 if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine throughput versus number of capture sources.")
+    parser.add_argument("--sources", type=int, nargs="+", default=[1, 2, 4, 8], help="Source counts to run")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help="Speech/silence pattern of every source")
+    parser.add_argument("--repeat", type=int, default=2, help="Repetitions of the pattern")
+    parser.add_argument("--stagger", type=float, default=0.4, help="Start offset between sources in seconds")
+    parser.add_argument("--rtf", type=float, default=0.5, help="Simulated real-time factor of one model pass")
+    parser.add_argument("--batch-cost", type=float, default=0.1,
+                        help="Extra cost of every additional segment in a call, relative to one pass")
+    parser.add_argument("--max-batch", type=int, default=8, help="Batch size limit of the batched runs")
+    parser.add_argument("--queue-size", type=int, default=16, help="Inference queue size")
+    parser.add_argument("--drain", type=float, default=15.0, help="Seconds to wait for pending results at the end")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the engine's log output")
+    args = parser.parse_args()
+
+    # The engine prints every result; keep the table on the real stdout
+    out = sys.stdout
+    if not args.verbose:
+        sys.stdout = sys.stderr = open(os.devnull, "w")
+    print(f"{'sources':>7} {'batch':>5} {'recog':>7} {'drop':>4} {'calls':>5} {'mean b':>6} "
+          f"{'audio/model s':>13} {'p50 ms':>7} {'p90 ms':>7}", file=out, flush=True)
+    for count in args.sources:
+        for max_batch in (1, args.max_batch):
+            result = run(count, max_batch, args)
+            p50 = f"{result['p50_ms']:.0f}" if result["p50_ms"] is not None else "-"
+            p90 = f"{result['p90_ms']:.0f}" if result["p90_ms"] is not None else "-"
+            print(f"{count:>7} {max_batch:>5} {result['recognized']:>3}/{result['expected']:<3} "
+                  f"{result['dropped']:>4} {result['calls']:>5} {result['mean_batch']:>6.2f} "
+                  f"{result['audio_per_model_second']:>13.2f} {p50:>7} {p90:>7}", file=out, flush=True)
+
+
+if __name__ == "__main__":
+    main()
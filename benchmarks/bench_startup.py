@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# Measures how long the applets block before the GTK main loop can run:
+# loading voxtarix.py the way the applets do and constructing the engine.
+# Exits non-zero if the target is missed or if heavy inference libraries
+# were imported on that path.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["torch", "whisper", "faster_whisper", "ctranslate2", "sounddevice", "pynput"]
+
+PROBE = """
+import importlib.util, json, queue, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("voxtarix", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+engine = module.VoxtarixEngine(language="en", event_queue=queue.Queue())
+constructed = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "construct_seconds": constructed - imported,
+    "total_seconds": constructed - start,
+    "heavy_modules": [name for name in sys.argv[2:] if name in sys.modules],
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Applet startup time until the main loop can run.")
+    parser.add_argument("--target", type=float, default=1.0, help="Maximum allowed startup time in seconds")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, os.path.join(ROOT, "voxtarix.py"), *HEAVY_MODULES],
+            check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    best = min(run["total_seconds"] for run in runs)
+    heavy = sorted({name for run in runs for name in run["heavy_modules"]})
+    print(f"import: {min(run['import_seconds'] for run in runs) * 1000:.0f} ms, "
+          f"construct: {min(run['construct_seconds'] for run in runs) * 1000:.0f} ms, "
+          f"total: {best * 1000:.0f} ms (target {args.target * 1000:.0f} ms)")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported during startup: {', '.join(heavy)}")
+        failed = True
+    if best > args.target:
+        print("FAIL: startup target missed")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# The model in the engine's process versus in a worker process: how late
+# the audio callbacks run (jitter), how late the frames of a 60 Hz UI loop
+# in the same process come (what the applets' GTK main loop sees), and how
+# long transcripts take after the end of speech. The simulated model holds
+# the GIL the way Whisper's Python decode loop does, in slices of
+# --hold-ms; --kill-after kills the worker once to show the restart.
+
+import argparse
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import VoxtarixEngine, ProcessBackend, TranscriptionBackend, TextRecognizedEvent
+from fake_audio import SAMPLE_RATE, FakeInputStream, synthetic_source
+
+FRAME_PERIOD = 1 / 60
+
+
+class GILBackend(TranscriptionBackend):
+    # Spends rtf seconds per second of audio in C calls that don't release
+    # the GIL, hold_ms at a time
+    name = "simulated"
+
+    def __init__(self, rtf, hold_ms):
+        super().__init__("simulated", "cpu", "none")
+        self.rtf = rtf
+        start = time.perf_counter()
+        sum(range(1000000))
+        self.slice = max(1, int(1000000 * hold_ms / 1000 / (time.perf_counter() - start)))
+
+    def transcribe(self, audio, **options):
+        deadline = time.perf_counter() + len(audio) / SAMPLE_RATE * self.rtf
+        while time.perf_counter() < deadline:
+            sum(range(self.slice))
+        return {"text": "hello", "segments": [], "language": "en"}
+
+
+def ui_loop(stop, lateness):
+    # A main loop that wakes up for every frame and does a little work
+    deadline = time.perf_counter() + FRAME_PERIOD
+    while not stop.is_set():
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        lateness.append(time.perf_counter() - deadline)
+        sum(range(1000))
+        deadline = max(deadline + FRAME_PERIOD, time.perf_counter())
+
+
+def run(worker, args):
+    audio, speech_ends = synthetic_source(args.pattern, repeat=args.repeat)
+    events = queue.Queue()
+    engine = VoxtarixEngine(language="en", event_queue=events)
+    engine.WARMUP_TIME = 0.0
+    engine.HISTORY_ENABLED = False
+    engine.SPECULATION_ENABLED = False
+    if worker:
+        engine.backend = ProcessBackend(GILBackend, args.rtf, args.hold_ms)
+    else:
+        engine.backend = GILBackend(args.rtf, args.hold_ms)
+    engine.model_ready.set()
+    streams = []
+
+    def stream_factory(**kwargs):
+        streams.append(FakeInputStream(audio, **kwargs))
+        return streams[-1]
+
+    engine.stream_factory = stream_factory
+    stop = threading.Event()
+    frames = []
+    ui = threading.Thread(target=ui_loop, args=(stop, frames), daemon=True)
+    ui.start()
+    engine.start()
+    stream = streams[0]
+
+    arrivals = []
+    deadline = stream.time_of(len(audio)) + args.drain
+    while time.perf_counter() < deadline and len(arrivals) < len(speech_ends):
+        try:
+            event = events.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        if isinstance(event, TextRecognizedEvent):
+            arrivals.append(time.perf_counter())
+            if worker and len(arrivals) == args.kill_after:
+                os.kill(engine.backend.process.pid, signal.SIGKILL)
+    engine.should_terminate = True
+    stop.set()
+    engine.stop_streams()
+    ui.join()
+    engine.backend.close()
+
+    callbacks = np.array(stream.lateness) * 1000
+    frames = np.array(frames) * 1000
+    latencies = [arrival - stream.time_of(end) for arrival, end in zip(arrivals, speech_ends)]
+    return {
+        "callback_p99": np.percentile(callbacks, 99),
+        "callback_max": callbacks.max(),
+        "frame_p99": np.percentile(frames, 99),
+        "frame_max": frames.max(),
+        "late_frames": np.mean(frames > FRAME_PERIOD * 1000) * 100,
+        "latency_p50": np.median(latencies) * 1000 if latencies else float("nan"),
+        "recognized": f"{len(arrivals)}/{len(speech_ends)}",
+        "restarts": getattr(engine.backend, "restarts", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Callback jitter and UI latency with and without a worker process.")
+    parser.add_argument("--pattern", default="silence:1,speech:4,silence:2", help="Synthetic source")
+    parser.add_argument("--repeat", type=int, default=4, help="Repetitions of the pattern")
+    parser.add_argument("--rtf", type=float, default=0.5, help="Simulated real-time factor")
+    parser.add_argument("--hold-ms", type=float, default=20.0, help="Length of the GIL-holding slices of a decode")
+    parser.add_argument("--kill-after", type=int, default=0, help="Kill the worker after this many transcripts")
+    parser.add_argument("--drain", type=float, default=10.0, help="Seconds to wait for results at the end")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the engine's log output")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    if not args.verbose:
+        sys.stdout = sys.stderr = open(os.devnull, "w")
+    print(f"{'model':<10} {'callback p99 ms':>15} {'max ms':>7} {'frame p99 ms':>12} {'max ms':>7} "
+          f"{'late frames':>11} {'text p50 ms':>11} {'recog':>6} {'restarts':>8}", file=out, flush=True)
+    for worker in (False, True):
+        result = run(worker, args)
+        print(f"{'worker' if worker else 'in-process':<10} {result['callback_p99']:>15.1f} "
+              f"{result['callback_max']:>7.1f} {result['frame_p99']:>12.1f} {result['frame_max']:>7.1f} "
+              f"{result['late_frames']:>10.1f}% {result['latency_p50']:>11.0f} {result['recognized']:>6} "
+              f"{result['restarts']:>8}", file=out, flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# Simulated audio input for benchmarks: a drop-in replacement for
+# sd.InputStream that delivers blocks on a real-time clock, fed from WAV
+# fixtures or synthetic speech/silence patterns with known speech ends.
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voxtarix import iter_audio_file
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_speech(seconds, sample_rate=SAMPLE_RATE, level=0.3, seed=0):
+    # Harmonic tone with a wandering pitch and syllable-rate amplitude
+    # modulation: passes the VAD like speech and costs the model as much
+    # encoder work as real speech, but carries no words.
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 110 + 40 * rng.random() + 30 * np.sin(2 * np.pi * (2 + rng.random()) * t)
+    phase = np.cumsum(2 * np.pi * pitch / sample_rate)
+    signal = sum(np.sin(k * phase) / k for k in range(1, 10))
+    envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4 * t + rng.random() * 2 * np.pi)
+    return (level * signal * envelope / 2).astype(np.float32)
+
+
+def background_noise(seconds, sample_rate=SAMPLE_RATE, level=0.002, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0, level, int(seconds * sample_rate)).astype(np.float32)
+
+
+def parse_pattern(pattern):
+    # "speech:2,silence:3" -> [("speech", 2.0), ("silence", 3.0)]
+    parts = []
+    for item in pattern.split(","):
+        kind, seconds = item.split(":")
+        if kind not in ("speech", "silence"):
+            raise ValueError(f"Unknown pattern element '{kind}'")
+        parts.append((kind, float(seconds)))
+    return parts
+
+
+def synthetic_source(pattern, sample_rate=SAMPLE_RATE, repeat=1):
+    # Returns (audio, speech_ends) where speech_ends are sample positions at
+    # which a stretch of speech ends.
+    pieces = []
+    speech_ends = []
+    position = 0
+    for i in range(repeat):
+        for j, (kind, seconds) in enumerate(parse_pattern(pattern)):
+            if kind == "speech":
+                piece = synthetic_speech(seconds, sample_rate, seed=i * 100 + j)
+                piece += background_noise(seconds, sample_rate, seed=i * 100 + j)
+            else:
+                piece = background_noise(seconds, sample_rate, seed=i * 100 + j)
+            pieces.append(piece)
+            position += len(piece)
+            if kind == "speech":
+                speech_ends.append(position)
+    return np.concatenate(pieces), speech_ends
+
+
+def wav_source(path, sample_rate=SAMPLE_RATE, threshold_db=-40.0, min_gap=0.5):
+    # Speech ends of a recorded fixture are estimated from 10 ms frame
+    # energy: the end of every voiced stretch followed by min_gap of quiet.
+    audio = np.concatenate(list(iter_audio_file(path, sample_rate)))
+    frame = sample_rate // 100
+    frames = len(audio) // frame
+    energy = 10 * np.log10(np.mean(audio[:frames * frame].reshape(frames, frame) ** 2, axis=1) + 1e-10)
+    voiced = energy > threshold_db
+    speech_ends = []
+    gap = int(min_gap * 100)
+    last_voiced = None
+    for i, is_voiced in enumerate(voiced):
+        if is_voiced:
+            last_voiced = i
+        elif last_voiced is not None and i - last_voiced >= gap:
+            speech_ends.append((last_voiced + 1) * frame)
+            last_voiced = None
+    if last_voiced is not None:
+        speech_ends.append((last_voiced + 1) * frame)
+    return audio, speech_ends
+
+
+class FakeInputStream:
+    # Mimics the parts of sd.InputStream the engine uses. Blocks are
+    # delivered against absolute deadlines so scheduling delays don't
+    # accumulate into drift; after the source ends, silence follows so
+    # endpoints can still fire.
+    def __init__(self, audio, samplerate, channels, blocksize, callback, dtype="float32", speed=1.0, **kwargs):
+        self.audio = audio
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.speed = speed
+        self.indata = np.zeros((blocksize, channels), dtype=dtype)
+        self.position = 0
+        self.started_at = None
+        self.active = False
+        self.thread = None
+        self.lateness = []
+
+    def start(self):
+        self.active = True
+        self.started_at = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.active = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def abort(self):
+        self.stop()
+
+    def close(self):
+        self.stop()
+
+    def time_of(self, position):
+        # perf_counter time at which the sample at position was delivered
+        return self.started_at + position / self.samplerate / self.speed
+
+    def run(self):
+        block_period = self.blocksize / self.samplerate / self.speed
+        deadline = self.started_at + block_period
+        while self.active:
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.lateness.append(time.perf_counter() - deadline)
+            block = self.audio[self.position:self.position + self.blocksize]
+            # Mono audio goes to every channel, (samples, channels) audio
+            # gives each channel its own signal
+            self.indata[:len(block), :] = block[:, None] if block.ndim == 1 else block
+            self.indata[len(block):, :] = 0.0
+            self.position += self.blocksize
+            self.callback(self.indata, self.blocksize, None, None)
+            deadline += block_period
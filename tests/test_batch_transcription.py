@@ -0,0 +1,100 @@
+import io
+import json
+import threading
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from voxtarix import (BatchTranscriber, FasterWhisperBackend, QuantizedWhisperBackend, TranscriptionBackend,
+                      VoxtarixEngine, WhisperBackend, batch_workers)
+
+SAMPLE_RATE = 16000
+
+
+class SharedStateBackend(TranscriptionBackend):
+    # Keeps the segment being decoded on the instance, as openai-whisper
+    # keeps its kv-cache in hooks on the shared model
+    name = "shared-state"
+
+    def __init__(self):
+        super().__init__("fake", "cpu")
+        self.lock = threading.Lock()
+        self.active = 0
+        self.overlapped = False
+
+    def transcribe(self, audio, **options):
+        with self.lock:
+            self.active += 1
+            self.overlapped |= self.active > 1
+        self.audio = audio
+        time.sleep(0.002 * (len(audio) % 7))
+        text = f"{len(self.audio)} {float(np.abs(self.audio).max()):.3f}"
+        with self.lock:
+            self.active -= 1
+        return {"text": text, "language": "de", "segments": []}
+
+
+class ConcurrentBackend(SharedStateBackend):
+    concurrent = True
+
+    def transcribe(self, audio, **options):
+        with self.lock:
+            self.active += 1
+            self.overlapped |= self.active > 1
+        time.sleep(0.002 * (len(audio) % 7))
+        with self.lock:
+            self.active -= 1
+        return {"text": f"{len(audio)} {float(np.abs(audio).max()):.3f}", "language": "de", "segments": []}
+
+
+@pytest.fixture(scope="module")
+def recording(tmp_path_factory):
+    # Noise bursts of different lengths and levels between pauses
+    rng = np.random.default_rng(1)
+    pieces = []
+    for i in range(8):
+        pieces.append(np.zeros(int(2.5 * SAMPLE_RATE), dtype=np.float32))
+        level = 0.1 + 0.05 * i
+        pieces.append(np.clip(level * rng.standard_normal(int((1.0 + 0.1 * i) * SAMPLE_RATE)), -1, 1))
+    pieces.append(np.zeros(3 * SAMPLE_RATE, dtype=np.float32))
+    path = tmp_path_factory.mktemp("batch") / "recording.wav"
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((np.concatenate(pieces) * 32767).astype("<i2").tobytes())
+    return str(path)
+
+
+def transcribe(recording, backend, workers):
+    engine = VoxtarixEngine()
+    engine.backend = backend
+    output = io.StringIO()
+    BatchTranscriber(engine, output, workers, batch_size=1).run([recording])
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    return sorted((record["start"], record["end"], record["text"]) for record in records)
+
+
+def test_only_concurrent_backends_get_several_workers(monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 16)
+    for backend_class in (WhisperBackend, QuantizedWhisperBackend, SharedStateBackend):
+        assert batch_workers(backend_class, "cpu", 0) == 1
+        assert batch_workers(backend_class, "cpu", 0, requested=4) == 1
+    assert batch_workers(FasterWhisperBackend, "cpu", 0) == 4
+    assert batch_workers(FasterWhisperBackend, "cpu", 0, requested=3) == 3
+    assert batch_workers(FasterWhisperBackend, "cuda", 0) == 1
+
+
+def test_concurrent_output_matches_sequential(recording):
+    sequential = transcribe(recording, SharedStateBackend(), 1)
+    assert len(sequential) == 8
+
+    backend = SharedStateBackend()
+    assert transcribe(recording, backend, batch_workers(type(backend), "cpu", 0, requested=4)) == sequential
+    assert not backend.overlapped
+
+    backend = ConcurrentBackend()
+    assert transcribe(recording, backend, 4) == sequential
+    assert backend.overlapped
@@ -0,0 +1,110 @@
+import numpy as np
+
+from voxtarix import AudioRingBuffer, UtteranceBuffer
+
+
+def read_all(ring, max_samples=1 << 20):
+    pieces = []
+    while True:
+        view = ring.read(max_samples)
+        if view is None:
+            return np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+        pieces.append(view.copy())
+
+
+def test_ring_wraps_around():
+    ring = AudioRingBuffer(10)
+    signal = np.arange(1, 26, dtype=np.float32) / 100
+    for start in range(0, 25, 6):
+        ring.write(signal[start:start + 6])
+        assert np.array_equal(read_all(ring, 4), signal[start:start + 6])
+    assert ring.write_pos == ring.read_pos == 25
+    assert ring.overruns == 0
+
+
+def test_read_views_are_contiguous_and_bounded():
+    ring = AudioRingBuffer(8)
+    ring.write(np.ones(6, dtype=np.float32) * 0.1)
+    read_all(ring)
+    ring.write(np.arange(5, dtype=np.float32) / 10)
+    # Two samples fit before the end of the buffer, the rest wraps
+    first = ring.read(100)
+    assert len(first) == 2
+    assert np.shares_memory(first, ring.buffer)
+    assert len(ring.read(2)) == 2
+    assert ring.available() == 1
+
+
+def test_gain_is_applied_and_clipped():
+    ring = AudioRingBuffer(8)
+    ring.write(np.array([0.1, -0.2, 0.6, -0.9], dtype=np.float32), gain=2.0)
+    assert np.allclose(ring.read(8), [0.2, -0.4, 1.0, -1.0])
+
+
+def test_overrun_drops_the_oldest_samples_and_counts_them():
+    ring = AudioRingBuffer(10)
+    signal = np.arange(1, 26, dtype=np.float32) / 100
+    ring.write(signal[:8])
+    ring.write(signal[8:17])
+    assert ring.available() == 17
+    got = read_all(ring)
+    assert ring.overruns == 7
+    assert np.array_equal(got, signal[7:17])
+    # A single write larger than the ring keeps its newest samples
+    ring.write(signal)
+    assert np.array_equal(read_all(ring), signal[-10:])
+    assert ring.overruns == 7
+    assert ring.write_pos == 27
+
+
+def test_skip_discards_without_counting_overruns():
+    ring = AudioRingBuffer(10)
+    ring.write(np.ones(25, dtype=np.float32) * 0.1)
+    ring.skip()
+    assert ring.available() == 0
+    assert ring.read(10) is None
+    assert ring.overruns == 0
+    ring.write(np.ones(3, dtype=np.float32) * 0.2)
+    assert np.allclose(read_all(ring), 0.2)
+
+
+def test_wait_reports_pending_data():
+    ring = AudioRingBuffer(4)
+    assert not ring.wait(0.01)
+    ring.write(np.zeros(2, dtype=np.float32))
+    assert ring.wait(0.01)
+    read_all(ring)
+    assert not ring.wait(0.01)
+
+
+def test_utterance_buffer_keeps_the_tail():
+    buffer = UtteranceBuffer(4)
+    signal = np.arange(20, dtype=np.float32)
+    buffer.append(signal[:3])
+    buffer.append(signal[3:11])
+    assert len(buffer) == 11
+    assert len(buffer.data) >= 11
+    assert np.array_equal(buffer.view(), signal[:11])
+    buffer.keep_last(4)
+    assert np.array_equal(buffer.view(), signal[7:11])
+    buffer.append(signal[11:20])
+    assert np.array_equal(buffer.view(), signal[7:20])
+    # Keeping more than there is keeps everything
+    buffer.keep_last(100)
+    assert np.array_equal(buffer.view(), signal[7:20])
+    buffer.keep_last(0)
+    assert len(buffer) == 0
+    buffer.clear()
+    assert buffer.view().size == 0
+
+
+def test_utterance_buffer_grows_geometrically():
+    buffer = UtteranceBuffer(16)
+    sizes = set()
+    for _ in range(100):
+        buffer.append(np.ones(10, dtype=np.float32))
+        sizes.add(len(buffer.data))
+    assert len(buffer) == 1000
+    # Doubling: a handful of reallocations for 100 appends
+    assert len(sizes) <= 8
+    assert len(buffer.data) < 2 * 1000 + 16
@@ -0,0 +1,119 @@
+import json
+import os
+import queue
+import shutil
+import stat
+import tempfile
+import threading
+import time
+
+import pytest
+
+from voxtarix import (EVENT_TYPES, EngineClient, EngineDaemon, EngineEvent, EngineTerminatedEvent,
+                      InferenceQueueEvent, PartialTextEvent, RemoteEngine, TextRecognizedEvent, UtteranceTiming)
+
+
+def over_the_wire(event):
+    # What the daemon writes to the socket and the client reads back
+    line = json.dumps({"event": event.to_dict()}, ensure_ascii=False).encode() + b"\n"
+    return EngineEvent.from_dict(json.loads(line)["event"])
+
+
+def test_round_trip_keeps_type_and_fields():
+    for event in (PartialTextEvent("schon", "fertig", source="mic"), InferenceQueueEvent(3, 1),
+                  EngineTerminatedEvent()):
+        received = over_the_wire(event)
+        assert type(received) is type(event)
+        assert received.timestamp == event.timestamp
+        for cls in type(event).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                assert getattr(received, name) == getattr(event, name)
+    assert over_the_wire(PartialTextEvent("schon", "fertig")).text == "schon fertig"
+
+
+def test_nested_objects_are_flattened():
+    timing = UtteranceTiming(capture_start=1.0, speech_end=2.0, endpoint=2.25, audio_duration=1.5)
+    timing.inference_start, timing.inference_end = 2.5, 3.0
+    timing.model = "small"
+    event = TextRecognizedEvent("Grüße", timing=timing, entry=(7, 1700000000.0, "Grüße"), source="mic")
+    received = over_the_wire(event)
+    assert received.text == "Grüße"
+    assert received.timing == json.loads(json.dumps(timing.as_dict()))
+    assert received.timing["spans"]["inference"] == 0.5
+    assert tuple(received.entry) == event.entry
+
+
+def test_every_event_type_is_registered():
+    # An event missing here could not be decoded by clients
+    assert set(EVENT_TYPES.values()) == set(EngineEvent.__subclasses__())
+
+
+class FakeEngine:
+    def __init__(self):
+        self.muted = False
+        self.use_clipboard = False
+        self.use_typing = True
+        self.model_ready = threading.Event()
+        self.backend_options = ("openai-whisper", "small", "cpu", None, 0)
+        self.language = "de"
+        self.decoding_profile = "default"
+        self.decoding_profiles = ["default"]
+        self.history = None
+        self.HISTORY_MEMORY_LIMIT = 200
+        self.HISTORY_PAGE_SIZE = 50
+
+
+@pytest.fixture
+def start_daemon():
+    # Unix socket paths are short; pytest's tmp_path may be too long
+    directory = tempfile.mkdtemp(prefix="voxtarix-test-")
+    daemons = []
+
+    def start(on_demand):
+        daemon = EngineDaemon(FakeEngine(), os.path.join(directory, "daemon.sock"), on_demand=on_demand)
+        daemon.EXIT_GRACE = 0.1
+        daemon.start()
+        daemons.append(daemon)
+        return daemon
+
+    yield start
+    for daemon in daemons:
+        daemon.stop()
+    shutil.rmtree(directory)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_socket_is_private(start_daemon):
+    daemon = start_daemon(on_demand=True)
+    assert stat.S_IMODE(os.stat(daemon.socket_path).st_mode) == 0o600
+
+
+def test_idle_client_closing_leaves_daemon_unused(start_daemon):
+    daemon = start_daemon(on_demand=True)
+    engine = RemoteEngine(EngineClient(daemon.socket_path), queue.Queue())
+    engine.start()
+    assert wait_for(lambda: daemon.connections == 2 and daemon.subscribers)
+    assert not daemon.unused()
+    # No event is sent after the client leaves
+    engine.stop()
+    assert wait_for(daemon.unused)
+    assert daemon.connections == 0
+    assert daemon.subscribers == []
+
+
+def test_daemon_started_by_hand_releases_outputs(start_daemon):
+    daemon = start_daemon(on_demand=False)
+    engine = RemoteEngine(EngineClient(daemon.socket_path), queue.Queue())
+    engine.start()
+    assert engine.use_typing
+    engine.stop()
+    assert wait_for(lambda: not daemon.engine.use_typing)
+    assert not daemon.unused()
@@ -0,0 +1,56 @@
+import os
+import queue
+import select
+import threading
+import time
+
+import pytest
+
+from voxtarix import EventChannel, MuteStateChangedEvent
+
+
+@pytest.fixture(params=["eventfd", "pipe"])
+def channel(request, monkeypatch):
+    if request.param == "pipe":
+        monkeypatch.delattr(os, "eventfd", raising=False)
+    elif not hasattr(os, "eventfd"):
+        pytest.skip("os.eventfd is unavailable")
+    return EventChannel()
+
+
+def readable(channel, timeout=0.0):
+    return bool(select.select([channel], [], [], timeout)[0])
+
+
+def test_put_wakes_and_drain_resets(channel):
+    assert not readable(channel)
+    events = [MuteStateChangedEvent(True), MuteStateChangedEvent(False)]
+    for event in events:
+        channel.put(event)
+    assert readable(channel)
+    assert channel.drain() == events
+    assert not readable(channel)
+    assert channel.drain() == []
+    assert channel.empty()
+
+
+def test_wakes_a_waiting_consumer(channel):
+    event = MuteStateChangedEvent(True)
+    timer = threading.Timer(0.05, channel.put, (event,))
+    timer.start()
+    assert readable(channel, timeout=5.0)
+    assert channel.drain() == [event]
+    timer.join()
+
+
+def test_queue_interface(channel):
+    with pytest.raises(queue.Empty):
+        channel.get_nowait()
+    start = time.monotonic()
+    with pytest.raises(queue.Empty):
+        channel.get(timeout=0.05)
+    assert time.monotonic() - start >= 0.05
+    event = MuteStateChangedEvent(True)
+    threading.Timer(0.05, channel.put, (event,)).start()
+    assert channel.get(timeout=5.0) is event
+    assert not readable(channel)
@@ -0,0 +1,49 @@
+from voxtarix import HistoryStore
+
+
+def fill(store, count):
+    return [store.add("entry %d" % i, timestamp=1000.0 + i) for i in range(count)]
+
+
+def test_pages_reach_past_the_memory_limit(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path, memory_limit=5)
+    entries = fill(store, 12)[::-1]
+    assert list(store.recent) == entries[:5]
+    assert store.page(limit=3) == entries[:3]
+    # Starts in memory, continues from disk
+    assert store.page(before_id=entries[2][0], limit=4) == entries[3:7]
+    assert store.page(before_id=entries[8][0], limit=50) == entries[9:]
+    assert store.page(before_id=entries[-1][0]) == []
+    assert store.count() == 12
+    store.close()
+
+    # A new store loads the newest entries back into memory
+    store = HistoryStore(path, memory_limit=5)
+    assert list(store.recent) == entries[:5]
+    assert store.page(before_id=entries[4][0], limit=2) == entries[5:7]
+    store.close()
+
+
+def test_search_is_newest_first_and_literal():
+    store = HistoryStore(":memory:")
+    store.add("buy milk and bread", timestamp=1.0)
+    store.add('say "hello" OR NOT', timestamp=2.0)
+    newest = store.add("more bread please", timestamp=3.0)
+    assert [entry[2] for entry in store.search("bread")] == ["more bread please", "buy milk and bread"]
+    assert store.search("bread", limit=1) == [newest]
+    # FTS operators and quotes in the query are matched as plain words
+    assert [entry[2] for entry in store.search('"hello" OR')] == ['say "hello" OR NOT']
+    assert store.search("   ") == []
+    store.close()
+
+
+def test_search_falls_back_to_like():
+    store = HistoryStore(":memory:")
+    store.fts = False
+    store.add("buy milk and bread", timestamp=1.0)
+    store.add("more bread please", timestamp=2.0)
+    assert [entry[2] for entry in store.search("read")] == ["more bread please", "buy milk and bread"]
+    assert [entry[2] for entry in store.search("milk and")] == ["buy milk and bread"]
+    assert store.search("cheese") == []
+    store.close()
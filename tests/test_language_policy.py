@@ -0,0 +1,67 @@
+from voxtarix import LanguagePolicy
+
+
+def detected(language, probability=0.9):
+    return {"language": language, "language_probability": probability, "segments": []}
+
+
+def decoded(avg_logprob):
+    return {"language": "de", "segments": [{"avg_logprob": avg_logprob}]}
+
+
+def test_majority_of_votes_keeps_language():
+    policy = LanguagePolicy(votes=3)
+    assert not policy.observe(detected("de"), 2.0)
+    assert not policy.observe(detected("en", 0.6), 2.0)
+    assert policy.language is None
+    assert policy.observe(detected("de"), 2.0)
+    assert policy.language == "de"
+    assert policy.votes == []
+
+
+def test_short_utterances_do_not_vote():
+    policy = LanguagePolicy(votes=1)
+    assert not policy.observe(detected("en"), LanguagePolicy.MIN_VOTE_SECONDS / 2)
+    assert policy.language is None
+    assert policy.observe(detected("de"), LanguagePolicy.MIN_VOTE_SECONDS)
+    assert policy.language == "de"
+
+
+def test_undecided_votes_slide():
+    policy = LanguagePolicy(votes=2, min_probability=0.5)
+    policy.observe(detected("de", 0.3), 2.0)
+    assert not policy.observe(detected("en", 0.4), 2.0)
+    assert policy.language is None
+    # The oldest vote made room; two confident votes now decide
+    assert len(policy.votes) == 1
+    assert policy.observe(detected("en", 0.9), 2.0)
+    assert policy.language == "en"
+
+
+def test_low_confidence_decodes_restart_detection():
+    policy = LanguagePolicy(language="de", recheck_logprob=-1.0, recheck_after=2)
+    assert not policy.observe(decoded(-1.5), 2.0)
+    # A confident decode in between resets the count
+    assert not policy.observe(decoded(-0.2), 2.0)
+    assert not policy.observe(decoded(-1.5), 2.0)
+    assert policy.language == "de"
+    assert policy.observe(decoded(-1.5), 2.0)
+    assert policy.language is None
+
+
+def test_pinned_language_never_changes():
+    policy = LanguagePolicy(language="de", pinned=True, recheck_after=1)
+    assert not policy.observe(decoded(-5.0), 2.0)
+    assert policy.language == "de"
+    # Pinning without a language means detecting on every utterance
+    assert not LanguagePolicy(pinned=True).pinned
+
+
+def test_detection_overhead_needs_enough_decodes():
+    policy = LanguagePolicy()
+    for _ in range(LanguagePolicy.MIN_DECODES):
+        policy.record_decode(1.5, True)
+    assert policy.detection_seconds() is None
+    for seconds in (1.0, 1.2, 1.1):
+        policy.record_decode(seconds, False)
+    assert abs(policy.detection_seconds() - 0.4) < 1e-9
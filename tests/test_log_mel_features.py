@@ -0,0 +1,64 @@
+import numpy as np
+
+from voxtarix import LogMelFeatures
+
+N_FFT = 400
+HOP = 160
+N_MELS = 80
+PADDING = 30 * 16000
+
+
+def mel_filters():
+    # Triangular bank with the shape of Whisper's; the features only need
+    # to match for the same filters
+    bins = N_FFT // 2 + 1
+    edges = np.linspace(0, bins - 1, N_MELS + 2)
+    k = np.arange(bins)
+    filters = np.zeros((N_MELS, bins), dtype=np.float32)
+    for i in range(N_MELS):
+        left, centre, right = edges[i:i + 3]
+        filters[i] = np.clip(np.minimum((k - left) / (centre - left), (right - k) / (right - centre)), 0, None)
+    return filters
+
+
+def reference(audio, filters):
+    # whisper.audio.log_mel_spectrogram(audio, padding=N_SAMPLES) in NumPy,
+    # cut to the content frames as whisper.transcribe() does
+    signal = np.pad(np.concatenate((audio, np.zeros(PADDING, dtype=np.float32))), N_FFT // 2, mode="reflect")
+    windows = np.lib.stride_tricks.sliding_window_view(signal, N_FFT)[::HOP][:-1]
+    window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(N_FFT) / N_FFT)
+    power = np.abs(np.fft.rfft(windows * window, axis=1)) ** 2
+    log_spec = np.log10(np.maximum(power @ filters.T.astype(np.float64), 1e-10))
+    log_spec = np.maximum(log_spec, log_spec.max() - 8.0)
+    return ((log_spec + 4.0) / 4.0).T[:, :len(audio) // HOP]
+
+
+def capture(buffer, anchor, blocksize=1024):
+    # Feeds buffer to the features block by block as the capture path does
+    features = LogMelFeatures(mel_filters(), len(buffer))
+    features.start(anchor)
+    for end in range(blocksize, len(buffer) + blocksize, blocksize):
+        features.update(buffer[:min(end, len(buffer))])
+    return features
+
+
+def test_finish_matches_whisper_features():
+    rng = np.random.default_rng(0)
+    lead = 3000
+    buffer = (0.1 * rng.standard_normal(lead + 2 * 16000 + 77)).astype(np.float32)
+    features = capture(buffer, lead)
+    for end in (len(buffer), lead + 16000, lead + 16000 + 123, lead + 1000):
+        result = features.finish(buffer, lead, end)
+        expected = reference(buffer[lead:end].astype(np.float64), mel_filters())
+        assert result.shape == expected.shape == (N_MELS, (end - lead) // HOP)
+        assert result.flags["C_CONTIGUOUS"]
+        np.testing.assert_allclose(result, expected, atol=1e-4)
+
+
+def test_finish_needs_the_anchor():
+    buffer = np.ones(8000, dtype=np.float32)
+    features = capture(buffer, 1000)
+    assert features.finish(buffer, 0, len(buffer)) is None
+    assert features.finish(buffer, 1000, 1000 + N_FFT - 1) is None
+    features.reset()
+    assert features.finish(buffer, 1000, len(buffer)) is None
@@ -0,0 +1,148 @@
+import json
+import threading
+import time
+
+import pytest
+
+import voxtarix
+from voxtarix import EngineDaemon, OutputSink, UtteranceTiming, VoxtarixEngine
+
+
+class RecordingTyper:
+    name = "recording"
+
+    def __init__(self, seconds_per_char=0.0):
+        self.seconds_per_char = seconds_per_char
+        self.chunks = []
+
+    def type(self, text, delay):
+        time.sleep(self.seconds_per_char * len(text))
+        self.chunks.append(text)
+
+
+@pytest.fixture
+def clipboard(monkeypatch):
+    copied = []
+    monkeypatch.setattr(voxtarix, "copy_to_clipboard", copied.append)
+    return copied
+
+
+def run_sink(sink, deliveries):
+    done = threading.Event()
+    finished = []
+    sink.start()
+    for i, (text, copy, type_text) in enumerate(deliveries):
+        last = i == len(deliveries) - 1
+        sink.deliver(text, copy, type_text, lambda i=i, last=last: (finished.append(i), last and done.set()))
+    assert done.wait(5)
+    sink.stop()
+    sink.thread.join(5)
+    return finished
+
+
+def test_text_is_routed_to_clipboard_and_keyboard(clipboard):
+    sink = OutputSink(chunk_size=4)
+    sink.typer = RecordingTyper()
+    finished = run_sink(sink, [("copied", True, False), ("typed text", False, True), ("both", True, True),
+                               ("neither", False, False)])
+    assert clipboard == ["copied", "both"]
+    assert sink.typer.chunks == ["type", "d te", "xt", "both"]
+    assert finished == [0, 1, 2, 3]
+
+
+def test_output_errors_do_not_stop_the_sink(monkeypatch):
+    def fail(text):
+        raise RuntimeError("no clipboard")
+
+    monkeypatch.setattr(voxtarix, "copy_to_clipboard", fail)
+    sink = OutputSink()
+    sink.typer = RecordingTyper()
+    assert run_sink(sink, [("lost", True, False), ("typed", False, True)]) == [0, 1]
+    assert sink.typer.chunks == ["typed"]
+
+
+def test_deliver_never_waits_for_typing():
+    sink = OutputSink(chunk_size=8)
+    sink.typer = RecordingTyper(seconds_per_char=0.01)
+    sink.start()
+    start = time.monotonic()
+    for _ in range(5):
+        sink.deliver("x" * 40, False, True)
+    assert time.monotonic() - start < 0.1
+    sink.stop()
+    sink.thread.join(10)
+    assert "".join(sink.typer.chunks) == "x" * 200
+
+
+def test_delay_adapts_to_the_target():
+    sink = OutputSink(delay=0.01, min_delay=0.002, max_delay=0.05)
+    # Typing takes far longer than the delay: the target is not keeping up
+    for _ in range(10):
+        sink.adapt(10, 10 * 0.2)
+    assert sink.delay == 0.05
+    for _ in range(50):
+        sink.adapt(10, 10 * sink.delay)
+    assert sink.delay == 0.002
+
+
+class RecordingSink:
+    def __init__(self):
+        self.deliveries = []
+
+    def deliver(self, text, copy=False, type=False, on_done=None):
+        self.deliveries.append((text, copy, type))
+        if on_done:
+            on_done()
+
+
+@pytest.fixture
+def engine():
+    engine = VoxtarixEngine(language="de")
+    engine.output_sink = RecordingSink()
+    return engine
+
+
+def test_engine_routes_text_by_its_toggles(engine):
+    engine.use_typing, engine.use_clipboard = True, False
+    engine.handle_text("hallo welt", UtteranceTiming())
+    engine.use_typing, engine.use_clipboard = False, True
+    engine.handle_text("noch mehr", UtteranceTiming())
+    engine.use_clipboard = False
+    engine.handle_text("nur gedruckt", UtteranceTiming())
+    assert engine.output_sink.deliveries == [("hallo welt", False, True), ("noch mehr", True, False)]
+
+
+def drain(events):
+    types = []
+    while not events.empty():
+        types.append(json.loads(events.get_nowait())["event"])
+    return types
+
+
+def test_daemon_releases_outputs_when_the_last_client_leaves(engine):
+    daemon = EngineDaemon(engine, "/nonexistent/daemon.sock")
+    events = daemon.subscribe()
+    engine.use_typing = engine.use_clipboard = True
+    daemon.connect()
+    daemon.connect()
+    daemon.disconnect()
+    assert engine.use_typing and engine.use_clipboard
+    daemon.disconnect()
+    assert not engine.use_typing and not engine.use_clipboard
+    assert [(event["type"], event["enabled"]) for event in drain(events)] == [
+        ("TypingStateChangedEvent", False), ("ClipboardStateChangedEvent", False)]
+    # Nothing recognized afterwards reaches an output
+    engine.handle_text("niemand da", UtteranceTiming())
+    assert engine.output_sink.deliveries == []
+    daemon.release_outputs()
+    assert [event["type"] for event in drain(events)] == ["TextRecognizedEvent"]
+
+
+def test_on_demand_daemon_exits_instead(engine):
+    daemon = EngineDaemon(engine, "/nonexistent/daemon.sock", on_demand=True)
+    daemon.EXIT_GRACE = 0.0
+    daemon.connect()
+    assert not daemon.unused()
+    daemon.disconnect()
+    time.sleep(0.01)
+    assert daemon.unused()
@@ -0,0 +1,72 @@
+import os
+import signal
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from voxtarix import ProcessBackend, TranscriptionBackend
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class EchoBackend(TranscriptionBackend):
+    # Answers with what it was sent, so the test sees the arena's contents
+    name = "echo"
+    supports_batching = True
+
+    def transcribe(self, audio, **options):
+        if options.get("fail"):
+            raise ValueError("asked to fail")
+        return {"text": f"{len(audio)} {float(audio.sum()):.1f}", "pid": os.getpid(), "options": options}
+
+
+@pytest.fixture
+def backend():
+    backend = ProcessBackend(EchoBackend, "tiny", "cpu")
+    yield backend
+    backend.close()
+
+
+def test_calls_reach_the_worker(backend):
+    assert backend.describe().startswith("echo (tiny, cpu, auto)")
+    assert backend.supports_batching
+    result = backend.transcribe(np.arange(10, dtype=np.float32), language="de")
+    assert result["text"] == "10 45.0"
+    assert result["pid"] == backend.process.pid != os.getpid()
+    assert result["options"] == {"language": "de"}
+    # Larger than the arena, which grows
+    audio = np.ones(ProcessBackend.ARENA_BYTES // 2, dtype=np.float32)
+    results = backend.transcribe_batch([audio, 2 * audio])
+    assert [result["text"] for result in results] == [f"{len(audio)} {len(audio):.1f}",
+                                                      f"{len(audio)} {2 * len(audio):.1f}"]
+    with pytest.raises(RuntimeError, match="asked to fail"):
+        backend.transcribe(audio, fail=True)
+
+
+def test_dead_worker_is_restarted(backend):
+    pid = backend.process.pid
+    os.kill(pid, signal.SIGKILL)
+    backend.process.join()
+    result = backend.transcribe(np.ones(4, dtype=np.float32))
+    assert result["text"] == "4 4.0"
+    assert result["pid"] != pid
+    assert backend.restarts == 1
+
+
+def test_starts_when_loaded_like_the_applets():
+    # The applets load voxtarix.py from its path instead of importing it
+    probe = f"""
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location("voxtarix", {os.path.join(ROOT, "voxtarix.py")!r})
+module = importlib.util.module_from_spec(spec)
+sys.modules["voxtarix"] = module
+spec.loader.exec_module(module)
+backend = module.ProcessBackend(module.TranscriptionBackend, "tiny", "cpu")
+print(backend.offload())
+backend.close()
+"""
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import numpy as np
+
+from voxtarix import PolyphaseResampler, VoxtarixEngine
+
+SAMPLE_RATE = 16000
+CAPTURE_RATE = 48000
+
+
+def speech(seconds, seed=0, level=0.3):
+    rng = np.random.default_rng(seed)
+    count = int(seconds * CAPTURE_RATE)
+    return (level * rng.uniform(0.5, 1.0, count) * np.sign(rng.standard_normal(count))).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * CAPTURE_RATE), dtype=np.float32)
+
+
+def test_gate_changes_split_the_utterance():
+    engine = VoxtarixEngine()
+    engine.WARMUP_TIME = 0.0
+    engine.CALIBRATION_ENABLED = False
+    engine.SPECULATION_ENABLED = False
+    engine.VAD_METHOD = "amplitude"
+    engine.SILENCE_THRESHOLD = 0.1
+    engine.GAIN = 1.0
+    engine.CAPTURE_RATE = CAPTURE_RATE
+    engine.sources = engine.create_sources()
+    segments = []
+    engine.submit_segment = segments.append
+    [source] = engine.sources
+
+    # Speaking from 0.5 s to 3 s while the hotkey is released from 1.5 s
+    # to 2 s
+    audio = np.concatenate((silence(0.5), speech(2.5), silence(3)))
+    close, reopen = int(1.5 * CAPTURE_RATE), int(2.0 * CAPTURE_RATE)
+    source.gate_changes.extend([(close, False), (reopen, True)])
+    source.ring.write(audio)
+
+    thread = threading.Thread(target=engine.process_audio, args=(source,), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while len(segments) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    engine.should_terminate = True
+    thread.join(timeout=5)
+
+    first, second = segments
+    # Both segments are in the segmenter's stream, which skips the audio
+    # outside the gate
+    gate_position = close * SAMPLE_RATE // CAPTURE_RATE
+    assert first.position + len(first.audio) <= gate_position
+    assert first.position + len(first.audio) > gate_position - 2 * source.segmenter.vad.frame_size
+    assert first.utterance_id != second.utterance_id
+    assert engine.metrics.get("hotkey_endpoints") == 1
+    # The second utterance keeps no pre-roll from before the gate closed,
+    # and is resampled as if capture had started at the reopening
+    fresh = PolyphaseResampler(CAPTURE_RATE, SAMPLE_RATE).process(audio[reopen:])
+    offset = second.position - gate_position
+    assert 0 <= offset <= source.segmenter.vad.onset_frames * source.segmenter.vad.frame_size
+    assert np.array_equal(second.audio, fresh[offset:offset + len(second.audio)])
+    assert abs(offset + len(second.audio) - SAMPLE_RATE) <= source.segmenter.vad.frame_size
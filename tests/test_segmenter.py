@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from voxtarix import AmplitudeVAD, Segmenter, VoxtarixEngine
+
+SAMPLE_RATE = 16000
+BLOCKSIZE = 1024
+
+
+def speech(seconds, seed=0, level=0.3):
+    # Loud noise in 20 ms syllables; every frame is above the VAD threshold
+    rng = np.random.default_rng(seed)
+    return (level * rng.uniform(0.5, 1.0, int(seconds * SAMPLE_RATE))
+            * np.sign(rng.standard_normal(int(seconds * SAMPLE_RATE)))).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def segment(audio, max_segment=10.0, overlap=1.0, capacity=30.0, on_feed=None):
+    engine = VoxtarixEngine()
+    engine.MAX_SEGMENT = max_segment
+    engine.SEGMENT_OVERLAP = overlap
+    engine.UTTERANCE_CAPACITY = capacity
+    segments = []
+    segmenter = Segmenter(engine, segments.append, vad=AmplitudeVAD(SAMPLE_RATE, 0.05))
+    for i in range(0, len(audio), BLOCKSIZE):
+        segmenter.feed(audio[i:i + BLOCKSIZE])
+        if on_feed:
+            on_feed(segmenter)
+    segmenter.flush()
+    return segmenter, segments
+
+
+def test_long_speech_is_cut_with_overlap():
+    audio = np.concatenate((silence(1), speech(95), silence(3)))
+    segmenter, segments = segment(audio)
+    max_samples = 10 * SAMPLE_RATE
+    overlap = SAMPLE_RATE
+    assert len(segments) == segmenter.forced_cuts + 1 >= 10
+    for previous, current in zip(segments, segments[1:]):
+        # Cut in the last third of max_segment
+        assert max_samples * (1 - Segmenter.CUT_SEARCH) <= len(previous.audio) <= max_samples
+        # The next segment repeats the last overlap samples
+        assert current.position == previous.position + len(previous.audio) - overlap
+        assert np.array_equal(current.audio[:overlap], previous.audio[-overlap:])
+        assert current.continuation
+        assert current.utterance_id != previous.utterance_id
+    assert not segments[0].continuation
+    # Together the segments cover the speech, plus the pre-roll before the
+    # onset (which the VAD confirms a few frames in)
+    onset = segments[0].position + segmenter.pre_roll
+    assert SAMPLE_RATE <= onset <= SAMPLE_RATE + segmenter.vad.onset_frames * segmenter.vad.frame_size
+    assert segments[-1].position + len(segments[-1].audio) == 96 * SAMPLE_RATE
+
+
+def test_cut_lands_in_the_quietest_stretch():
+    # A short quiet dip inside the searched last third of the first segment
+    dip = int(8.5 * SAMPLE_RATE)
+    audio = np.concatenate((speech(8.5), 0.01 * speech(0.12, seed=1), speech(10, seed=2), silence(3)))
+    _, segments = segment(audio)
+    end = segments[0].position + len(segments[0].audio)
+    assert dip <= end <= dip + int(0.12 * SAMPLE_RATE)
+
+
+@pytest.mark.parametrize("capacity", [30.0, 2.0])
+def test_buffer_stays_bounded(capacity):
+    audio = np.concatenate((silence(1), speech(120), silence(3)))
+    peaks = {"length": 0, "bytes": 0}
+
+    def on_feed(segmenter):
+        peaks["length"] = max(peaks["length"], len(segmenter.buffer))
+        peaks["bytes"] = max(peaks["bytes"], segmenter.buffer.data.nbytes)
+
+    segmenter, segments = segment(audio, capacity=capacity, on_feed=on_feed)
+    bound = segmenter.max_samples + segmenter.pre_roll + BLOCKSIZE
+    assert len(segments) > 12
+    assert peaks["length"] <= bound
+    # Growth doubles the buffer at most once past what it needs
+    assert peaks["bytes"] <= max(capacity * SAMPLE_RATE, 2 * bound) * 4
+
+
+def test_no_cuts_without_max_segment():
+    audio = np.concatenate((silence(1), speech(40), silence(3)))
+    segmenter, segments = segment(audio, max_segment=0.0)
+    assert segmenter.forced_cuts == 0
+    assert len(segments) == 1
+    assert segments[0].position + len(segments[0].audio) == 41 * SAMPLE_RATE
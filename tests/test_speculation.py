@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from voxtarix import Segment, TranscriptionBackend, UtteranceTiming, VoxtarixEngine
+
+SAMPLE_RATE = 16000
+
+
+class CountingBackend(TranscriptionBackend):
+    name = "counting"
+
+    def __init__(self):
+        super().__init__("fake", "cpu")
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(len(audio))
+        return {"text": f" {len(audio)} samples", "language": "de", "segments": []}
+
+
+@pytest.fixture
+def engine():
+    engine = VoxtarixEngine(language="de")
+    engine.backend = CountingBackend()
+    engine.model_ready.set()
+    engine.texts = []
+    engine.handle_text = lambda text, timing, source=0, continuation=False: engine.texts.append((text, timing))
+    return engine
+
+
+def speculative(audio, utterance_id=1, source=0):
+    segment = Segment(audio, utterance_id, "speculative", 0, 1000, source=source)
+    segment.cancelled = False
+    return segment
+
+
+def final(audio, utterance_id=1, source=0):
+    return Segment(audio, utterance_id, "final", 0, 1000, UtteranceTiming(audio_duration=len(audio) / SAMPLE_RATE),
+                   source)
+
+
+def test_hit_answers_the_final_segment_without_a_decode(engine):
+    audio = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    engine.dispatch(speculative(audio))
+    assert engine.backend.calls == [SAMPLE_RATE]
+    engine.dispatch(final(audio))
+    assert engine.backend.calls == [SAMPLE_RATE]
+    [(text, timing)] = engine.texts
+    assert text == f" {SAMPLE_RATE} samples"
+    assert timing.speculative
+    assert timing.spans()["inference"] is None
+    assert engine.metrics.get("speculation_hits") == 1
+    assert engine.metrics.get("speculation_wasted") == 0
+
+
+def test_final_covering_other_audio_is_decoded_again(engine):
+    audio = np.zeros(2 * SAMPLE_RATE, dtype=np.float32)
+    engine.dispatch(speculative(audio[:SAMPLE_RATE]))
+    # Speech went on after the pause the speculation stopped at
+    engine.dispatch(final(audio))
+    assert engine.backend.calls == [SAMPLE_RATE, 2 * SAMPLE_RATE]
+    [(text, timing)] = engine.texts
+    assert text == f" {2 * SAMPLE_RATE} samples"
+    assert not timing.speculative
+    assert engine.metrics.get("speculation_hits") == 0
+    assert engine.metrics.get("speculation_wasted") == 1
+
+
+def test_cancelled_speculation_is_not_decoded(engine):
+    segment = speculative(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    segment.cancelled = True
+    engine.dispatch(segment)
+    assert engine.backend.calls == []
+    assert engine.sources[0].speculation is None
+    assert engine.metrics.get("speculation_cancelled") == 1
+
+
+def test_speculation_yields_to_waiting_final_segments(engine):
+    engine.CHANNELS = 2
+    engine.CHANNEL_MODE = "split"
+    engine.sources = engine.create_sources()
+    audio = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    # Queued while the model was idle, then another source's utterance ended
+    engine.submit_speculative(speculative(audio))
+    engine.submit_segment(final(audio[:SAMPLE_RATE // 2], utterance_id=7, source=1))
+    engine.dispatch(engine.inference_queue.get_nowait())
+    assert engine.backend.calls == []
+    assert engine.metrics.get("speculation_cancelled") == 1
+    engine.dispatch(engine.inference_queue.get_nowait())
+    assert engine.backend.calls == [SAMPLE_RATE // 2]
+
+
+def test_speculation_only_queued_for_an_idle_model(engine):
+    audio = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    engine.submit_segment(final(audio, utterance_id=7))
+    engine.submit_speculative(speculative(audio))
+    assert engine.inference_queue.qsize() == 1
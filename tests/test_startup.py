@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["torch", "whisper", "faster_whisper", "ctranslate2", "sounddevice", "pynput"]
+# Seconds until an applet's main loop can run, as in bench_startup.py
+TARGET = 1.0
+
+# A fresh interpreter, so modules imported by other tests don't count
+PROBE = """
+import importlib.util, json, queue, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("voxtarix", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+sys.modules["voxtarix"] = module
+spec.loader.exec_module(module)
+engine = module.VoxtarixEngine(language="en", event_queue=queue.Queue())
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "heavy_modules": [name for name in sys.argv[2:] if name in sys.modules],
+}))
+"""
+
+
+def test_engine_builds_quickly_without_inference_libraries():
+    runs = []
+    for _ in range(3):
+        output = subprocess.run([sys.executable, "-c", PROBE, os.path.join(ROOT, "voxtarix.py"), *HEAVY_MODULES],
+                                check=True, capture_output=True, text=True, timeout=60).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    assert [run["heavy_modules"] for run in runs] == [[]] * len(runs)
+    assert min(run["seconds"] for run in runs) < TARGET
@@ -0,0 +1,34 @@
+from voxtarix import normalize_word, stitch_overlap
+
+
+def previous_words(text):
+    return [normalize_word(word) for word in text.split()]
+
+
+def test_drops_repeated_words():
+    previous = previous_words("we met at the station")
+    assert stitch_overlap(previous, "at the station and went home") == "and went home"
+
+
+def test_match_is_case_and_punctuation_insensitive():
+    previous = previous_words("Let's meet, tomorrow.")
+    assert stitch_overlap(previous, "meet tomorrow at noon") == "at noon"
+
+
+def test_skips_garbled_words_at_the_cut():
+    previous = previous_words("the weather is nice today")
+    assert stitch_overlap(previous, "eather is nice today isn't it") == "isn't it"
+    assert stitch_overlap(previous, "x y is nice today isn't it") == "isn't it"
+
+
+def test_single_word_match_needs_no_skip():
+    previous = previous_words("one two three")
+    assert stitch_overlap(previous, "three four") == "four"
+    # A lone word further in is too likely a coincidence
+    assert stitch_overlap(previous, "four three five") == "four three five"
+
+
+def test_unchanged_without_overlap():
+    previous = previous_words("hello there")
+    assert stitch_overlap(previous, "something else entirely") == "something else entirely"
+    assert stitch_overlap([], "hello there") == "hello there"
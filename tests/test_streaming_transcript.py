@@ -0,0 +1,48 @@
+import numpy as np
+
+from voxtarix import Segment, StreamingTranscript
+
+SAMPLE_RATE = 16000
+
+
+def window(utterance_id, offset, seconds=2.0):
+    return Segment(np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32), utterance_id, "partial", offset=offset)
+
+
+def test_commits_words_two_decodes_agree_on():
+    transcript = StreamingTranscript(SAMPLE_RATE)
+    committed, tentative = transcript.update(window(1, 0), [(" Hello", 0.4), (" word", 0.8)])
+    assert committed == ""
+    assert tentative == "Hello word"
+
+    committed, tentative = transcript.update(window(1, 0), [(" hello", 0.4), (" world", 0.9), (" again", 1.3)])
+    # The newer decode supplies the committed spelling
+    assert committed == "hello"
+    assert tentative == "world again"
+    assert transcript.committed_samples == int(0.4 * SAMPLE_RATE)
+
+
+def test_later_windows_drop_already_committed_audio():
+    transcript = StreamingTranscript(SAMPLE_RATE)
+    transcript.update(window(1, 0), [(" one", 0.5), (" two", 1.0)])
+    transcript.update(window(1, 0), [(" one", 0.5), (" two", 1.0), (" three", 1.5)])
+    assert transcript.committed_text() == "one two"
+    assert transcript.committed_samples == SAMPLE_RATE
+
+    # A window cut before the commit reached the segmenter still contains
+    # "two"; it must not be committed a second time
+    offset = SAMPLE_RATE // 2
+    transcript.update(window(1, offset), [(" two", 0.5), (" three", 1.0), (" four", 1.4)])
+    committed, tentative = transcript.update(window(1, offset), [(" three", 1.0), (" four", 1.4)])
+    assert committed == "one two three four"
+    assert tentative == ""
+
+
+def test_new_utterance_starts_over():
+    transcript = StreamingTranscript(SAMPLE_RATE)
+    transcript.update(window(1, 0), [(" a", 0.3)])
+    transcript.update(window(1, 0), [(" a", 0.3)])
+    committed, tentative = transcript.update(window(2, 0), [(" a", 0.3)])
+    assert committed == ""
+    assert tentative == "a"
+    assert transcript.committed_samples == 0
@@ -0,0 +1,95 @@
+import numpy as np
+
+from voxtarix import AmplitudeVAD, EnergyFluxVAD, Segmenter, VoxtarixEngine
+
+SAMPLE_RATE = 16000
+FRAME = 320
+
+
+def frames(pattern, level=0.5, seed=0):
+    # One 20 ms frame of noise per "x", of silence per "."
+    rng = np.random.default_rng(seed)
+    return np.concatenate([
+        (level * rng.uniform(-1, 1, FRAME) if mark == "x" else np.zeros(FRAME)).astype(np.float32)
+        for mark in pattern
+    ])
+
+
+def classify(vad, audio, chunk):
+    raw, smoothed = [], []
+    for i in range(0, len(audio), chunk):
+        _, flags = vad.process(audio[i:i + chunk])
+        raw.extend(vad.raw)
+        smoothed.extend(flags)
+    return np.array(raw), np.array(smoothed)
+
+
+def test_onset_and_hangover_smoothing():
+    vad = AmplitudeVAD(SAMPLE_RATE, 0.1, onset_frames=3, hangover=0.1)
+    assert vad.hangover_frames == 5
+    pattern = "..xx..xxxx.......x........"
+    raw, smoothed = classify(vad, frames(pattern), FRAME)
+    assert "".join("x" if flag else "." for flag in raw) == pattern
+    # Two voiced frames are a click; the third of a run starts speech, which
+    # lasts through hangover_frames silent frames
+    assert "".join("x" if flag else "." for flag in smoothed) == "........xxxxxxx..........."
+    assert not vad.in_speech
+
+
+def test_framing_across_chunk_borders():
+    audio = frames("..xxxx.x...xxx......xxxxx...", seed=3)
+    reference = classify(AmplitudeVAD(SAMPLE_RATE, 0.1), audio, len(audio))
+    for chunk in (1, 100, 333, 1024):
+        raw, smoothed = classify(AmplitudeVAD(SAMPLE_RATE, 0.1), audio, chunk)
+        assert np.array_equal(raw, reference[0])
+        assert np.array_equal(smoothed, reference[1])
+
+
+def test_energy_flux_rejects_quiet_and_stationary_sounds():
+    vad = EnergyFluxVAD(SAMPLE_RATE, energy_threshold=-30.0, flux_threshold=0.05)
+    t = np.arange(50 * FRAME) / SAMPLE_RATE
+    hum = (0.5 * np.sin(2 * np.pi * 250 * t)).astype(np.float32)
+    assert not vad.classify(hum.reshape(-1, FRAME))[1:].any()
+    quiet = frames("x" * 20, level=0.01)
+    assert not vad.classify(quiet.reshape(-1, FRAME)).any()
+    loud = frames("x" * 20, level=0.5)
+    assert vad.classify(loud.reshape(-1, FRAME)).all()
+
+
+def segment(audio, min_voiced=0.25):
+    engine = VoxtarixEngine()
+    engine.VAD_MIN_VOICED = min_voiced
+    engine.MIN_DURATION = 0.0
+    segments = []
+    segmenter = Segmenter(engine, segments.append, vad=AmplitudeVAD(SAMPLE_RATE, 0.1))
+    for i in range(0, len(audio), 1024):
+        segmenter.feed(audio[i:i + 1024])
+    segmenter.flush()
+    return segmenter, segments
+
+
+def test_min_voiced_ignores_the_hangover():
+    # 0.1 s of voiced frames; with the 0.3 s hangover the smoothed flags
+    # cover 0.4 s, more than min_voiced
+    audio = np.concatenate((frames("." * 50), frames("x" * 5), frames("." * 150)))
+    segmenter, segments = segment(audio)
+    assert segments == []
+    assert segmenter.segments_skipped == 1
+
+    audio = np.concatenate((frames("." * 50), frames("x" * 15), frames("." * 150)))
+    segmenter, segments = segment(audio)
+    assert len(segments) == 1
+    assert segmenter.segments_skipped == 0
+
+
+def test_segments_are_trimmed_to_the_voiced_span():
+    speech_start, speech_end = 50 * FRAME, 90 * FRAME
+    audio = np.concatenate((frames("." * 50), frames("x" * 40), frames("." * 150)))
+    segmenter, segments = segment(audio)
+    [result] = segments
+    # Leading silence beyond the pre-roll is dropped; the onset frames may
+    # be inside the pre-roll rather than counted as speech
+    start = result.position + segmenter.pre_roll
+    assert speech_start <= start <= speech_start + segmenter.vad.onset_frames * FRAME
+    # The trailing hangover and silence are not part of the segment
+    assert result.position + len(result.audio) == speech_end
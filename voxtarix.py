@@ -1,256 +1,4289 @@
-import sounddevice as sd
 import numpy as np
-import whisper
 import sys
 import queue
 import threading
 import time
 import argparse
+import base64
 import os
-import pyperclip
 import re
-from pynput import keyboard
+import select
 import json
+import math
 import configparser
+import atexit
+import collections
+import cProfile
+import fcntl
+import functools
+import gc
+import http.server
+import importlib.util
+import multiprocessing
+import multiprocessing.shared_memory
+import resource
+import shutil
+import signal
+import socket
+import socketserver
+import sqlite3
+import subprocess
+import wave
 
 class EngineEvent:
-    pass
+    # Events are small fixed-layout records stamped with time.monotonic()
+    # when they are created.
+    __slots__ = ("timestamp",)
+
+    def __init__(self):
+        self.timestamp = time.monotonic()
+
+    def to_dict(self):
+        # JSON-ready form used by the daemon socket; nested objects such as
+        # UtteranceTiming are flattened with their as_dict()
+        data = {"type": type(self).__name__}
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                value = getattr(self, name)
+                data[name] = value.as_dict() if hasattr(value, "as_dict") else value
+        return data
+
+    @staticmethod
+    def from_dict(data):
+        cls = EVENT_TYPES[data["type"]]
+        event = cls.__new__(cls)
+        for klass in cls.__mro__:
+            for name in klass.__dict__.get("__slots__", ()):
+                setattr(event, name, data.get(name))
+        return event
 
 class ClipboardStateChangedEvent(EngineEvent):
+    __slots__ = ("enabled",)
+
     def __init__(self, enabled):
+        super().__init__()
         self.enabled = enabled
 
 class TypingStateChangedEvent(EngineEvent):
+    __slots__ = ("enabled",)
+
     def __init__(self, enabled):
+        super().__init__()
+        self.enabled = enabled
+
+class MuteStateChangedEvent(EngineEvent):
+    __slots__ = ("enabled",)
+
+    def __init__(self, enabled):
+        super().__init__()
         self.enabled = enabled
 
 class EngineTerminatedEvent(EngineEvent):
-    pass
+    __slots__ = ()
+
+class TextRecognizedEvent(EngineEvent):
+    __slots__ = ("text", "timing", "entry", "source")
+
+    def __init__(self, text, timing=None, entry=None, source=None):
+        super().__init__()
+        self.text = text
+        self.timing = timing
+        # (id, timestamp, text) in the history store, if it was saved
+        self.entry = entry
+        # Name of the capture source the utterance came from
+        self.source = source
+
+class PartialTextEvent(EngineEvent):
+    __slots__ = ("committed", "tentative", "source")
+
+    def __init__(self, committed, tentative, source=None):
+        super().__init__()
+        self.committed = committed
+        self.tentative = tentative
+        self.source = source
+
+    @property
+    def text(self):
+        return " ".join(part for part in (self.committed, self.tentative) if part)
+
+class ModelLoadingEvent(EngineEvent):
+    __slots__ = ("model_name",)
+
+    def __init__(self, model_name):
+        super().__init__()
+        self.model_name = model_name
+
+class ModelReadyEvent(EngineEvent):
+    __slots__ = ("description", "load_seconds")
+
+    def __init__(self, description, load_seconds):
+        super().__init__()
+        self.description = description
+        self.load_seconds = load_seconds
+
+class ModelLoadFailedEvent(EngineEvent):
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+
+class DecodingProfileChangedEvent(EngineEvent):
+    __slots__ = ("profile",)
+
+    def __init__(self, profile):
+        super().__init__()
+        self.profile = profile
+
+class InferenceQueueEvent(EngineEvent):
+    __slots__ = ("depth", "dropped")
+
+    def __init__(self, depth, dropped):
+        super().__init__()
+        self.depth = depth
+        self.dropped = dropped
+
+EVENT_TYPES = {cls.__name__: cls for cls in (
+    ClipboardStateChangedEvent, TypingStateChangedEvent, MuteStateChangedEvent, EngineTerminatedEvent,
+    TextRecognizedEvent, PartialTextEvent, ModelLoadingEvent, ModelReadyEvent, ModelLoadFailedEvent,
+    InferenceQueueEvent, DecodingProfileChangedEvent,
+)}
+
+
+class EventChannel:
+    # Engine -> UI event channel with a wakeup file descriptor (an eventfd,
+    # or a pipe where eventfd is unavailable) that a main loop can watch
+    # instead of polling. Consumers drain all pending events in one batch
+    # when the descriptor becomes readable. put/get/get_nowait mirror
+    # queue.Queue so plain queue consumers keep working.
+    def __init__(self):
+        self.events = collections.deque()
+        if hasattr(os, "eventfd"):
+            self.read_fd = self.write_fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        else:
+            self.read_fd, self.write_fd = os.pipe()
+            os.set_blocking(self.read_fd, False)
+            os.set_blocking(self.write_fd, False)
+
+    def fileno(self):
+        return self.read_fd
+
+    def put(self, event):
+        self.events.append(event)
+        try:
+            if self.read_fd == self.write_fd:
+                os.eventfd_write(self.write_fd, 1)
+            else:
+                os.write(self.write_fd, b"\0")
+        except BlockingIOError:
+            # The descriptor is already readable, the consumer will wake up
+            pass
+
+    def clear_wakeup(self):
+        try:
+            if self.read_fd == self.write_fd:
+                os.eventfd_read(self.read_fd)
+            else:
+                while os.read(self.read_fd, 4096):
+                    pass
+        except BlockingIOError:
+            pass
+
+    def drain(self):
+        # Reset the descriptor before popping so an event put concurrently
+        # either lands in this batch or leaves the descriptor readable.
+        self.clear_wakeup()
+        events = []
+        while True:
+            try:
+                events.append(self.events.popleft())
+            except IndexError:
+                return events
+
+    def get_nowait(self):
+        try:
+            return self.events.popleft()
+        except IndexError:
+            raise queue.Empty
+
+    def get(self, block=True, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self.events.popleft()
+            except IndexError:
+                pass
+            if not block:
+                raise queue.Empty
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise queue.Empty
+            select.select([self.read_fd], [], [], remaining)
+            self.clear_wakeup()
+
+    def empty(self):
+        return not self.events
+
+    def close(self):
+        os.close(self.read_fd)
+        if self.write_fd != self.read_fd:
+            os.close(self.write_fd)
+
+
+class UtteranceTiming:
+    # Monotonic timestamps (time.monotonic()) of one utterance's way through
+    # the pipeline. output_done is filled in after the event was sent.
+    FIELDS = ("capture_start", "speech_end", "endpoint", "inference_start", "inference_end", "output_done")
+
+    def __init__(self, capture_start=None, speech_end=None, endpoint=None, audio_duration=0.0):
+        self.capture_start = capture_start
+        self.speech_end = speech_end
+        self.endpoint = endpoint
+        self.inference_start = None
+        self.inference_end = None
+        self.output_done = None
+        self.audio_duration = audio_duration
+        self.model = None
+        # Decoding profile the utterance was transcribed with
+        self.profile = None
+        # Answered by a decode that ran before the endpoint; its inference
+        # span is only the hand-off and no inference time
+        self.speculative = False
+
+    def span(self, start, end):
+        start, end = getattr(self, start), getattr(self, end)
+        if start is None or end is None:
+            return None
+        return end - start
+
+    def spans(self):
+        return {
+            "endpoint_wait": self.span("speech_end", "endpoint"),
+            "queue_wait": self.span("endpoint", "inference_start"),
+            "inference": None if self.speculative else self.span("inference_start", "inference_end"),
+            "output": self.span("inference_end", "output_done"),
+            "end_to_end": self.span("speech_end", "output_done"),
+        }
+
+    def as_dict(self):
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        data.update(audio_duration=self.audio_duration, model=self.model, profile=self.profile,
+                    speculative=self.speculative, spans=self.spans())
+        return data
+
+    def describe(self):
+        spans = " ".join(f"{name}={value * 1000:.0f}ms" for name, value in self.spans().items() if value is not None)
+        speculative = " speculative" if self.speculative else ""
+        return f"audio={self.audio_duration:.2f}s model={self.model} profile={self.profile}{speculative} {spans}"
+
+
+class Histogram:
+    # Cumulative Prometheus buckets plus a rolling window of recent values
+    # for quantiles that reflect current behaviour rather than the session.
+    def __init__(self, buckets, window=256):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+        self.recent = collections.deque(maxlen=window)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+        self.recent.append(value)
+
+
+class Metrics:
+    # Thread-safe counters, gauges and histograms rendered in the Prometheus
+    # text exposition format.
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0)
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, prefix="voxtarix"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.help = {}
+        # Called before every render to refresh gauges sampled on demand
+        self.collectors = []
+
+    def inc(self, name, value=1, help=None):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            if help:
+                self.help.setdefault(name, help)
+
+    def set(self, name, value, help=None):
+        with self.lock:
+            self.gauges[name] = value
+            if help:
+                self.help.setdefault(name, help)
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, help=None):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+            if help:
+                self.help.setdefault(name, help)
+
+    def get(self, name):
+        with self.lock:
+            return self.counters.get(name, self.gauges.get(name, 0))
+
+    def render(self):
+        for collect in self.collectors:
+            collect()
+        lines = []
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                self._header(lines, f"{name}_total", name, "counter")
+                lines.append(f"{self.prefix}_{name}_total {value}")
+            for name, value in sorted(self.gauges.items()):
+                self._header(lines, name, name, "gauge")
+                lines.append(f"{self.prefix}_{name} {value}")
+            for name, histogram in sorted(self.histograms.items()):
+                self._header(lines, name, name, "histogram")
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{self.prefix}_{name}_bucket{{le="{bound}"}} {count}')
+                lines.append(f'{self.prefix}_{name}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{self.prefix}_{name}_sum {histogram.total}")
+                lines.append(f"{self.prefix}_{name}_count {histogram.count}")
+                if histogram.recent:
+                    recent = np.asarray(histogram.recent)
+                    lines.append(f"# TYPE {self.prefix}_{name}_recent gauge")
+                    for quantile in self.QUANTILES:
+                        lines.append(f'{self.prefix}_{name}_recent{{quantile="{quantile}"}} '
+                                     f"{float(np.quantile(recent, quantile))}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines, exported, name, kind):
+        if name in self.help:
+            lines.append(f"# HELP {self.prefix}_{exported} {self.help[name]}")
+        lines.append(f"# TYPE {self.prefix}_{exported} {kind}")
+
+
+class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix-socket clients have no address
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixMetricsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def start_metrics_server(metrics, host="127.0.0.1", port=0, socket_path=None):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixMetricsServer(socket_path, MetricsRequestHandler)
+        address = socket_path
+    else:
+        server = http.server.ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        server.daemon_threads = True
+        address = f"http://{host}:{server.server_address[1]}/metrics"
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics available at {address}", file=sys.stderr)
+    return server
+
+
+def process_rss(pid="self"):
+    # Current resident memory in bytes; for this process the peak where
+    # /proc is missing, for others 0
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if pid == "self" else 0
+
+
+class ProfilerHook:
+    # Opt-in cProfile of the engine threads. toggle() is meant to be bound
+    # to a signal; each thread calls check() from its loop so it can start
+    # and stop its own profiler, and writes <path>.<thread name> when stopped.
+    def __init__(self, path):
+        self.path = path
+        self.active = False
+        self.profiles = {}
+
+    def toggle(self, *args):
+        self.active = not self.active
+        print(f"Profiling {'started' if self.active else 'stopped'}", file=sys.stderr)
+
+    def check(self):
+        thread = threading.current_thread()
+        profile = self.profiles.get(thread.ident)
+        if self.active and profile is None:
+            profile = self.profiles[thread.ident] = cProfile.Profile()
+            profile.enable()
+        elif not self.active and profile is not None:
+            profile.disable()
+            del self.profiles[thread.ident]
+            path = f"{self.path}.{thread.name}"
+            profile.dump_stats(path)
+            print(f"Wrote profile to {path}", file=sys.stderr)
+
+
+class AudioRingBuffer:
+    # Fixed-capacity float32 ring written in place by the PortAudio callback
+    # (single writer) and read as views by the processing thread (single reader).
+    # Positions are absolute sample counts, so the writer never has to touch
+    # reader state and vice versa.
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=np.float32)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.overruns = 0
+        self.data_available = threading.Event()
+
+    def write(self, samples, gain=1.0):
+        # Called from the audio thread: no allocations, only in-place ufuncs
+        # on slices of the preallocated buffer.
+        count = len(samples)
+        if count > self.capacity:
+            samples = samples[count - self.capacity:]
+            count = self.capacity
+        start = self.write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self._store(samples[:first], self.buffer[start:start + first], gain)
+        if first < count:
+            self._store(samples[first:], self.buffer[:count - first], gain)
+        self.write_pos += count
+        self.data_available.set()
+
+    @staticmethod
+    def _store(src, dst, gain):
+        np.multiply(src, gain, out=dst)
+        np.clip(dst, -1.0, 1.0, out=dst)
+
+    def available(self):
+        return self.write_pos - self.read_pos
+
+    def read(self, max_samples):
+        # Returns a zero-copy view of at most max_samples contiguous samples, or
+        # None if nothing is buffered. The view stays valid until the writer
+        # laps the reader, so consumers must use it before the next read.
+        available = self.write_pos - self.read_pos
+        if available > self.capacity:
+            self.overruns += available - self.capacity
+            self.read_pos = self.write_pos - self.capacity
+            available = self.capacity
+        if available <= 0:
+            return None
+        start = self.read_pos % self.capacity
+        count = min(available, max_samples, self.capacity - start)
+        self.read_pos += count
+        return self.buffer[start:start + count]
+
+    def wait(self, timeout):
+        self.data_available.clear()
+        if self.write_pos > self.read_pos:
+            return True
+        return self.data_available.wait(timeout)
+
+    def skip(self):
+        self.read_pos = self.write_pos
+
+
+class UtteranceBuffer:
+    # Preallocated, amortized-growth buffer for the utterance being segmented.
+    # Appending copies only the new chunk; view() hands out the filled prefix
+    # without copying.
+    def __init__(self, capacity):
+        self.data = np.empty(max(int(capacity), 1), dtype=np.float32)
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, samples):
+        end = self.length + len(samples)
+        if end > len(self.data):
+            grown = np.empty(max(end, 2 * len(self.data)), dtype=np.float32)
+            grown[:self.length] = self.data[:self.length]
+            self.data = grown
+        self.data[self.length:end] = samples
+        self.length = end
+
+    def view(self):
+        return self.data[:self.length]
+
+    def keep_last(self, samples):
+        samples = min(samples, self.length)
+        self.data[:samples] = self.data[self.length - samples:self.length]
+        self.length = samples
+
+    def clear(self):
+        self.length = 0
+
+
+class LogMelFeatures:
+    # Whisper's log-mel spectrogram (400-sample periodic Hann windows every
+    # 160 samples, power spectrum through the model's mel filterbank,
+    # log10), computed frame by frame while an utterance is captured so only
+    # the frames touching its edges are left for the endpoint. Frames are
+    # anchored at the utterance start; frame k is centred on sample 160 * k.
+    N_FFT = 400
+    HOP = 160
+
+    def __init__(self, filters, capacity):
+        self.filters_t = np.ascontiguousarray(filters.T, dtype=np.float32)
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.N_FFT) / self.N_FFT)).astype(np.float32)
+        self.frames = np.empty((max(int(capacity) // self.HOP, 16), filters.shape[0]), dtype=np.float32)
+        self.anchor = None
+        # Frames 0 and 1 reach before the anchor and are left to finish()
+        self.next = 2
+
+    def start(self, anchor):
+        self.anchor = anchor
+        self.next = 2
+
+    def reset(self):
+        self.anchor = None
+
+    def compute(self, signal, count):
+        # count frames whose windows start at signal[0], signal[HOP], ...
+        windows = np.lib.stride_tricks.sliding_window_view(signal[:(count - 1) * self.HOP + self.N_FFT],
+                                                           self.N_FFT)[::self.HOP]
+        spectrum = np.fft.rfft(windows * self.window, axis=1)
+        power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+        return np.log10(np.maximum(power @ self.filters_t, 1e-10))
+
+    def update(self, buffer):
+        # Every frame whose window now lies inside the captured audio
+        if self.anchor is None:
+            return
+        available = (len(buffer) - self.anchor - self.N_FFT // 2) // self.HOP + 1
+        if available <= self.next:
+            return
+        if available > len(self.frames):
+            grown = np.empty((max(available, 2 * len(self.frames)), self.frames.shape[1]), dtype=np.float32)
+            grown[:self.next] = self.frames[:self.next]
+            self.frames = grown
+        first = self.anchor + self.next * self.HOP - self.N_FFT // 2
+        self.frames[self.next:available] = self.compute(buffer[first:], available - self.next)
+        self.next = available
+
+    def finish(self, buffer, offset, end):
+        # Normalized features of buffer[offset:end] as whisper.transcribe()
+        # computes them (the audio followed by zeros, reflected at the
+        # start), one column per 160 samples of content. None if the audio
+        # doesn't start at the anchor.
+        if self.anchor is None or offset != self.anchor or end - offset < self.N_FFT:
+            return None
+        length = end - offset
+        content = length // self.HOP
+        # Frames that see any audio; later ones are all zeros (log10 floor)
+        total = (length + self.N_FFT // 2 - 1) // self.HOP + 1
+        # Frames computed during capture whose window ends before end
+        exact = max(2, min(self.next, (length - self.N_FFT // 2) // self.HOP + 1))
+        half = self.N_FFT // 2
+        audio = buffer[offset:end]
+        zeros = np.zeros(self.N_FFT, dtype=np.float32)
+        frames = np.empty((total, self.frames.shape[1]), dtype=np.float32)
+        # Only the edges are padded: the start reflected, the end with zeros
+        head = np.concatenate((audio[1:half + 1][::-1], audio[:self.HOP + half], zeros))
+        frames[:2] = self.compute(head, 2)
+        frames[2:exact] = self.frames[2:exact]
+        if total > exact:
+            frames[exact:] = self.compute(np.concatenate((audio[exact * self.HOP - half:], zeros)), total - exact)
+        log_spec = np.maximum(frames[:content], max(frames.max(), -10.0) - 8.0)
+        return np.ascontiguousarray(((log_spec + 4.0) / 4.0).T)
+
+
+class PolyphaseResampler:
+    # Streaming rational resampler (up by L, down by M) with a Kaiser-windowed
+    # sinc prototype split into L phases of equal length. Input history is
+    # carried across calls, and every output sample accumulates its taps one
+    # at a time in a fixed order, so the output is bit-identical however
+    # the input is split into blocks.
+    def __init__(self, source_rate, target_rate, zero_crossings=8, rolloff=0.9, beta=8.0):
+        source_rate, target_rate = int(source_rate), int(target_rate)
+        divisor = math.gcd(source_rate, target_rate)
+        self.up = target_rate // divisor
+        self.down = source_rate // divisor
+        self.passthrough = self.up == self.down
+        # Cutoff of the prototype (which runs at up * source_rate) in cycles
+        # per sample: the lower Nyquist frequency, less some room for rolloff
+        cutoff = rolloff * 0.5 / max(self.up, self.down)
+        half_width = int(math.ceil(zero_crossings / (2 * cutoff)))
+        self.taps = int(math.ceil((2 * half_width + 1) / self.up))
+        length = self.taps * self.up
+        t = np.arange(length) - (length - 1) / 2.0
+        prototype = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(length, beta) * self.up
+        # phases[r, m] weighs input sample q - m for an output with phase r
+        self.phases = prototype.reshape(self.taps, self.up).T.copy()
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.consumed = 0
+        self.produced = 0
+        self.tap_offsets = np.arange(self.taps)[:, None]
+
+    def reset(self):
+        # Forgets the input history, e.g. when the next block does not
+        # continue the last one
+        self.history[:] = 0
+        self.consumed = 0
+        self.produced = 0
+
+    def process(self, block):
+        if self.passthrough:
+            return np.asarray(block, dtype=np.float32)
+        buffer = np.concatenate((self.history, block))
+        # Absolute input index of buffer[0]
+        base = self.consumed - (self.taps - 1)
+        self.consumed += len(block)
+        # Every output whose newest input sample has arrived, i.e. all n
+        # with n * down // up < consumed
+        end = -(-self.consumed * self.up // self.down)
+        outputs = np.arange(self.produced, end, dtype=np.int64)
+        self.produced = max(self.produced, end)
+        self.history = buffer[len(buffer) - (self.taps - 1):].copy()
+        if not len(outputs):
+            return np.zeros(0, dtype=np.float32)
+        position = outputs * self.down
+        newest = position // self.up - base
+        if self.up == 1:
+            # Integer decimation: one phase, and the window of each tap is
+            # a strided view of the buffer
+            start, stop = newest[0], newest[-1] + 1
+            result = buffer[start:stop:self.down] * self.phases[0, 0]
+            for m in range(1, self.taps):
+                result += buffer[start - m:stop - m:self.down] * self.phases[0, m]
+            return result.astype(np.float32)
+        windows = buffer[newest[None, :] - self.tap_offsets]
+        coefficients = self.phases[position % self.up].T
+        result = windows[0] * coefficients[0]
+        for m in range(1, self.taps):
+            result += windows[m] * coefficients[m]
+        return result.astype(np.float32)
+
+
+def resample(audio, source_rate, target_rate):
+    # One-shot resampling of a complete signal
+    return PolyphaseResampler(source_rate, target_rate).process(audio)
+
+
+class AudioSource:
+    # One capture source: a channel of an input device, or the mix of all of
+    # its channels. Every source has its own ring buffer, segmentation
+    # thread and streaming state; only inference is shared. The ring holds
+    # audio at the device's rate, which the segmentation thread resamples
+    # to the engine's rate.
+    def __init__(self, index, name, device=None, channel=0, ring_capacity=160000, blocksize=1024,
+                 rate=16000, target_rate=16000, gain=1.0, mix_channels=None):
+        self.index = index
+        self.name = name
+        self.device = device
+        # Column of the device's input block, or None to mix the first
+        # mix_channels channels (all of them by default)
+        self.channel = channel
+        self.mix_channels = mix_channels
+        self.rate = rate
+        self.blocksize = blocksize
+        # Applied by the audio thread, updated by the calibration
+        self.gain = gain
+        self.resampler = PolyphaseResampler(rate, target_rate)
+        self.ring = AudioRingBuffer(ring_capacity)
+        self.mix = np.zeros(blocksize, dtype=np.float32) if channel is None else None
+        self.segmenter = None
+        self.stream_transcript = None
+        self.partial_pending = False
+        # Last decoded speculative segment, until a final segment uses it
+        self.speculation = None
+        # Normalized last words of the latest text, to stitch the next
+        # segment after a forced cut
+        self.last_words = []
+        # Whether audio reaches segmentation (push-to-talk), and pending
+        # (ring position, open) changes from the hotkey listener
+        self.gate_open = True
+        self.gate_changes = collections.deque()
+        self.thread = None
+
+    def gate(self, chunk, start):
+        # Splits a chunk read from ring position start where the gate
+        # changed; returns (samples, open) pieces
+        pieces = []
+        while self.gate_changes and self.gate_changes[0][0] < start + len(chunk):
+            position, gate_open = self.gate_changes.popleft()
+            cut = max(0, position - start)
+            if cut:
+                pieces.append((chunk[:cut], self.gate_open))
+                chunk, start = chunk[cut:], start + cut
+            self.gate_open = gate_open
+        if len(chunk):
+            pieces.append((chunk, self.gate_open))
+        return pieces
+
+    def capture(self, indata, gain):
+        # Called from the audio thread
+        if self.channel is None:
+            frames = len(indata)
+            if frames > len(self.mix):
+                self.mix = np.zeros(frames, dtype=np.float32)
+            mix = self.mix[:frames]
+            np.mean(indata[:, :self.mix_channels], axis=1, out=mix)
+            self.ring.write(mix, gain)
+        else:
+            self.ring.write(indata[:, self.channel], gain)
+
+
+def parse_device(value):
+    value = value.strip()
+    return int(value) if value.isdigit() else value
+
+
+class Segment:
+    def __init__(self, audio, utterance_id=0, kind="final", offset=0, position=0, timing=None, source=0,
+                 features=None, continuation=False):
+        self.audio = audio
+        # The audio starts with the overlap of a forced cut, whose words the
+        # previous segment of the source already ended with
+        self.continuation = continuation
+        # Precomputed log-mel features of audio, if the backend takes them
+        self.features = features
+        self.timing = timing
+        self.utterance_id = utterance_id
+        self.kind = kind
+        # Index of the AudioSource the audio was captured from
+        self.source = source
+        # Position of audio[0] within the utterance and within the whole
+        # stream, in samples
+        self.offset = offset
+        self.position = position
+        self.enqueued_at = time.monotonic()
+
+
+def normalize_word(word):
+    return re.sub(r"[^\w']+", "", word).lower()
+
+
+def stitch_overlap(previous, text, max_skip=2):
+    # Drops the words at the start of text that repeat the end of previous
+    # (normalized words of the segment before a forced cut). The first
+    # words of text may be garbled where the overlap cut into a word, so
+    # the match may start up to max_skip words in, if it is longer than a
+    # single word. Returns text unchanged if nothing matches.
+    words = text.split()
+    normalized = [normalize_word(word) for word in words]
+    best_end = 0
+    for skip in range(min(max_skip, len(words)) + 1):
+        for length in range(min(len(previous), len(words) - skip), 1 if skip else 0, -1):
+            if normalized[skip:skip + length] == previous[-length:] and skip + length > best_end:
+                best_end = skip + length
+                break
+    return " ".join(words[best_end:])
+
+
+class StreamingTranscript:
+    # Local-agreement commit policy for streaming partials: a word is
+    # committed once two consecutive decodes of the growing window agree on
+    # it. Committed audio is reported back to the segmenter so later windows
+    # start after the last committed word.
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.reset(None)
+
+    def reset(self, utterance_id):
+        self.utterance_id = utterance_id
+        self.committed_words = []
+        self.previous_words = []
+        self.committed_samples = 0
+
+    def update(self, segment, words):
+        # words: list of (text, end_seconds) relative to segment.audio
+        if segment.utterance_id != self.utterance_id:
+            self.reset(segment.utterance_id)
+        if segment.offset < self.committed_samples:
+            # Window was cut before the previous commit reached the segmenter;
+            # drop words that fall into already committed audio.
+            skip = (self.committed_samples - segment.offset) / self.sample_rate
+            words = [w for w in words if w[1] > skip]
+
+        agreed = 0
+        for (word, _), (previous, _) in zip(words, self.previous_words):
+            if normalize_word(word) != normalize_word(previous):
+                break
+            agreed += 1
+
+        if agreed:
+            self.committed_words.extend(word for word, _ in words[:agreed])
+            end = segment.offset + int(words[agreed - 1][1] * self.sample_rate)
+            self.committed_samples = max(self.committed_samples, end)
+        self.previous_words = words[agreed:]
+        return self.committed_text(), "".join(word for word, _ in self.previous_words).strip()
+
+    def committed_text(self):
+        return "".join(self.committed_words).strip()
+
+
+class VoiceActivityDetector:
+    # Frame-level speech/non-speech decisions. Subclasses classify whole
+    # frames at once; this base class handles framing across chunk borders
+    # and onset/hangover smoothing so isolated clicks never start a segment.
+    def __init__(self, sample_rate, frame_ms=20, onset_frames=3, hangover=0.3):
+        self.frame_size = max(1, int(sample_rate * frame_ms / 1000))
+        self.onset_frames = max(1, onset_frames)
+        self.hangover_frames = int(hangover * sample_rate / self.frame_size)
+        self.pending = np.empty(self.frame_size, dtype=np.float32)
+        self.pending_length = 0
+        # Frames completed by the last chunk, e.g. for level statistics, and
+        # their unsmoothed decisions; the smoothed flags stay set through
+        # the hangover, so only these tell how much was actually voiced
+        self.frames = np.zeros((0, self.frame_size), dtype=np.float32)
+        self.raw = np.zeros(0, dtype=bool)
+        # Absolute position (in samples) of the next frame to be classified
+        self.position = 0
+        self.in_speech = False
+        self.run_length = 0
+        self.silent_frames = 0
+
+    def reset(self):
+        # Starts over from silence when the next chunk does not continue the
+        # last one. The unfinished frame is dropped, but still counts
+        # towards position, which follows the samples fed in.
+        self.position += self.pending_length
+        self.pending_length = 0
+        self.in_speech = False
+        self.run_length = 0
+        self.silent_frames = 0
+
+    def process(self, chunk):
+        # Returns (position of the first frame, smoothed flags per frame)
+        # for every frame completed by this chunk.
+        if self.pending_length:
+            chunk = np.concatenate((self.pending[:self.pending_length], chunk))
+        count = len(chunk) // self.frame_size
+        rest = len(chunk) - count * self.frame_size
+        self.pending[:rest] = chunk[len(chunk) - rest:]
+        self.pending_length = rest
+        first_position = self.position
+        frames = chunk[:count * self.frame_size].reshape(count, self.frame_size)
+        self.frames = frames
+        if not count:
+            self.raw = np.zeros(0, dtype=bool)
+            return first_position, self.raw
+        self.position += count * self.frame_size
+        self.raw = self.classify(frames)
+        return first_position, self.smooth(self.raw)
+
+    def classify(self, frames):
+        raise NotImplementedError
+
+    def smooth(self, raw):
+        flags = np.empty(len(raw), dtype=bool)
+        for i, voiced in enumerate(raw):
+            if voiced:
+                self.run_length += 1
+                self.silent_frames = 0
+                if self.run_length >= self.onset_frames:
+                    self.in_speech = True
+            else:
+                self.run_length = 0
+                if self.in_speech:
+                    self.silent_frames += 1
+                    if self.silent_frames > self.hangover_frames:
+                        self.in_speech = False
+            flags[i] = self.in_speech
+        return flags
+
+
+class AmplitudeVAD(VoiceActivityDetector):
+    # Legacy rule: any sample above the threshold marks the frame as speech
+    def __init__(self, sample_rate, threshold, **kwargs):
+        super().__init__(sample_rate, **kwargs)
+        self.threshold = threshold
+
+    def classify(self, frames):
+        return np.max(np.abs(frames), axis=1) >= self.threshold
+
+
+class EnergyFluxVAD(VoiceActivityDetector):
+    # Frame energy gates speech, positive spectral flux rejects stationary
+    # sounds (hum, fans, tones) that are loud but not changing like speech.
+    def __init__(self, sample_rate, energy_threshold=-30.0, flux_threshold=0.05, **kwargs):
+        super().__init__(sample_rate, **kwargs)
+        self.energy_threshold = energy_threshold
+        self.flux_threshold = flux_threshold
+        self.window = np.hanning(self.frame_size).astype(np.float32)
+        self.previous_spectrum = None
+
+    def reset(self):
+        super().reset()
+        self.previous_spectrum = None
+
+    def classify(self, frames):
+        energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+        spectrum = np.abs(np.fft.rfft(frames * self.window, axis=1))
+        previous = np.empty_like(spectrum)
+        previous[1:] = spectrum[:-1]
+        previous[0] = spectrum[0] if self.previous_spectrum is None else self.previous_spectrum
+        self.previous_spectrum = spectrum[-1]
+        flux = np.sum(np.maximum(spectrum - previous, 0.0), axis=1) / (np.sum(spectrum, axis=1) + 1e-10)
+        return (energy_db >= self.energy_threshold) & (flux >= self.flux_threshold)
+
+
+def create_vad(engine):
+    options = dict(frame_ms=engine.VAD_FRAME_MS, onset_frames=engine.VAD_ONSET_FRAMES, hangover=engine.VAD_HANGOVER)
+    if engine.VAD_METHOD == "amplitude":
+        return AmplitudeVAD(engine.SAMPLE_RATE, engine.SILENCE_THRESHOLD, **options)
+    if engine.VAD_METHOD != "energy_flux":
+        print(f"Unknown VAD method '{engine.VAD_METHOD}', using energy_flux", file=sys.stderr)
+    return EnergyFluxVAD(engine.SAMPLE_RATE, engine.VAD_ENERGY_THRESHOLD, engine.VAD_FLUX_THRESHOLD, **options)
+
+
+class NoiseFloorTracker:
+    # Running noise floor and speech level of a source, kept as
+    # exponentially decaying histograms of frame levels so a percentile
+    # costs a fixed number of bins rather than a window of past frames.
+    # Levels are dBFS before gain. The noise floor is a low percentile of
+    # all frames, which holds as long as speech fills less than most of the
+    # recent past; the speech level is the median of the frames the VAD
+    # took for speech. The VAD threshold follows margin_db above the noise,
+    # and the gain slowly moves speech towards target_level while keeping
+    # the noise margin_db below it.
+    FLOOR = -100.0
+    NOISE_PERCENTILE = 0.2
+    SPEECH_PERCENTILE = 0.5
+    # Seconds of frames needed before the noise floor, or of speech frames
+    # before the speech level, is trusted
+    MIN_NOISE = 0.5
+    MIN_SPEECH = 2.0
+    # The threshold stays this far below speech and above the noise floor
+    SPEECH_HEADROOM = 6.0
+    MIN_MARGIN = 3.0
+    # Peak over RMS of a noise frame, for the amplitude VAD's threshold
+    CREST = 10.0
+    # Largest gain change per second of audio, in dB
+    GAIN_SLEW = 6.0
+
+    def __init__(self, sample_rate, frame_size, gain, margin_db=10.0, target_level=-20.0, min_gain=1.0,
+                 max_gain=32.0, noise_window=10.0, speech_window=30.0):
+        self.frame_seconds = frame_size / sample_rate
+        self.frame_size = frame_size
+        self.margin_db = margin_db
+        self.target_level = target_level
+        self.gain_range = (20.0 * np.log10(min_gain), 20.0 * np.log10(max_gain))
+        self.gain_db = float(np.clip(20.0 * np.log10(gain), *self.gain_range))
+        self.gain = 10.0 ** (self.gain_db / 20.0)
+        self.noise_window = noise_window
+        self.speech_window = speech_window
+        # One bin per dB from FLOOR to 0 dBFS
+        self.noise_histogram = np.zeros(int(-self.FLOOR) + 1)
+        self.speech_histogram = np.zeros(int(-self.FLOOR) + 1)
+        self.noise_floor = None
+        self.speech_level = None
+        # Post-gain dBFS the VAD gates on, None until the noise floor is known
+        self.threshold = None
+
+    def observe(self, chunk):
+        # Audio without VAD decisions, e.g. while the microphone warms up
+        count = len(chunk) // self.frame_size
+        if count:
+            frames = chunk[:count * self.frame_size].reshape(count, self.frame_size)
+            self.update(frames, np.zeros(count, dtype=bool))
+
+    def update(self, frames, voiced):
+        # frames were captured with the current gain
+        if not len(frames):
+            return
+        levels = 10.0 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=1) + 1e-10) - self.gain_db
+        bins = np.clip(levels - self.FLOOR, 0, len(self.noise_histogram) - 1).astype(int)
+        seconds = len(frames) * self.frame_seconds
+        self.noise_histogram *= np.exp(-seconds / self.noise_window)
+        np.add.at(self.noise_histogram, bins, 1.0)
+        self.speech_histogram *= np.exp(-seconds / self.speech_window)
+        np.add.at(self.speech_histogram, bins[voiced], 1.0)
+
+        self.noise_floor = self.percentile(self.noise_histogram, self.NOISE_PERCENTILE, self.MIN_NOISE)
+        self.speech_level = self.percentile(self.speech_histogram, self.SPEECH_PERCENTILE, self.MIN_SPEECH)
+        target = self.gain_db
+        if self.speech_level is not None:
+            target = self.target_level - self.speech_level
+        if self.noise_floor is not None:
+            target = min(target, self.target_level - self.margin_db - self.noise_floor)
+        if target != self.gain_db:
+            step = self.GAIN_SLEW * seconds
+            target = np.clip(target, *self.gain_range)
+            self.gain_db += float(np.clip(target - self.gain_db, -step, step))
+            self.gain = 10.0 ** (self.gain_db / 20.0)
+        if self.noise_floor is not None:
+            threshold = self.noise_floor + self.margin_db
+            if self.speech_level is not None:
+                threshold = min(threshold, self.speech_level - self.SPEECH_HEADROOM)
+            self.threshold = max(threshold, self.noise_floor + self.MIN_MARGIN) + self.gain_db
+
+    def percentile(self, histogram, fraction, min_seconds):
+        total = histogram.sum()
+        if total * self.frame_seconds < min_seconds:
+            return None
+        return self.FLOOR + float(np.searchsorted(np.cumsum(histogram), fraction * total))
+
+    def apply(self, vad):
+        if self.threshold is None:
+            return
+        if isinstance(vad, EnergyFluxVAD):
+            vad.energy_threshold = self.threshold
+        elif isinstance(vad, AmplitudeVAD):
+            vad.threshold = min(1.0, 10.0 ** ((self.threshold + self.CREST) / 20.0))
+
+    def describe(self):
+        def level(value):
+            return "-" if value is None else f"{value:.0f} dBFS"
+        threshold = "-" if self.threshold is None else f"{self.threshold:.0f} dB"
+        return (f"noise {level(self.noise_floor)}, speech {level(self.speech_level)}, gain {self.gain:.1f}, "
+                f"threshold {threshold}")
+
+
+class EndpointCounter:
+    # Counts the segments a VAD would give under the Segmenter's rules
+    # (minimum speech, ending silence, forced cuts) without buffering audio.
+    # Fed with the fixed thresholds next to a calibrated VAD, it tells how
+    # many inference runs the calibration avoided.
+    def __init__(self, vad, silence_limit, min_voiced, min_samples, pre_roll=0, max_samples=0, overlap=0):
+        self.vad = vad
+        self.silence_limit = silence_limit
+        self.min_voiced = min_voiced
+        self.min_samples = min_samples
+        self.pre_roll = pre_roll
+        self.max_samples = max_samples
+        self.overlap = overlap
+        self.speech_started = False
+        # Samples since the start of the utterance, up to its last speech
+        # frame and of speech frames
+        self.length = 0
+        self.speech_length = 0
+        self.voiced = 0
+        self.segments = 0
+        self.samples = 0
+
+    def feed(self, chunk):
+        # Returns the number of segments completed by the chunk
+        _, flags = self.vad.process(chunk)
+        frame_size = self.vad.frame_size
+        completed = 0
+        for voiced in flags & self.vad.raw:
+            if not self.speech_started:
+                if not voiced:
+                    continue
+                self.speech_started = True
+                self.length = self.speech_length = 0
+                self.voiced = (self.vad.onset_frames - 1) * frame_size
+            self.length += frame_size
+            if voiced:
+                self.voiced += frame_size
+                self.speech_length = self.length
+            if self.max_samples and self.length > self.max_samples:
+                completed += 1
+                self.samples += self.length
+                self.length = self.speech_length = self.overlap
+                self.voiced = 0
+            elif self.length - self.speech_length >= self.silence_limit:
+                if self.voiced >= self.min_voiced and self.speech_length + self.pre_roll >= self.min_samples:
+                    completed += 1
+                    self.samples += self.speech_length + self.pre_roll
+                self.speech_started = False
+        self.segments += completed
+        return completed
+
+
+class Segmenter:
+    # Splits a stream of audio chunks into utterances. It only decides where
+    # utterances start and end; finished utterances are trimmed to their
+    # voiced span (plus pre-roll), copied out of the working buffer and
+    # handed to on_segment. With on_speculative, a shorter pause already
+    # hands out the utterance as it would end there, so it can be decoded
+    # while the endpoint is still being waited for. Speech running past
+    # max_segment is cut at its quietest point and continues in a new
+    # segment that repeats the last overlap samples, so no utterance (and
+    # no buffer) grows without bound. With a NoiseFloorTracker the VAD's
+    # threshold follows the noise floor, while a second VAD with the fixed
+    # thresholds counts the segments those would have given.
+    # Fraction at the end of a too long segment searched for the cut
+    CUT_SEARCH = 1 / 3
+    # Length of the quiet stretch a cut is centred in, in seconds
+    CUT_WINDOW = 0.1
+
+    def __init__(self, engine, on_segment, on_partial=None, vad=None, source=0, on_speculative=None,
+                 overlap=None, calibration=None, on_onset=None):
+        self.on_segment = on_segment
+        self.on_partial = on_partial
+        self.on_speculative = on_speculative
+        # Called when speech starts, before anything is decided about it
+        self.on_onset = on_onset
+        self.source = source
+        self.vad = vad or create_vad(engine)
+        self.sample_rate = engine.SAMPLE_RATE
+        self.metrics = getattr(engine, "metrics", None)
+        self.partial_interval = int(engine.STREAMING_INTERVAL * engine.SAMPLE_RATE)
+        self.partial_window = int(engine.STREAMING_WINDOW * engine.SAMPLE_RATE)
+        self.silence_limit = int(engine.SILENCE_DURATION * engine.SAMPLE_RATE)
+        self.speculation_limit = int(engine.SPECULATION_PAUSE * engine.SAMPLE_RATE)
+        self.max_samples = int(engine.MAX_SEGMENT * engine.SAMPLE_RATE)
+        overlap = engine.SEGMENT_OVERLAP if overlap is None else overlap
+        self.overlap = min(int(overlap * engine.SAMPLE_RATE), self.max_samples // 4)
+        self.min_samples = int(engine.MIN_DURATION * engine.SAMPLE_RATE)
+        self.min_voiced = int(engine.VAD_MIN_VOICED * engine.SAMPLE_RATE)
+        self.pre_roll = int(engine.VAD_PRE_ROLL * engine.SAMPLE_RATE)
+        self.buffer = UtteranceBuffer(engine.UTTERANCE_CAPACITY * engine.SAMPLE_RATE)
+        # Absolute stream position of the end of the buffer
+        self.stream_position = 0
+        self.silence_samples = 0
+        self.speech_started = False
+        self.speech_start = 0
+        self.speech_end = 0
+        self.voiced_samples = 0
+        self.segments_skipped = 0
+        self.utterance_id = 0
+        self.committed_samples = 0
+        self.samples_since_partial = 0
+        # The speculative segment handed out during the current pause
+        self.speculation = None
+        # LogMelFeatures, set by the engine once the backend takes features
+        self.features = None
+        # Whether the current utterance continues a forced cut
+        self.continuation = False
+        self.forced_cuts = 0
+        self.segments_emitted = 0
+        self.samples_emitted = 0
+        self.calibration = calibration
+        self.baseline = None
+        if calibration is not None:
+            self.static_gain = engine.GAIN
+            self.baseline = EndpointCounter(create_vad(engine), self.silence_limit, self.min_voiced,
+                                            self.min_samples, self.pre_roll, self.max_samples, self.overlap)
+            self.reported = None
+        self.commit_lock = threading.Lock()
+
+    def feed(self, chunk):
+        first_position, flags = self.vad.process(chunk)
+        if self.calibration is not None:
+            self.calibrate(chunk, flags)
+        self.buffer.append(chunk)
+        self.stream_position += len(chunk)
+
+        # Frames inside speech that are voiced themselves: hangover frames
+        # neither extend the utterance nor count towards min_voiced
+        voiced = np.flatnonzero(flags & self.vad.raw)
+        if len(voiced):
+            frame_size = self.vad.frame_size
+            # Buffer offset of the first frame classified in this call
+            base = len(self.buffer) - (self.stream_position - first_position)
+            if not self.speech_started:
+                self.speech_started = True
+                self.speech_start = max(0, base + voiced[0] * frame_size)
+                # The frames that confirmed the onset were voiced too
+                self.voiced_samples = (self.vad.onset_frames - 1) * frame_size
+                if self.features is not None:
+                    self.features.start(max(0, self.speech_start - self.pre_roll))
+                if self.on_onset:
+                    self.on_onset()
+            self.speech_end = base + (voiced[-1] + 1) * frame_size
+            self.voiced_samples += len(voiced) * frame_size
+            self.silence_samples = len(self.buffer) - self.speech_end
+            if self.speculation is not None:
+                # Speech resumed: the speculative audio ends too early
+                self.speculation.cancelled = True
+                self.speculation = None
+        else:
+            self.silence_samples += len(chunk)
+
+        if not self.speech_started:
+            # Only the pre-roll is kept while waiting for speech
+            if len(self.buffer) > 2 * self.pre_roll + len(chunk):
+                self.buffer.keep_last(self.pre_roll)
+            return
+
+        if self.features is not None:
+            self.features.update(self.buffer.view())
+
+        if self.max_samples and len(self.buffer) - max(0, self.speech_start - self.pre_roll) > self.max_samples:
+            self.cut()
+
+        self.check_endpoint()
+
+        if self.on_partial and self.speech_started:
+            self.samples_since_partial += len(chunk)
+            if self.samples_since_partial >= self.partial_interval:
+                self.samples_since_partial = 0
+                self.emit_partial()
+
+    def feed_silence(self, samples):
+        self.silence_samples += samples
+        self.check_endpoint()
+
+    def check_endpoint(self):
+        if not self.speech_started:
+            return
+        start = max(0, self.speech_start - self.pre_roll)
+        too_short = self.voiced_samples < self.min_voiced or self.speech_end - start < self.min_samples
+        if self.silence_samples < self.silence_limit:
+            if (self.on_speculative and self.speculation is None and not too_short
+                    and self.silence_samples >= self.speculation_limit):
+                offset = max(start, self.committed_samples)
+                self.speculation = Segment(
+                    self.buffer.view()[offset:self.speech_end].copy(), self.utterance_id, "speculative",
+                    offset, self.buffer_position() + offset, source=self.source,
+                    features=self.finish_features(offset), continuation=self.continuation
+                )
+                self.speculation.cancelled = False
+                self.on_speculative(self.speculation)
+            return
+        if too_short:
+            self.segments_skipped += 1
+            print(f"Skipping segment with only {self.voiced_samples / self.sample_rate:.2f}s of speech", file=sys.stderr)
+        else:
+            offset = max(start, self.committed_samples)
+            self.on_segment(Segment(
+                self.buffer.view()[offset:self.speech_end].copy(), self.utterance_id, "final",
+                offset, self.buffer_position() + offset, self.timing(offset), self.source,
+                self.finish_features(offset), self.continuation
+            ))
+            self.count_segment(self.speech_end - offset)
+        if self.calibration is not None:
+            self.report_calibration()
+        self.reset()
+
+    def cut_point(self, start):
+        # Centre of the quietest CUT_WINDOW in the last CUT_SEARCH of the
+        # maximum segment length
+        end = start + self.max_samples
+        search = self.buffer.view()[end - int(self.max_samples * self.CUT_SEARCH):end]
+        window = max(1, int(self.CUT_WINDOW * self.sample_rate))
+        if len(search) <= window:
+            return end
+        energy = np.convolve(np.square(search, dtype=np.float64), np.ones(window), mode="valid")
+        return end - len(search) + int(np.argmin(energy)) + window // 2
+
+    def cut(self):
+        # Ends the segment at its quietest point while speech goes on. The
+        # next segment starts overlap samples before the cut and everything
+        # before that is dropped from the buffer.
+        start = max(0, self.speech_start - self.pre_roll)
+        offset = max(start, self.committed_samples)
+        cut = max(self.cut_point(start), offset + self.overlap + 1)
+        if self.speculation is not None:
+            self.speculation.cancelled = True
+            self.speculation = None
+        self.on_segment(Segment(
+            self.buffer.view()[offset:cut].copy(), self.utterance_id, "final", offset,
+            self.buffer_position() + offset, self.timing(offset, cut), self.source,
+            self.finish_features(offset, cut), self.continuation
+        ))
+        self.forced_cuts += 1
+        self.count_segment(cut - offset)
+        if self.metrics is not None:
+            self.metrics.inc("forced_cuts", help="Segments cut at max_segment while speech went on")
+        shift = cut - self.overlap
+        with self.commit_lock:
+            self.buffer.keep_last(len(self.buffer) - shift)
+            self.speech_start = self.pre_roll
+            self.speech_end = max(0, self.speech_end - shift)
+            # Only what follows the cut is new speech
+            self.voiced_samples = max(0, self.speech_end - self.overlap)
+            self.utterance_id += 1
+            self.committed_samples = 0
+            self.samples_since_partial = 0
+            self.continuation = True
+            if self.features is not None:
+                self.features.start(0)
+                self.features.update(self.buffer.view())
+
+    def calibrate(self, chunk, flags):
+        # The chunk was captured with the tracker's current gain; the
+        # baseline hears it as the fixed gain would have given it
+        calibration = self.calibration
+        samples = self.baseline.samples
+        completed = self.baseline.feed(chunk * np.float32(self.static_gain / calibration.gain))
+        calibration.update(self.vad.frames, flags)
+        calibration.apply(self.vad)
+        if completed and self.metrics is not None:
+            self.metrics.inc("calibration_baseline_segments", completed,
+                             help="Segments the fixed gain and thresholds would have sent to the model")
+            self.metrics.inc("calibration_baseline_seconds", (self.baseline.samples - samples) / self.sample_rate,
+                             help="Audio seconds the fixed gain and thresholds would have sent to the model")
+            self.report_avoided()
+
+    def count_segment(self, samples):
+        self.segments_emitted += 1
+        self.samples_emitted += samples
+        if self.calibration is not None and self.metrics is not None:
+            self.metrics.inc("calibration_segments", help="Segments sent to the model with calibration")
+            self.metrics.inc("calibration_seconds", samples / self.sample_rate,
+                             help="Audio seconds sent to the model with calibration")
+            self.report_avoided()
+
+    def report_avoided(self):
+        # Negative when calibration picked up speech the fixed thresholds missed
+        metrics = self.metrics
+        metrics.set("inference_runs_avoided",
+                    metrics.get("calibration_baseline_segments") - metrics.get("calibration_segments"),
+                    help="Inference runs saved by calibration")
+        metrics.set("inference_seconds_avoided",
+                    metrics.get("calibration_baseline_seconds") - metrics.get("calibration_seconds"),
+                    help="Audio seconds of inference saved by calibration")
+
+    def report_calibration(self):
+        # Logged at the end of an utterance when a level moved by 3 dB
+        calibration = self.calibration
+        if self.metrics is not None:
+            self.metrics.set("input_gain", calibration.gain, help="Calibrated gain of the latest utterance's source")
+            if calibration.threshold is not None:
+                self.metrics.set("vad_threshold_db", calibration.threshold, help="Calibrated VAD threshold in dBFS")
+        state = (calibration.noise_floor, calibration.speech_level, calibration.gain_db)
+        if self.reported is not None and not any(
+                (a is None) != (b is None) or (a is not None and abs(a - b) >= 3.0)
+                for a, b in zip(state, self.reported)):
+            return
+        self.reported = state
+        runs = self.baseline.segments - self.segments_emitted
+        seconds = (self.baseline.samples - self.samples_emitted) / self.sample_rate
+        print(f"Calibration: {calibration.describe()}; {runs} inference runs, {seconds:.1f}s of audio avoided",
+              file=sys.stderr)
+
+    def finish_features(self, offset, end=None):
+        features = self.features
+        if features is None:
+            return None
+        start = time.perf_counter()
+        result = features.finish(self.buffer.view(), offset, self.speech_end if end is None else end)
+        if self.metrics is not None:
+            self.metrics.observe("feature_finish_seconds", time.perf_counter() - start,
+                                 buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05),
+                                 help="Log-mel work left at the endpoint")
+        return result
+
+    def timing(self, offset, speech_end=None):
+        # Sample positions are mapped to monotonic time assuming the end of
+        # the buffer has just been captured.
+        now = time.monotonic()
+        end = len(self.buffer)
+        speech_end = self.speech_end if speech_end is None else speech_end
+        return UtteranceTiming(
+            capture_start=now - (end - offset) / self.sample_rate,
+            speech_end=now - (end - speech_end) / self.sample_rate,
+            endpoint=now,
+            audio_duration=(speech_end - offset) / self.sample_rate,
+        )
+
+    def flush(self):
+        # Ends the current utterance immediately, e.g. at the end of a file
+        if self.speech_started:
+            self.silence_samples = max(self.silence_samples, self.silence_limit)
+            self.check_endpoint()
+
+    def buffer_position(self):
+        return self.stream_position - len(self.buffer)
+
+    def emit_partial(self):
+        # Only the uncommitted tail is re-decoded, capped at partial_window,
+        # so each pass costs the same no matter how long the utterance gets.
+        offset = max(self.committed_samples, self.speech_start - self.pre_roll, len(self.buffer) - self.partial_window, 0)
+        self.on_partial(Segment(
+            self.buffer.view()[offset:].copy(), self.utterance_id, "partial", offset, self.buffer_position() + offset,
+            source=self.source
+        ))
+
+    def commit(self, utterance_id, samples):
+        with self.commit_lock:
+            if utterance_id == self.utterance_id:
+                self.committed_samples = max(self.committed_samples, min(samples, len(self.buffer)))
+
+    def restart(self):
+        # The audio fed next does not continue what was fed so far (the
+        # push-to-talk gate changed or capture resumed): none of the old
+        # audio is kept as pre-roll, and the VAD starts from silence. Ends
+        # no utterance; flush() or discard() does that first.
+        self.buffer.clear()
+        self.silence_samples = 0
+        self.vad.reset()
+        if self.baseline is not None:
+            self.baseline.vad.reset()
+
+    def discard(self):
+        # Drops the utterance in progress, e.g. when capture is paused
+        if self.speculation is not None:
+            self.speculation.cancelled = True
+        self.silence_samples = 0
+        self.reset()
+
+    def reset(self):
+        with self.commit_lock:
+            self.buffer.keep_last(min(self.silence_samples, self.pre_roll))
+            self.silence_samples = 0
+            self.speech_started = False
+            self.speech_start = 0
+            self.speech_end = 0
+            self.voiced_samples = 0
+            self.utterance_id += 1
+            self.committed_samples = 0
+            self.samples_since_partial = 0
+            self.speculation = None
+            self.continuation = False
+            if self.features is not None:
+                self.features.reset()
+
+
+def detect_device(preferred="auto"):
+    if preferred and preferred != "auto":
+        return preferred
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda"
+    except ImportError:
+        pass
+    return "cpu"
+
+
+class TranscriptionBackend:
+    # Common interface for inference runtimes. transcribe() returns a dict in
+    # openai-whisper's result format: "text", "language" and "segments", each
+    # segment optionally carrying "words" with "word"/"start"/"end", plus
+    # "language_probability" where the runtime reports it.
+    name = None
+    # Whether transcribe_batch() runs several segments in one model call
+    supports_batching = False
+    # Whether transcribe() takes precomputed LogMelFeatures output as
+    # features=...; such backends provide mel_filters
+    supports_features = False
+    # Whether several threads may call transcribe() on one instance (up to
+    # the workers it was created with)
+    concurrent = False
+
+    def __init__(self, model_name, device, compute_type="auto", cpu_threads=0, workers=1):
+        self.model_name = model_name
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.workers = workers
+
+    def transcribe(self, audio, **options):
+        raise NotImplementedError
+
+    def transcribe_batch(self, audios, **options):
+        return [self.transcribe(audio, **options) for audio in audios]
+
+    def offload(self):
+        # Moves the model out of accelerator memory while it is not needed;
+        # returns False when there is nothing to free
+        return False
+
+    def restore(self):
+        pass
+
+    def close(self):
+        # Releases what garbage collection would not, e.g. a worker process
+        pass
+
+    def describe(self):
+        return f"{self.name} ({self.model_name}, {self.device}, {self.compute_type})"
+
+
+class WhisperBackend(TranscriptionBackend):
+    name = "openai-whisper"
+    supports_batching = True
+    supports_features = True
+    # transcribe()'s defaults for retrying a window at higher temperatures
+    TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+    COMPRESSION_RATIO_THRESHOLD = 2.4
+    LOGPROB_THRESHOLD = -1.0
+    NO_SPEECH_THRESHOLD = 0.6
+
+    def __init__(self, model_name, device, compute_type="auto", cpu_threads=0, workers=1):
+        if compute_type == "auto":
+            compute_type = "float16" if device == "cuda" else "float32"
+        super().__init__(model_name, device, compute_type, cpu_threads, workers)
+        import whisper
+        if cpu_threads:
+            import torch
+            torch.set_num_threads(cpu_threads)
+        self.model = whisper.load_model(model_name, device=device)
+        self.mel_filters = whisper.audio.mel_filters("cpu", self.model.dims.n_mels).numpy()
+
+    def offload(self):
+        if self.device == "cpu":
+            return False
+        import torch
+        self.model.to("cpu")
+        torch.cuda.empty_cache()
+        return True
+
+    def restore(self):
+        self.model.to(self.device)
+
+    def prepare_options(self, options):
+        # fp16 only exists on the GPU, and a single beam is greedy decoding
+        # without the beam search machinery
+        options.setdefault("fp16", self.compute_type == "float16")
+        if self.device == "cpu":
+            options["fp16"] = False
+        if options.get("beam_size") == 1:
+            del options["beam_size"]
+        temperatures = options.get("temperature", self.TEMPERATURES)
+        options["temperature"] = temperatures if isinstance(temperatures, (list, tuple)) else (temperatures,)
+
+    def transcribe(self, audio, features=None, **options):
+        # With features, a segment that fits into one 30 s window goes
+        # straight to the decoder; everything else (and word timestamps)
+        # takes transcribe()'s sliding window, which computes its own mel.
+        import whisper
+        self.prepare_options(options)
+        if features is None or options.get("word_timestamps") or len(audio) > whisper.audio.N_SAMPLES:
+            return self.model.transcribe(audio, **options)
+        import torch
+        mel = whisper.pad_or_trim(torch.from_numpy(features), whisper.audio.N_FRAMES).to(self.model.device)
+        return self.decode_result(*self.decode_with_fallback(mel, options), len(audio), options)
+
+    def encode(self, mels, options):
+        # Encoder output for (batch, n_mels, frames), plus the probability of
+        # the detected language of each item if no language is given
+        import torch
+        with torch.no_grad():
+            features = self.model.embed_audio(mels.half() if options["fp16"] else mels)
+        if options.get("language") is not None or not self.model.is_multilingual:
+            return features, [None] * len(features)
+        _, probs = self.model.detect_language(features)
+        return features, [max(item.values()) for item in probs]
+
+    def decode_with_fallback(self, mel, options):
+        # The retry logic of whisper.transcribe() for a single window. The
+        # encoder runs once for the language identification and all
+        # temperatures; returns the result and the language probability.
+        import whisper
+        features, probabilities = self.encode(mel.unsqueeze(0), options)
+        for temperature in options["temperature"]:
+            result = whisper.decode(self.model, features[0], self.decoding_options(options, temperature))
+            if not self.needs_fallback(result, options):
+                break
+        return result, probabilities[0]
+
+    def needs_fallback(self, result, options):
+        # Whether transcribe() would retry the window at the next
+        # temperature: repetitive or unlikely text that isn't silence
+        if result.no_speech_prob > options.get("no_speech_threshold", self.NO_SPEECH_THRESHOLD):
+            return False
+        compression_ratio_threshold = options.get("compression_ratio_threshold", self.COMPRESSION_RATIO_THRESHOLD)
+        return (result.compression_ratio > compression_ratio_threshold
+                or result.avg_logprob < options.get("logprob_threshold", self.LOGPROB_THRESHOLD))
+
+    @staticmethod
+    def decoding_options(options, temperature):
+        # One pass of the fallback loop: beam search only at temperature 0,
+        # best_of candidates above it, as transcribe() does
+        import whisper
+        return whisper.DecodingOptions(
+            language=options.get("language"), fp16=options["fp16"], temperature=temperature,
+            beam_size=options.get("beam_size") if temperature == 0 else None,
+            best_of=options.get("best_of") if temperature > 0 else None,
+            sample_len=options.get("sample_len"),
+        )
+
+    def decode_result(self, result, language_probability, samples, options):
+        import whisper
+        text = result.text
+        if (result.no_speech_prob > options.get("no_speech_threshold", self.NO_SPEECH_THRESHOLD)
+                and result.avg_logprob < options.get("logprob_threshold", self.LOGPROB_THRESHOLD)):
+            text = ""
+        return {
+            "text": text,
+            "language": result.language,
+            "language_probability": language_probability,
+            "segments": [{"start": 0.0, "end": samples / whisper.audio.SAMPLE_RATE, "text": text,
+                          "avg_logprob": result.avg_logprob, "no_speech_prob": result.no_speech_prob}],
+        }
+
+    def transcribe_batch(self, audios, features=None, **options):
+        # Segments that fit into one 30 s window are decoded together in a
+        # single batched forward pass; longer ones (and word timestamps)
+        # need transcribe()'s sliding window.
+        import torch
+        import whisper
+        self.prepare_options(options)
+        features = features or [None] * len(audios)
+        short = [i for i, audio in enumerate(audios) if len(audio) <= whisper.audio.N_SAMPLES]
+        if len(short) < 2 or options.get("word_timestamps"):
+            return [self.transcribe(audio, features=mel, **options) for audio, mel in zip(audios, features)]
+
+        mels = torch.stack([
+            whisper.pad_or_trim(torch.from_numpy(features[i]), whisper.audio.N_FRAMES) if features[i] is not None
+            else whisper.log_mel_spectrogram(whisper.pad_or_trim(audios[i]), self.model.dims.n_mels)
+            for i in short
+        ]).to(self.model.device)
+        encoded, probabilities = self.encode(mels, options)
+        # The batch is decoded at the first temperature; items that would
+        # fall back are retried one by one at the remaining ones
+        temperatures = options["temperature"]
+        decoded = whisper.decode(self.model, encoded, self.decoding_options(options, temperatures[0]))
+        results = [None] * len(audios)
+        for i, result, probability in zip(short, decoded, probabilities):
+            if len(temperatures) > 1 and self.needs_fallback(result, options):
+                continue
+            results[i] = self.decode_result(result, probability, len(audios[i]), options)
+        for i, audio in enumerate(audios):
+            if results[i] is None:
+                retry = dict(options, temperature=temperatures[1:]) if i in short else options
+                results[i] = self.transcribe(audio, features=features[i], **retry)
+        return results
+
+
+class QuantizedWhisperBackend(WhisperBackend):
+    # openai-whisper with int8 dynamic quantization of all linear layers,
+    # which roughly halves CPU decode time with little accuracy loss.
+    name = "whisper-quantized"
+
+    def __init__(self, model_name, device="cpu", compute_type="int8", cpu_threads=0, workers=1):
+        import torch
+        import whisper
+        if device != "cpu":
+            print(f"{self.name} only runs on the CPU, ignoring device '{device}'", file=sys.stderr)
+        super().__init__(model_name, "cpu", "float32", cpu_threads or os.cpu_count() or 1, workers)
+        # Whisper wraps nn.Linear in its own subclass, which dynamic
+        # quantization refuses to convert; the layouts are identical.
+        for module in self.model.modules():
+            if isinstance(module, whisper.model.Linear):
+                module.__class__ = torch.nn.Linear
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.compute_type = "int8"
+
+    def transcribe(self, audio, **options):
+        options["fp16"] = False
+        return super().transcribe(audio, **options)
+
+    def transcribe_batch(self, audios, **options):
+        options["fp16"] = False
+        return super().transcribe_batch(audios, **options)
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    # CTranslate2 runtime; int8 on the CPU, float16 on CUDA by default
+    name = "faster-whisper"
+    concurrent = True
+
+    def __init__(self, model_name, device, compute_type="auto", cpu_threads=0, workers=1):
+        if compute_type == "auto":
+            compute_type = "float16" if device == "cuda" else "int8"
+        super().__init__(model_name, device, compute_type, cpu_threads, workers)
+        from faster_whisper import WhisperModel
+        # num_workers lets several threads call transcribe() in parallel
+        self.model = WhisperModel(
+            model_name, device=device, compute_type=compute_type, cpu_threads=cpu_threads, num_workers=workers
+        )
+
+    def offload(self):
+        if self.device == "cpu":
+            return False
+        self.model.model.unload_model(to_cpu=True)
+        return True
+
+    def restore(self):
+        self.model.model.load_model()
+
+    def transcribe(self, audio, **options):
+        options.pop("fp16", None)
+        # openai-whisper's names for the same settings
+        if "sample_len" in options:
+            options["max_new_tokens"] = options.pop("sample_len")
+        if "logprob_threshold" in options:
+            options["log_prob_threshold"] = options.pop("logprob_threshold")
+        segments, info = self.model.transcribe(audio, **options)
+        result_segments = []
+        for segment in segments:
+            result_segment = {"start": segment.start, "end": segment.end, "text": segment.text,
+                              "avg_logprob": segment.avg_logprob, "no_speech_prob": segment.no_speech_prob}
+            if segment.words:
+                result_segment["words"] = [
+                    {"word": word.word, "start": word.start, "end": word.end, "probability": word.probability}
+                    for word in segment.words
+                ]
+            result_segments.append(result_segment)
+        return {
+            "text": "".join(segment["text"] for segment in result_segments),
+            "segments": result_segments,
+            "language": info.language,
+            "language_probability": info.language_probability,
+        }
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    QuantizedWhisperBackend.name: QuantizedWhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def resolve_backend(name, device):
+    # The backend class "auto" stands for on this device
+    if name == "auto":
+        if device == "cuda":
+            name = WhisperBackend.name
+        elif importlib.util.find_spec("faster_whisper"):
+            # Only probed here; FasterWhisperBackend imports it
+            name = FasterWhisperBackend.name
+        else:
+            name = QuantizedWhisperBackend.name
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', expected one of: auto, {', '.join(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def create_backend(name, model_name, device="auto", compute_type="auto", cpu_threads=0, workers=1):
+    device = detect_device(device)
+    backend = resolve_backend(name, device)(model_name, device, compute_type, cpu_threads, workers)
+    print(f"Loaded backend: {backend.describe()}", file=sys.stderr)
+    return backend
+
+
+# Where an array of a request lies in the shared arena
+SharedArray = collections.namedtuple("SharedArray", "offset shape dtype")
+
+
+def map_arrays(value, kind, function):
+    # Applies function to every instance of kind in nested lists, tuples and
+    # dicts (the arguments and options of a backend call)
+    if isinstance(value, kind):
+        return function(value)
+    if isinstance(value, (list, tuple)):
+        return type(value)(map_arrays(item, kind, function) for item in value)
+    if isinstance(value, dict):
+        return {key: map_arrays(item, kind, function) for key, item in value.items()}
+    return value
+
+
+def run_backend_worker(connection, factory, args):
+    # Entry point of the inference process: loads the backend, then serves
+    # calls until the engine closes the pipe. Arrays are read in place from
+    # the shared arena; only their layout comes through the pipe.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        backend = factory(*args)
+    except Exception as e:
+        connection.send(("error", str(e)))
+        return
+    connection.send(("ready", {
+        "model_name": backend.model_name,
+        "device": backend.device,
+        "compute_type": backend.compute_type,
+        "description": backend.describe(),
+        "supports_batching": backend.supports_batching,
+        "supports_features": backend.supports_features,
+        "mel_filters": getattr(backend, "mel_filters", None),
+    }))
+    arena = None
+    while True:
+        try:
+            method, arena_name, call_args, options = connection.recv()
+        except EOFError:
+            break
+        if arena_name is not None:
+            if arena is not None:
+                arena.close()
+            arena = multiprocessing.shared_memory.SharedMemory(name=arena_name)
+
+        def view(shared):
+            return np.ndarray(shared.shape, np.dtype(shared.dtype), buffer=arena.buf, offset=shared.offset)
+
+        try:
+            if method not in ("transcribe", "transcribe_batch", "offload", "restore"):
+                raise ValueError(f"unknown method: {method}")
+            result = getattr(backend, method)(*map_arrays(call_args, SharedArray, view),
+                                              **map_arrays(options, SharedArray, view))
+            reply = ("ok", result)
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        connection.send(reply)
+    if arena is not None:
+        arena.close()
+
+
+class ProcessBackend(TranscriptionBackend):
+    # Runs a backend in a worker process, so that the model's Python decode
+    # loop does not hold the GIL that capture, segmentation, typing and the
+    # applets' main loop need. Audio and features are copied into a shared
+    # memory arena and only their layout goes through the pipe; results come
+    # back pickled, which for text is cheap. A worker that dies is started
+    # again and the call retried once.
+    name = "process"
+    ARENA_BYTES = 8 * 2 ** 20
+    # Arrays in the arena start at multiples of this
+    ALIGNMENT = 64
+
+    def __init__(self, factory, *args):
+        self.factory = factory
+        self.args = args
+        self.context = multiprocessing.get_context("spawn")
+        self.lock = threading.Lock()
+        self.process = None
+        self.connection = None
+        self.arena = None
+        self.arena_sent = False
+        self.restarts = 0
+        self.start()
+        atexit.register(self.close)
+
+    def start(self):
+        # Blocks until the worker has loaded the model
+        connection, child_connection = self.context.Pipe()
+        self.process = self.context.Process(
+            target=run_backend_worker, args=(child_connection, self.factory, self.args),
+            name="voxtarix-inference", daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+        self.connection = connection
+        self.arena_sent = False
+        try:
+            status, info = connection.recv()
+        except EOFError:
+            self.process.join()
+            status, info = "error", f"worker exited with code {self.process.exitcode}"
+        if status == "error":
+            self.process.join()
+            raise RuntimeError(f"Inference process failed to load the model: {info}")
+        super().__init__(info["model_name"], info["device"], info["compute_type"])
+        self.description = info["description"]
+        self.supports_batching = info["supports_batching"]
+        self.supports_features = info["supports_features"]
+        if info["mel_filters"] is not None:
+            self.mel_filters = info["mel_filters"]
+
+    def restart(self):
+        self.process.join(timeout=1)
+        print(f"Inference process {self.process.pid} died (exit code {self.process.exitcode}), restarting",
+              file=sys.stderr)
+        self.connection.close()
+        self.restarts += 1
+        self.start()
+
+    def share(self, value):
+        # Copies the arrays in value into the arena, growing it if needed,
+        # and replaces them by their layout
+        sizes = []
+        map_arrays(value, np.ndarray, lambda array: sizes.append(array.nbytes))
+        needed = sum(-(-size // self.ALIGNMENT) * self.ALIGNMENT for size in sizes)
+        if self.arena is None or self.arena.size < needed:
+            size = max(needed, 2 * self.arena.size if self.arena else self.ARENA_BYTES)
+            if self.arena is not None:
+                self.arena.close()
+                self.arena.unlink()
+            self.arena = multiprocessing.shared_memory.SharedMemory(create=True, size=size)
+            self.arena_sent = False
+        offset = 0
+
+        def place(array):
+            nonlocal offset
+            np.ndarray(array.shape, array.dtype, buffer=self.arena.buf, offset=offset)[...] = array
+            shared = SharedArray(offset, array.shape, array.dtype.str)
+            offset += -(-array.nbytes // self.ALIGNMENT) * self.ALIGNMENT
+            return shared
+
+        return map_arrays(value, np.ndarray, place)
+
+    def call(self, method, *args, **options):
+        # One call at a time: the arena holds the arrays of a single request
+        with self.lock:
+            args, options = self.share((args, options))
+            for attempt in range(2):
+                try:
+                    self.connection.send((method, None if self.arena_sent else self.arena.name, args, options))
+                    self.arena_sent = True
+                    status, value = self.connection.recv()
+                    break
+                except (EOFError, OSError):
+                    if attempt:
+                        raise ChildProcessError(f"Inference process died twice during {method}()")
+                    self.restart()
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+    def transcribe(self, audio, **options):
+        return self.call("transcribe", audio, **options)
+
+    def transcribe_batch(self, audios, **options):
+        return self.call("transcribe_batch", audios, **options)
+
+    def offload(self):
+        return self.call("offload")
+
+    def restore(self):
+        self.call("restore")
+
+    def close(self):
+        atexit.unregister(self.close)
+        with self.lock:
+            if self.connection is not None:
+                # The worker exits when the pipe closes
+                self.connection.close()
+                self.connection = None
+                self.process.join(timeout=5)
+                if self.process.is_alive():
+                    self.process.kill()
+            if self.arena is not None:
+                self.arena.close()
+                self.arena.unlink()
+                self.arena = None
+
+    def describe(self):
+        return f"{self.description} in process {self.process.pid}"
+
+
+def copy_to_clipboard(text):
+    import pyperclip
+    pyperclip.copy(text)
+
+
+class PynputTyper:
+    name = "pynput"
+
+    def __init__(self):
+        from pynput import keyboard
+        self.controller = keyboard.Controller()
+
+    def type(self, text, delay):
+        for char in text:
+            try:
+                self.controller.type(char)
+            except ValueError:
+                print(f"Failed to type character: '{char}'", file=sys.stderr)
+            if delay:
+                time.sleep(delay)
+
+
+class CommandTyper:
+    # Types a whole chunk per process call: xdotool on X11, wtype on
+    # Wayland, ydotool through uinput on both (needs ydotoold).
+    COMMANDS = {
+        "xdotool": ["xdotool", "type", "--delay", "{ms}", "--"],
+        "wtype": ["wtype", "-d", "{ms}", "--"],
+        "ydotool": ["ydotool", "type", "--key-delay", "{ms}", "--"],
+    }
+
+    def __init__(self, name):
+        if shutil.which(name) is None:
+            raise RuntimeError(f"{name} not found")
+        self.name = name
+
+    def type(self, text, delay):
+        milliseconds = str(max(0, int(delay * 1000)))
+        command = [milliseconds if part == "{ms}" else part for part in self.COMMANDS[self.name]]
+        subprocess.run(command + [text], check=True, timeout=30 + len(text) * (delay + 0.05))
+
+
+def create_typer(name="auto"):
+    if name == "auto":
+        if os.environ.get("WAYLAND_DISPLAY"):
+            candidates = ["wtype", "ydotool"]
+        else:
+            candidates = ["xdotool"]
+        for candidate in candidates:
+            if shutil.which(candidate):
+                return CommandTyper(candidate)
+        return PynputTyper()
+    if name == "pynput":
+        return PynputTyper()
+    return CommandTyper(name)
+
+
+class HotkeyGate:
+    # Global push-to-talk hotkey through a pynput listener: in "hold" mode
+    # the gate is open while the keys are held down, in "toggle" mode each
+    # press opens or closes it. on_change(open) runs on the listener thread.
+    def __init__(self, keys, mode, on_change):
+        from pynput import keyboard
+        self.keys = set(keyboard.HotKey.parse(keys))
+        self.mode = mode
+        self.on_change = on_change
+        self.pressed = set()
+        self.open = False
+        self.listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
+
+    def start(self):
+        self.listener.start()
+        self.listener.wait()
+
+    def stop(self):
+        self.listener.stop()
+
+    def on_press(self, key):
+        key = self.listener.canonical(key)
+        if key in self.pressed:
+            # Auto-repeat of a held key
+            return
+        self.pressed.add(key)
+        if self.keys <= self.pressed:
+            self.set(not self.open if self.mode == "toggle" else True)
+
+    def on_release(self, key):
+        key = self.listener.canonical(key)
+        self.pressed.discard(key)
+        if self.mode == "hold" and key in self.keys:
+            self.set(False)
+
+    def set(self, gate_open):
+        if gate_open != self.open:
+            self.open = gate_open
+            self.on_change(gate_open)
+
+
+class OutputSink:
+    # Delivers recognized text to the clipboard and the keyboard on its own
+    # thread so slow typing never holds up segmentation or inference. Text
+    # is typed in chunks; the per-key delay grows when the typing backend
+    # takes longer than the delay itself (the target is not keeping up) and
+    # shrinks back towards min_delay while it keeps up.
+    def __init__(self, backend="auto", chunk_size=32, delay=0.01, min_delay=0.002, max_delay=0.05, metrics=None):
+        self.backend = backend
+        self.chunk_size = max(1, chunk_size)
+        self.delay = delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.metrics = metrics
+        self.queue = queue.Queue()
+        self.typer = None
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="output", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.queue.put(None)
+
+    def deliver(self, text, copy=False, type=False, on_done=None):
+        self.queue.put((text, copy, type, on_done))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            text, copy, type_text, on_done = item
+            try:
+                if copy:
+                    print(f"Attempting to copy: '{text}' to clipboard", file=sys.stderr)
+                    copy_to_clipboard(text)
+                if type_text:
+                    print(f"Attempting to type: '{text}'", file=sys.stderr)
+                    self.type_text(text)
+            except Exception as e:
+                print(f"Output error: {e}", file=sys.stderr)
+            if on_done:
+                on_done()
+
+    def get_typer(self):
+        if self.typer is None:
+            try:
+                self.typer = create_typer(self.backend)
+            except Exception as e:
+                print(f"Typing backend '{self.backend}' unavailable ({e}), using pynput", file=sys.stderr)
+                self.typer = PynputTyper()
+            print(f"Typing with {self.typer.name}", file=sys.stderr)
+        return self.typer
+
+    def type_text(self, text):
+        typer = self.get_typer()
+        start = time.monotonic()
+        for i in range(0, len(text), self.chunk_size):
+            chunk = text[i:i + self.chunk_size]
+            chunk_start = time.monotonic()
+            typer.type(chunk, self.delay)
+            self.adapt(len(chunk), time.monotonic() - chunk_start)
+        elapsed = time.monotonic() - start
+        if elapsed > 0 and self.metrics:
+            self.metrics.inc("typed_chars", len(text), help="Characters typed")
+            self.metrics.observe("typing_chars_per_second", len(text) / elapsed,
+                                 buckets=(10, 25, 50, 100, 250, 500, 1000), help="Typing throughput")
+            self.metrics.set("typing_delay_seconds", self.delay, help="Current adaptive per-key delay")
+        print(f"Typed {len(text)} chars in {elapsed:.2f}s ({len(text) / max(elapsed, 1e-6):.0f} chars/s)",
+              file=sys.stderr)
+
+    def adapt(self, chars, elapsed):
+        overhead = elapsed / chars - self.delay
+        if overhead > self.delay:
+            self.delay = min(self.max_delay, max(self.delay, self.min_delay) * 1.5)
+        else:
+            self.delay = max(self.min_delay, self.delay * 0.8)
+
+
+class HistoryStore:
+    # Transcription history persisted in SQLite with a full-text index
+    # (FTS5 where the sqlite build has it, LIKE otherwise). Only the newest
+    # memory_limit entries are kept in memory; older ones are paged in from
+    # disk on demand. Entries are (id, timestamp, text) tuples, newest first.
+    def __init__(self, path, memory_limit=200):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.recent = collections.deque(maxlen=max(1, memory_limit))
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY, timestamp REAL NOT NULL, text TEXT NOT NULL)"
+        )
+        self.fts = True
+        try:
+            self.conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(text, content='history', content_rowid='id');
+                CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+                    INSERT INTO history_fts(rowid, text) VALUES (new.id, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+                    INSERT INTO history_fts(history_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                END;
+            """)
+        except sqlite3.OperationalError:
+            self.fts = False
+        self.conn.commit()
+        # deque.extendleft reverses, so the newest entry ends up first
+        self.recent.extendleft(reversed(self.page(limit=self.recent.maxlen)))
+
+    def add(self, text, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.lock:
+            cursor = self.conn.execute("INSERT INTO history (timestamp, text) VALUES (?, ?)", (timestamp, text))
+            self.conn.commit()
+            entry = (cursor.lastrowid, timestamp, text)
+            self.recent.appendleft(entry)
+        return entry
+
+    def page(self, before_id=None, limit=50):
+        # Entries older than before_id; served from memory when possible
+        with self.lock:
+            if self.recent and (before_id is None or before_id > self.recent[-1][0]):
+                entries = [entry for entry in self.recent if before_id is None or entry[0] < before_id][:limit]
+                if len(entries) == limit or len(self.recent) < self.recent.maxlen:
+                    return entries
+            return self.conn.execute(
+                "SELECT id, timestamp, text FROM history WHERE id < ? ORDER BY id DESC LIMIT ?",
+                (before_id if before_id is not None else 2 ** 63 - 1, limit)
+            ).fetchall()
+
+    def search(self, query, limit=50):
+        with self.lock:
+            if self.fts:
+                # Quote each term so user input is never parsed as FTS syntax
+                terms = " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+                if not terms:
+                    return []
+                return self.conn.execute(
+                    "SELECT h.id, h.timestamp, h.text FROM history_fts f JOIN history h ON h.id = f.rowid "
+                    "WHERE history_fts MATCH ? ORDER BY h.id DESC LIMIT ?",
+                    (terms, limit)
+                ).fetchall()
+            return self.conn.execute(
+                "SELECT id, timestamp, text FROM history WHERE text LIKE ? ORDER BY id DESC LIMIT ?",
+                ("%" + query + "%", limit)
+            ).fetchall()
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def default_history_path():
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(data_home, "voxtarix", "history.db")
+
+
+class DecodingProfile:
+    # Named decoding settings from a [profile.<name>] section of
+    # settings.conf. Settings left out keep the backend's defaults; options()
+    # returns them as keyword arguments for TranscriptionBackend.transcribe(),
+    # in openai-whisper's names.
+    def __init__(self, name, beam_size=None, best_of=None, temperatures=None, fp16=None, max_tokens=None,
+                 compression_ratio_threshold=None, logprob_threshold=None, no_speech_threshold=None):
+        self.name = name
+        self.beam_size = beam_size
+        self.best_of = best_of
+        self.temperatures = temperatures
+        self.fp16 = fp16
+        self.max_tokens = max_tokens
+        self.compression_ratio_threshold = compression_ratio_threshold
+        self.logprob_threshold = logprob_threshold
+        self.no_speech_threshold = no_speech_threshold
+
+    @classmethod
+    def from_section(cls, name, section):
+        temperatures = section.get("temperatures", fallback=None)
+        return cls(
+            name,
+            beam_size=section.getint("beam_size", fallback=None),
+            best_of=section.getint("best_of", fallback=None),
+            temperatures=tuple(float(t) for t in temperatures.split(",") if t.strip()) if temperatures else None,
+            fp16=section.getboolean("fp16", fallback=None),
+            max_tokens=section.getint("max_tokens", fallback=None),
+            compression_ratio_threshold=section.getfloat("compression_ratio_threshold", fallback=None),
+            logprob_threshold=section.getfloat("logprob_threshold", fallback=None),
+            no_speech_threshold=section.getfloat("no_speech_threshold", fallback=None),
+        )
+
+    def options(self):
+        options = {
+            "beam_size": self.beam_size,
+            "best_of": self.best_of,
+            "temperature": self.temperatures,
+            "fp16": self.fp16,
+            "sample_len": self.max_tokens,
+            "compression_ratio_threshold": self.compression_ratio_threshold,
+            "logprob_threshold": self.logprob_threshold,
+            "no_speech_threshold": self.no_speech_threshold,
+        }
+        return {key: value for key, value in options.items() if value is not None}
+
+    def describe(self):
+        options = self.options()
+        return f"{self.name} ({', '.join(f'{key}={value}' for key, value in options.items()) or 'backend defaults'})"
+
+
+class LanguagePolicy:
+    # Chooses the language every decode runs with. A pinned language is
+    # always used. Otherwise the language is detected on the first
+    # utterances and kept once they agree with enough confidence, so later
+    # decodes skip Whisper's language identification; short utterances
+    # (commands), on which Whisper often guesses wrong, do not vote. When
+    # decodes in the kept language come out with low confidence, detection
+    # starts over. A language given on the command line or by the applet
+    # is kept from the start in the same way.
+    MIN_VOTE_SECONDS = 1.0
+    # Decodes per mode before the detection overhead is estimated
+    MIN_DECODES = 3
+
+    def __init__(self, language=None, pinned=False, votes=3, min_probability=0.5, recheck_logprob=-1.0,
+                 recheck_after=2):
+        self.language = language or None
+        self.pinned = pinned and self.language is not None
+        self.votes_needed = max(1, votes)
+        self.min_probability = min_probability
+        self.recheck_logprob = recheck_logprob
+        self.recheck_after = max(1, recheck_after)
+        self.votes = []
+        self.low_confidence = 0
+        # Running mean decode seconds per utterance, with language
+        # identification (True) and without
+        self.decode_seconds = {True: 0.0, False: 0.0}
+        self.decodes = {True: 0, False: 0}
+
+    def observe(self, result, duration):
+        # Updates the policy from a decode of duration seconds made with
+        # the current language; returns whether the language changed
+        if self.pinned or duration < self.MIN_VOTE_SECONDS:
+            return False
+        if self.language is None:
+            if not result.get("language"):
+                return False
+            probability = result.get("language_probability")
+            self.votes.append((result["language"], 1.0 if probability is None else probability))
+            if len(self.votes) < self.votes_needed:
+                return False
+            totals = collections.Counter()
+            for language, probability in self.votes:
+                totals[language] += probability
+            language, total = totals.most_common(1)[0]
+            if total / len(self.votes) < self.min_probability:
+                # Undecided: the oldest vote makes room for the next
+                self.votes.pop(0)
+                return False
+            self.language = language
+            self.votes = []
+            self.low_confidence = 0
+            return True
+        logprobs = [segment["avg_logprob"] for segment in result.get("segments", []) if "avg_logprob" in segment]
+        if not logprobs:
+            return False
+        if sum(logprobs) / len(logprobs) >= self.recheck_logprob:
+            self.low_confidence = 0
+            return False
+        self.low_confidence += 1
+        if self.low_confidence < self.recheck_after:
+            return False
+        self.language = None
+        self.low_confidence = 0
+        return True
+
+    def record_decode(self, seconds, detected):
+        self.decodes[detected] += 1
+        self.decode_seconds[detected] += (seconds - self.decode_seconds[detected]) / self.decodes[detected]
+
+    def detection_seconds(self):
+        # Estimated decode time language identification adds per utterance
+        if min(self.decodes.values()) < self.MIN_DECODES:
+            return None
+        return self.decode_seconds[True] - self.decode_seconds[False]
+
+
+def read_settings():
+    # settings.conf next to this file; a file that can't be parsed counts
+    # as empty, so every option takes its default
+    config = configparser.ConfigParser()
+    try:
+        config.read(os.path.join(os.path.dirname(os.path.abspath(__file__)), "settings.conf"))
+    except (configparser.Error, UnicodeDecodeError) as e:
+        print(f"Error reading config file: {e}. Using default values.", file=sys.stderr)
+        return configparser.ConfigParser()
+    return config
+
+
+def config_option(config, section, option, fallback):
+    # The type of the fallback decides how the value is parsed; a value
+    # that doesn't parse is reported and replaced by the fallback
+    getter = {bool: config.getboolean, int: config.getint, float: config.getfloat}.get(type(fallback), config.get)
+    try:
+        return getter(section, option, fallback=fallback)
+    except ValueError as e:
+        print(f"Error reading config file: [{section}] {option}: {e}. Using {fallback!r}.", file=sys.stderr)
+        return fallback
+
+
+def configured_language():
+    # The language set in settings.conf, if any. The applets prefer it to
+    # the desktop's locale.
+    return config_option(read_settings(), "language", "language", "") or None
+
+
+class VoxtarixEngine:
+    # Words of every text remembered to stitch the segment after a forced cut
+    STITCH_WORDS = 20
+
+    def __init__(self, device=None, language=None, event_queue=None):
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        config = read_settings()
+        option = functools.partial(config_option, config)
+        self.SAMPLE_RATE = option('audio', 'sample_rate', 16000)
+        self.CHANNELS = option('audio', 'channels', 1)
+        self.BLOCKSIZE = option('audio', 'blocksize', 1024)
+        self.GAIN = option('audio', 'gain', 8.0)
+        self.SILENCE_THRESHOLD = option('audio', 'silence_threshold', 0.15)
+        self.SILENCE_DURATION = option('audio', 'silence_duration', 2.0)
+        self.MIN_DURATION = option('audio', 'min_duration', 0.5)
+        self.WARMUP_TIME = option('audio', 'warmup_time', 2.0)
+        self.TYPE_DELAY = option('audio', 'type_delay', 0.01)
+        self.RING_DURATION = option('audio', 'ring_duration', 10.0)
+        self.UTTERANCE_CAPACITY = option('audio', 'utterance_capacity', 60.0)
+        self.DEVICES = [parse_device(d) for d in option('audio', 'devices', "").split(",") if d.strip()]
+        self.CHANNEL_MODE = option('audio', 'channel_mode', "split")
+        self.CAPTURE_RATE = option('audio', 'capture_rate', 0)
+        self.MAX_SEGMENT = option('audio', 'max_segment', 28.0)
+        self.SEGMENT_OVERLAP = option('audio', 'segment_overlap', 1.0)
+        self.INFERENCE_QUEUE_SIZE = option('inference', 'queue_size', 4)
+        self.INFERENCE_DROP_POLICY = option('inference', 'drop_policy', "drop_oldest")
+        self.INFERENCE_BLOCK_TIMEOUT = option('inference', 'block_timeout', 5.0)
+        self.REQUEST_TIMEOUT = option('daemon', 'request_timeout', 120.0)
+        self.INFERENCE_MAX_BATCH = option('inference', 'max_batch', 8)
+        self.INFERENCE_BATCH_WAIT = option('inference', 'batch_wait', 0.0)
+        self.INCREMENTAL_FEATURES = option('inference', 'incremental_features', True)
+        self.WORKER_PROCESS = option('inference', 'worker_process', False)
+        self.VAD_METHOD = option('vad', 'method', "energy_flux")
+        self.VAD_FRAME_MS = option('vad', 'frame_ms', 20)
+        self.VAD_ENERGY_THRESHOLD = option('vad', 'energy_threshold', -30.0)
+        self.VAD_FLUX_THRESHOLD = option('vad', 'flux_threshold', 0.05)
+        self.VAD_ONSET_FRAMES = option('vad', 'onset_frames', 3)
+        self.VAD_HANGOVER = option('vad', 'hangover', 0.3)
+        self.VAD_PRE_ROLL = option('vad', 'pre_roll', 0.3)
+        self.VAD_MIN_VOICED = option('vad', 'min_voiced', 0.25)
+        self.STREAMING = option('streaming', 'enabled', False)
+        self.STREAMING_INTERVAL = option('streaming', 'interval', 1.0)
+        self.STREAMING_WINDOW = option('streaming', 'window', 15.0)
+        self.SPECULATION_ENABLED = option('speculation', 'enabled', True)
+        self.SPECULATION_PAUSE = option('speculation', 'pause', 0.3)
+        self.IDLE_POLICY = option('idle', 'policy', "unload")
+        self.IDLE_MINUTES = option('idle', 'minutes', 30.0)
+        self.DECODING_PROFILE = option('whisper', 'profile', "balanced")
+        self.DECODING_PROFILES = {}
+        for section in config.sections():
+            if section.startswith("profile."):
+                name = section.split(".", 1)[1]
+                try:
+                    self.DECODING_PROFILES[name] = DecodingProfile.from_section(name, config[section])
+                except ValueError as e:
+                    print(f"Error reading config file: [{section}]: {e}. Skipping the profile.", file=sys.stderr)
+        self.LANGUAGE = option('language', 'language', "")
+        self.LANGUAGE_PINNED = option('language', 'pinned', False)
+        self.LANGUAGE_VOTES = option('language', 'detect_utterances', 3)
+        self.LANGUAGE_MIN_PROBABILITY = option('language', 'min_probability', 0.5)
+        self.LANGUAGE_RECHECK_LOGPROB = option('language', 'recheck_logprob', -1.0)
+        self.CALIBRATION_ENABLED = option('calibration', 'enabled', True)
+        self.CALIBRATION_MARGIN = option('calibration', 'margin_db', 10.0)
+        self.CALIBRATION_TARGET = option('calibration', 'target_level', -20.0)
+        self.CALIBRATION_MIN_GAIN = option('calibration', 'min_gain', 1.0)
+        self.CALIBRATION_MAX_GAIN = option('calibration', 'max_gain', 32.0)
+        self.CALIBRATION_WINDOW = option('calibration', 'window', 10.0)
+        self.OUTPUT_BACKEND = option('output', 'backend', "auto")
+        self.HOTKEY_MODE = option('hotkey', 'mode', "off")
+        self.HOTKEY_KEYS = option('hotkey', 'keys', "<ctrl>+<alt>+<space>")
+        self.OUTPUT_CHUNK_SIZE = option('output', 'chunk_size', 32)
+        self.OUTPUT_MIN_DELAY = option('output', 'min_delay', 0.002)
+        self.OUTPUT_MAX_DELAY = option('output', 'max_delay', 0.05)
+        self.CASCADE_ENABLED = option('cascade', 'enabled', False)
+        self.CASCADE_MODEL = option('cascade', 'model_name', "base")
+        self.CASCADE_MAX_DURATION = option('cascade', 'max_duration', 3.0)
+        self.CASCADE_MIN_LOGPROB = option('cascade', 'min_logprob', -0.8)
+        self.METRICS_ENABLED = option('metrics', 'enabled', False)
+        self.METRICS_HOST = option('metrics', 'host', "127.0.0.1")
+        self.METRICS_PORT = option('metrics', 'port', 9464)
+        self.METRICS_SOCKET = option('metrics', 'socket', "")
+        self.PROFILE_PATH = option('metrics', 'profile_path', "")
+        self.HISTORY_ENABLED = option('history', 'enabled', True)
+        self.HISTORY_PATH = option('history', 'path', "")
+        self.HISTORY_MEMORY_LIMIT = option('history', 'memory_limit', 200)
+        self.HISTORY_PAGE_SIZE = option('history', 'page_size', 50)
+        model_name = option('whisper', 'model_name', "medium")
+        backend_name = option('whisper', 'backend', "auto")
+        device = device or option('whisper', 'device', "auto")
+        compute_type = option('whisper', 'compute_type', "auto")
+        cpu_threads = option('whisper', 'cpu_threads', 0)
+
+        # The model is loaded by start() in the background; until it is ready
+        # finished utterances wait in the inference queue.
+        self.backend_options = (backend_name, model_name, device, compute_type, cpu_threads)
+        self.backend = None
+        self.model_ready = threading.Event()
+        # Why the model could not be loaded, answered to daemon requests
+        self.model_error = None
+        # "cpu" or "unload" while the idle policy has put the model away
+        self.model_parked = None
+        self.model_lock = threading.Lock()
+        self.last_activity = time.monotonic()
+        self.cascade_backend = None
+        # Running estimate of the main model's real-time factor, used to
+        # estimate the time saved by the cascade
+        self.main_rtf = None
+        self.model_thread = None
+        # A language given as argument (--language, the applets) wins over
+        # the one in settings.conf, which is pinned
+        self.language = language or self.LANGUAGE or None
+        self.language_policy = LanguagePolicy(
+            self.language, self.LANGUAGE_PINNED or (bool(self.LANGUAGE) and self.language == self.LANGUAGE),
+            self.LANGUAGE_VOTES, self.LANGUAGE_MIN_PROBABILITY, self.LANGUAGE_RECHECK_LOGPROB
+        )
+        if self.DECODING_PROFILE not in self.DECODING_PROFILES:
+            if self.DECODING_PROFILES:
+                print(f"Unknown decoding profile '{self.DECODING_PROFILE}', using the backend's defaults",
+                      file=sys.stderr)
+            self.DECODING_PROFILES[self.DECODING_PROFILE] = DecodingProfile(self.DECODING_PROFILE)
+        self.active_profile = self.DECODING_PROFILES[self.DECODING_PROFILE]
+        self.sources = self.create_sources()
+        # The first source, for code that only knows about one
+        self.audio_ring = self.sources[0].ring
+        self.inference_queue = queue.Queue(maxsize=self.INFERENCE_QUEUE_SIZE)
+        self.segments_dropped = 0
+        self.max_queue_depth = 0
+        self.metrics = Metrics()
+        self.metrics.collectors.append(self.collect_process_metrics)
+        self.metrics_server = None
+        self.hotkey = None
+        self.profiler = ProfilerHook(self.PROFILE_PATH) if self.PROFILE_PATH else None
+        # Opened by start(); None when history is disabled or unavailable
+        self.history = None
+        self.print_partials = False
+        self.event_queue = event_queue
+        self.use_clipboard = False
+        self.use_typing = False
+        self.should_terminate = False
+        # Cleared while muted: the input streams are stopped and the
+        # segmentation threads wait on it
+        self.listening = threading.Event()
+        self.listening.set()
+        self.stream_lock = threading.Lock()
+        self.output_sink = OutputSink(
+            self.OUTPUT_BACKEND, self.OUTPUT_CHUNK_SIZE, self.TYPE_DELAY,
+            self.OUTPUT_MIN_DELAY, self.OUTPUT_MAX_DELAY, self.metrics
+        )
+        # One input stream per device
+        self.streams = []
+        # Replaces sd.InputStream, e.g. with a simulated device for benchmarks
+        self.stream_factory = None
+        self.inference_thread = None
+
+        commands_path = os.path.join(script_dir, "commands.json")
+        with open(commands_path, "r") as f:
+            self.commands = json.load(f)
+        self.command_language = None
+        self.command_regexes = {}
+        self.set_command_language(self.language or "en")
+
+    muted = property(lambda self: not self.listening.is_set(), lambda self, value: self.set_muted(value))
+
+    def set_muted(self, muted):
+        # Muting stops capture rather than discarding what was captured:
+        # the streams stop and the segmentation threads drop the utterance
+        # in progress and sleep until unmuted.
+        with self.stream_lock:
+            if muted == self.muted:
+                return
+            if muted:
+                self.listening.clear()
+                for stream in self.streams:
+                    stream.stop()
+            else:
+                for source in self.sources:
+                    source.ring.skip()
+                for stream in self.streams:
+                    stream.start()
+                self.listening.set()
+        print(f"Capture {'paused' if muted else 'resumed'}", file=sys.stderr)
+
+    decoding_profile = property(lambda self: self.active_profile.name,
+                                lambda self, value: self.set_decoding_profile(value))
+
+    @property
+    def decoding_profiles(self):
+        return list(self.DECODING_PROFILES)
+
+    def set_decoding_profile(self, name):
+        # Takes effect with the next decode; one already running finishes
+        # with the profile it started with
+        profile = self.DECODING_PROFILES.get(name)
+        if profile is None:
+            print(f"Unknown decoding profile '{name}'", file=sys.stderr)
+            return
+        if profile is not self.active_profile:
+            self.active_profile = profile
+            print(f"Decoding profile: {profile.describe()}", file=sys.stderr)
+
+    def decoding_options(self, timing=None):
+        profile = self.active_profile
+        if timing is not None:
+            timing.profile = profile.name
+        return profile.options()
+
+    def set_command_language(self, language):
+        # Commands are matched in the language being transcribed; one that
+        # commands.json has no phrases for keeps the current commands
+        if self.command_language is not None and (
+                language == self.command_language
+                or not any(language in lang_phrases for lang_phrases in self.commands.values())):
+            return
+        self.command_language = language
+        command_regexes = {}
+        for command, lang_phrases in self.commands.items():
+            phrases = lang_phrases.get(language, [])
+            if isinstance(phrases, str):
+                phrases = [phrases]
+            command_regexes[command] = [self.compile_command_regex(phrase) for phrase in phrases]
+        self.command_regexes = command_regexes
+
+    def compile_command_regex(self, phrase):
+        words = phrase.split()
+        pattern = r"^\s*" + r"[,\s.;:-]*".join(re.escape(word) for word in words) + r"\s*[.!?]?$"
+        return re.compile(pattern, re.IGNORECASE)
+
+    def load_model(self):
+        model_name = self.backend_options[1]
+        print(f"Loading model '{model_name}' in the background...", file=sys.stderr)
+        if self.event_queue:
+            self.event_queue.put(ModelLoadingEvent(model_name))
+        start = time.monotonic()
+        try:
+            self.backend = self.create_model_backend(*self.backend_options)
+        except Exception as e:
+            print(f"Failed to load model: {e}", file=sys.stderr)
+            self.model_error = str(e)
+            if self.event_queue:
+                self.event_queue.put(ModelLoadFailedEvent(str(e)))
+            return
+        load_seconds = time.monotonic() - start
+        print(f"Model ready after {load_seconds:.1f}s", file=sys.stderr)
+        self.model_ready.set()
+        self.enable_features()
+        if self.event_queue:
+            self.event_queue.put(ModelReadyEvent(self.backend.describe(), load_seconds))
+
+        if self.CASCADE_ENABLED:
+            # The small model is loaded after the main one so it never delays
+            # dictation; until it is ready everything goes to the main model.
+            backend_name, _, device, compute_type, cpu_threads = self.backend_options
+            try:
+                self.cascade_backend = self.create_model_backend(
+                    backend_name, self.CASCADE_MODEL, device, compute_type, cpu_threads
+                )
+            except Exception as e:
+                print(f"Failed to load cascade model, routing everything to the main model: {e}", file=sys.stderr)
+
+    def create_model_backend(self, *options):
+        if self.WORKER_PROCESS:
+            return ProcessBackend(create_backend, *options)
+        return create_backend(*options)
+
+    def enable_features(self):
+        # Lets every segmenter compute log-mel features during capture once
+        # the main backend is known to take them. Segmenters pick them up
+        # at the next utterance.
+        if not self.INCREMENTAL_FEATURES or not self.backend or not self.backend.supports_features:
+            return
+        for source in self.sources:
+            if source.segmenter is not None and source.segmenter.features is None:
+                source.segmenter.features = LogMelFeatures(
+                    self.backend.mel_filters, self.UTTERANCE_CAPACITY * self.SAMPLE_RATE
+                )
+
+    def transcribe_routed(self, audio, timing, allow_cascade=True, features=None, **options):
+        # Short segments are tried on the small model first. A command match
+        # is dispatched from that result; anything else is decoded again by
+        # the main model.
+        duration = len(audio) / self.SAMPLE_RATE
+        if allow_cascade and self.cascade_backend and duration <= self.CASCADE_MAX_DURATION:
+            start = time.monotonic()
+            result = self.cascade_backend.transcribe(audio, **options)
+            elapsed = time.monotonic() - start
+            text = result["text"].strip()
+            logprobs = [segment["avg_logprob"] for segment in result.get("segments", []) if "avg_logprob" in segment]
+            confident = not logprobs or min(logprobs) >= self.CASCADE_MIN_LOGPROB
+            command = self.match_command(text) if text and confident else None
+            if command:
+                saved = max(0.0, self.main_rtf * duration - elapsed) if self.main_rtf else 0.0
+                self.metrics.inc("cascade_command_hits", help="Commands answered by the small model")
+                self.metrics.inc("cascade_saved_seconds", saved, help="Estimated main-model time saved")
+                print(f"Cascade: '{command}' recognized by {self.cascade_backend.model_name} "
+                      f"in {elapsed:.2f}s (saved ~{saved:.2f}s)", file=sys.stderr)
+                timing.model = self.cascade_backend.model_name
+                return result
+            self.metrics.inc("cascade_fallthrough", help="Short segments passed on to the main model")
+            self.metrics.inc("cascade_overhead_seconds", elapsed, help="Small-model time spent on fall-through")
+        elif allow_cascade and self.cascade_backend:
+            self.metrics.inc("cascade_skipped_long", help="Segments too long for the small model")
+
+        if features is not None:
+            options["features"] = features
+        start = time.monotonic()
+        result = self.backend.transcribe(audio, **options)
+        elapsed = time.monotonic() - start
+        if duration:
+            rtf = elapsed / duration
+            self.main_rtf = rtf if self.main_rtf is None else 0.8 * self.main_rtf + 0.2 * rtf
+        self.record_language_decode(elapsed, options.get("language") is None)
+        timing.model = self.backend.model_name
+        return result
+
+    def record_language_decode(self, seconds, detected):
+        policy = self.language_policy
+        policy.record_decode(seconds, detected)
+        overhead = policy.detection_seconds()
+        if overhead is None:
+            return
+        self.metrics.set("language_detection_seconds", overhead,
+                         help="Estimated decode time language identification adds per utterance")
+        if not detected:
+            self.metrics.inc("language_detection_saved_seconds", max(0.0, overhead),
+                             help="Estimated decode time saved by keeping the detected language")
+
+    def observe_language(self, result, samples):
+        policy = self.language_policy
+        previous = policy.language
+        if not policy.observe(result, samples / self.SAMPLE_RATE):
+            return
+        if policy.language is None:
+            self.metrics.inc("language_rechecks", help="Times low decoding confidence restarted language detection")
+            print(f"Low confidence in '{previous}', detecting the language again", file=sys.stderr)
+            return
+        self.metrics.inc("language_detections", help="Languages detected and kept")
+        overhead = policy.detection_seconds()
+        saving = f", saving ~{overhead * 1000:.0f} ms per utterance" if overhead else ""
+        print(f"Detected language '{policy.language}', keeping it{saving}", file=sys.stderr)
+        self.set_command_language(policy.language)
+
+    def create_sources(self, rates=None, device_channels=None):
+        # "split" makes every channel of every device its own source, "mix"
+        # averages a device's channels into one source and "first" only
+        # uses channel 0. rates maps devices to their capture rate and
+        # device_channels to the channels their streams are opened with;
+        # with a single configured channel a device's channels are mixed.
+        sources = []
+        for device in self.DEVICES or [None]:
+            label = "default" if device is None else str(device)
+            rate = (rates or {}).get(device) or self.CAPTURE_RATE or self.SAMPLE_RATE
+            ring_capacity = int(self.RING_DURATION * rate)
+            blocksize = max(1, round(self.BLOCKSIZE * rate / self.SAMPLE_RATE))
+            available = (device_channels or {}).get(device) or self.CHANNELS
+            used = min(self.CHANNELS, available)
+            mix_channels = available if self.CHANNELS == 1 else used
+            if self.CHANNEL_MODE == "split" and used > 1:
+                channels = [(f"{label}:{channel}", channel) for channel in range(used)]
+            elif self.CHANNEL_MODE == "first" or mix_channels == 1:
+                channels = [(label, 0)]
+            else:
+                channels = [(label, None)]
+            for name, channel in channels:
+                sources.append(AudioSource(len(sources), name, device, channel, ring_capacity, blocksize,
+                                           rate, self.SAMPLE_RATE, self.GAIN, mix_channels))
+        return sources
+
+    def audio_callback(self, indata, frames, time, status, sources=None):
+        for source in sources or self.sources:
+            source.capture(indata, source.gain)
+
+    def process_audio(self, source=None):
+        source = source or self.sources[0]
+        source.stream_transcript = StreamingTranscript(self.SAMPLE_RATE)
+        vad = create_vad(self)
+        calibration = None
+        if self.CALIBRATION_ENABLED:
+            calibration = NoiseFloorTracker(
+                self.SAMPLE_RATE, vad.frame_size, self.GAIN, self.CALIBRATION_MARGIN, self.CALIBRATION_TARGET,
+                self.CALIBRATION_MIN_GAIN, self.CALIBRATION_MAX_GAIN, self.CALIBRATION_WINDOW
+            )
+        source.gain = self.GAIN
+        source.segmenter = segmenter = Segmenter(
+            self, self.submit_segment, self.submit_partial if self.STREAMING else None, vad, source.index,
+            on_speculative=self.submit_speculative if self.SPECULATION_ENABLED else None, calibration=calibration,
+            on_onset=self.note_activity
+        )
+        if self.model_ready.is_set():
+            self.enable_features()
+        ring = source.ring
+        start_time = time.time()
+        was_open = source.gate_open
+
+        while not self.should_terminate:
+            if self.profiler:
+                self.profiler.check()
+            if not self.listening.is_set():
+                segmenter.discard()
+                while not self.listening.wait(timeout=5) and not self.should_terminate:
+                    pass
+                ring.skip()
+                source.resampler.reset()
+                segmenter.restart()
+                continue
+            warming_up = time.time() - start_time < self.WARMUP_TIME
+            if warming_up and calibration is None:
+                ring.skip()
+                time.sleep(0.1)
+                continue
 
-class TextRecognizedEvent(EngineEvent):
-    def __init__(self, text):
-        self.text = text
+            chunk = ring.read(source.blocksize)
+            if chunk is not None:
+                for piece, gate_open in source.gate(chunk, ring.read_pos - len(chunk)):
+                    if gate_open != was_open and not warming_up:
+                        self.change_gate(source, gate_open)
+                    was_open = gate_open
+                    if not gate_open and not warming_up:
+                        # Outside the push-to-talk gate: never segmented
+                        self.metrics.inc("hotkey_gated_seconds", len(piece) / source.rate,
+                                         help="Audio outside the push-to-talk gate")
+                        continue
+                    piece = source.resampler.process(piece)
+                    if not len(piece):
+                        continue
+                    if warming_up:
+                        # Not transcribed, but it seeds the noise floor
+                        calibration.observe(piece)
+                        calibration.apply(vad)
+                    else:
+                        segmenter.feed(piece)
+                if calibration is not None:
+                    source.gain = calibration.gain
+            elif not ring.wait(timeout=1) and not warming_up and source.gate_open:
+                segmenter.feed_silence(self.BLOCKSIZE)
 
+    def change_gate(self, source, gate_open):
+        # Releasing the hotkey ends the utterance without waiting for
+        # silence_duration. Either way the audio on both sides of the
+        # change is not continuous, so resampling and segmentation start
+        # over from it.
+        segmenter = source.segmenter
+        if not gate_open:
+            if segmenter.speech_started:
+                segmenter.flush()
+                self.metrics.inc("hotkey_endpoints", help="Utterances ended by releasing the push-to-talk hotkey")
+            else:
+                segmenter.discard()
+        source.resampler.reset()
+        segmenter.restart()
 
-class VoxtarixEngine:
-    def __init__(self, device="cuda", language=None, event_queue=None):
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        config = configparser.ConfigParser()
+    def start_hotkey(self):
         try:
-            config_path = os.path.join(script_dir, 'settings.conf')
-            self.SAMPLE_RATE = config.getint('audio', 'sample_rate', fallback=16000)
-            self.CHANNELS = config.getint('audio', 'channels', fallback=1)
-            self.BLOCKSIZE = config.getint('audio', 'blocksize', fallback=1024)
-            self.GAIN = config.getfloat('audio', 'gain', fallback=8.0)
-            self.SILENCE_THRESHOLD = config.getfloat('audio', 'silence_threshold', fallback=0.15)
-            self.SILENCE_DURATION = config.getfloat('audio', 'silence_duration', fallback=2.0)
-            self.MIN_DURATION = config.getfloat('audio', 'min_duration', fallback=0.5)
-            self.WARMUP_TIME = config.getfloat('audio', 'warmup_time', fallback=2.0)
-            self.TYPE_DELAY = config.getfloat('audio', 'type_delay', fallback=0.01)
-            model_name = config.get('whisper', 'model_name', fallback="medium")
+            self.hotkey = HotkeyGate(self.HOTKEY_KEYS, self.HOTKEY_MODE, self.set_gate)
+            self.hotkey.start()
         except Exception as e:
-            print(f"Error reading config file: {e}. Using default values.", file=sys.stderr)
-            model_name = "medium"
+            print(f"Push-to-talk hotkey unavailable, listening continuously: {e}", file=sys.stderr)
+            self.hotkey = None
+            return
+        for source in self.sources:
+            source.gate_open = False
+        action = "Hold" if self.HOTKEY_MODE == "hold" else "Press"
+        print(f"Push-to-talk: {action} {self.HOTKEY_KEYS} to speak", file=sys.stderr)
 
-        self.model = whisper.load_model(model_name, device=device)
-        self.language = language
-        self.audio_queue = queue.Queue()
-        self.event_queue = event_queue
-        self.use_clipboard = False
-        self.use_typing = False
-        self.should_terminate = False
-        self.muted = False
-        self.keyboard_controller = keyboard.Controller()
-        self.stream = None
-        self.processing_thread = None
+    def set_gate(self, gate_open):
+        # The change applies from the sample being captured now, not from
+        # the chunk segmentation happens to read next
+        for source in self.sources:
+            source.gate_changes.append((source.ring.write_pos, gate_open))
+        if gate_open:
+            self.note_activity()
 
-        commands_path = os.path.join(script_dir, "commands.json")
-        with open(commands_path, "r") as f:
-            commands_data = json.load(f)
-        self.command_regexes = {}
-        for command, lang_phrases in commands_data.items():
-            phrases = lang_phrases.get(language or "en", [])
-            if isinstance(phrases, str):
-                phrases = [phrases]
-            self.command_regexes[command] = [self.compile_command_regex(phrase) for phrase in phrases]
+    def submit_partial(self, segment):
+        # Partials are best effort: skip a pass rather than queue behind
+        # another partial of the same source or displace a finished utterance.
+        source = self.sources[segment.source]
+        if source.partial_pending or self.muted or not self.model_ready.is_set():
+            return
+        try:
+            self.inference_queue.put_nowait(segment)
+            source.partial_pending = True
+        except queue.Full:
+            pass
 
-    def compile_command_regex(self, phrase):
-        words = phrase.split()
-        pattern = r"^\s*" + r"[,\s.;:-]*".join(re.escape(word) for word in words) + r"\s*[.!?]?$"
-        return re.compile(pattern, re.IGNORECASE)
+    def submit_speculative(self, segment):
+        # Speculation only uses a model that would otherwise sit idle: it is
+        # skipped when anything else is waiting for inference.
+        if self.muted or not self.model_ready.is_set() or not self.inference_queue.empty():
+            return
+        try:
+            self.inference_queue.put_nowait(segment)
+        except queue.Full:
+            pass
 
-    def audio_callback(self, indata, frames, time, status):
-        amplified_data = indata[:, 0] * self.GAIN
-        amplified_data = np.clip(amplified_data, -1.0, 1.0)
-        self.audio_queue.put(amplified_data.copy())
-
-    def process_audio(self):
-        audio_buffer = np.array([], dtype=np.float32)
-        silence_samples = 0
-        silence_limit = int(self.SILENCE_DURATION * self.SAMPLE_RATE)
-        min_samples = int(self.MIN_DURATION * self.SAMPLE_RATE)
-        max_amplitude_seen = 0.0
-        start_time = time.time()
-        speech_started = False
+    def submit_segment(self, segment):
+        # Called on the processing thread: never blocks on inference, only on
+        # the bounded queue when the "block" policy is configured.
+        self.last_activity = time.monotonic()
+        try:
+            self.inference_queue.put_nowait(segment)
+        except queue.Full:
+            if self.INFERENCE_DROP_POLICY == "drop_oldest":
+                try:
+                    dropped = self.inference_queue.get_nowait()
+                    if dropped.kind == "partial":
+                        self.sources[dropped.source].partial_pending = False
+                    elif dropped.kind == "speculative":
+                        pass
+                    elif dropped.kind == "request":
+                        dropped.reply.put({"error": "dropped by the inference queue"})
+                    else:
+                        self.segments_dropped += 1
+                        print("Inference queue full, dropped oldest utterance", file=sys.stderr)
+                except queue.Empty:
+                    pass
+                try:
+                    self.inference_queue.put_nowait(segment)
+                except queue.Full:
+                    self.segments_dropped += 1
+            elif self.INFERENCE_DROP_POLICY == "block":
+                try:
+                    self.inference_queue.put(segment, timeout=self.INFERENCE_BLOCK_TIMEOUT)
+                except queue.Full:
+                    self.segments_dropped += 1
+                    print("Inference queue still full after blocking, dropped utterance", file=sys.stderr)
+            else:
+                self.segments_dropped += 1
+                print("Inference queue full, dropped newest utterance", file=sys.stderr)
+        self.report_queue_depth()
 
+    def report_queue_depth(self):
+        depth = self.inference_queue.qsize()
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self.metrics.set("inference_queue_depth", depth, help="Segments waiting for inference")
+        self.metrics.set("segments_dropped", self.segments_dropped, help="Segments dropped by the queue policy")
+        self.metrics.set("ring_overruns", sum(source.ring.overruns for source in self.sources),
+                         help="Samples lost because capture outran segmentation")
+        if depth > 1:
+            print(f"Inference queue depth: {depth} (dropped: {self.segments_dropped})", file=sys.stderr)
+        if self.event_queue:
+            self.event_queue.put(InferenceQueueEvent(depth, self.segments_dropped))
+
+    def inference_worker(self):
+        while not self.should_terminate and not self.model_ready.wait(timeout=1):
+            pass
         while not self.should_terminate:
-            if time.time() - start_time < self.WARMUP_TIME:
-                while not self.audio_queue.empty():
-                    try:
-                        self.audio_queue.get_nowait()
-                    except queue.Empty:
-                        break
-                time.sleep(0.1)
+            if self.profiler:
+                self.profiler.check()
+            try:
+                segment = self.inference_queue.get(timeout=1)
+            except queue.Empty:
+                self.check_idle()
                 continue
+            if not self.model_ready.is_set():
+                # Parked by the idle policy: wait for it to come back
+                self.restore_model()
+                while not self.should_terminate and not self.model_ready.wait(timeout=1):
+                    pass
+            if segment.kind != "final" or self.speculation_ready(segment):
+                self.dispatch(segment)
+                continue
+            batch, deferred = self.collect_batch(segment)
+            if len(batch) > 1:
+                self.transcribe_batch_and_handle(batch)
+                self.report_queue_depth()
+            else:
+                self.dispatch(segment)
+            for other in deferred:
+                self.dispatch(other)
 
-            try:
-                chunk = self.audio_queue.get(timeout=1)
-                chunk_size = len(chunk)
-                chunk_amplitude = np.max(np.abs(chunk))
-
-                if chunk_amplitude >= self.SILENCE_THRESHOLD:
-                    speech_started = True
-
-                max_amplitude_seen = max(max_amplitude_seen, chunk_amplitude)
-                audio_buffer = np.append(audio_buffer, chunk)
-
-                if chunk_amplitude < self.SILENCE_THRESHOLD:
-                    silence_samples += chunk_size
-                    if silence_samples >= silence_limit and len(audio_buffer) >= min_samples and speech_started:
-                        if max_amplitude_seen >= self.SILENCE_THRESHOLD:
-                            self.transcribe_and_handle(audio_buffer)
-                        audio_buffer = np.array([], dtype=np.float32)
-                        silence_samples = 0
-                        max_amplitude_seen = 0.0
-                        speech_started = False
-                else:
-                    silence_samples = 0
+    def note_activity(self):
+        # Speech onsets and requests; the first one after the model was
+        # parked brings it back while the utterance is still being spoken
+        self.last_activity = time.monotonic()
+        if self.model_parked:
+            self.restore_model()
+
+    def check_idle(self):
+        # Called by the inference thread, so no decode is running
+        if self.IDLE_POLICY not in ("cpu", "unload"):
+            return
+        idle = time.monotonic() - self.last_activity
+        with self.model_lock:
+            if (self.model_parked or not self.model_ready.is_set() or not self.inference_queue.empty()
+                    or idle < self.IDLE_MINUTES * 60):
+                return
+            rss = process_rss()
+            self.model_ready.clear()
+            if self.IDLE_POLICY == "cpu":
+                if not self.backend.offload():
+                    print("The model already runs on the CPU, the idle policy has nothing to free", file=sys.stderr)
+                    self.IDLE_POLICY = "none"
+                    self.model_ready.set()
+                    return
+                action = "moved the model to the CPU"
+            else:
+                for backend in (self.backend, self.cascade_backend):
+                    if backend:
+                        backend.close()
+                self.backend = None
+                self.cascade_backend = None
+                gc.collect()
+                if "torch" in sys.modules:
+                    sys.modules["torch"].cuda.empty_cache()
+                action = "unloaded the model"
+            self.model_parked = self.IDLE_POLICY
+        self.metrics.inc("model_parks", help="Times the idle policy put the model away")
+        print(f"No speech for {idle / 60:.0f} min, {action} "
+              f"(resident memory {rss / 2 ** 20:.0f} -> {process_rss() / 2 ** 20:.0f} MB)", file=sys.stderr)
+
+    def restore_model(self):
+        # Brings a parked model back in the background
+        with self.model_lock:
+            parked, self.model_parked = self.model_parked, None
+        if parked is not None:
+            threading.Thread(target=self.unpark_model, args=(parked,), name="model", daemon=True).start()
+
+    def unpark_model(self, parked):
+        start = time.monotonic()
+        if parked == "unload":
+            self.load_model()
+        else:
+            self.backend.restore()
+            self.model_ready.set()
+        if self.model_ready.is_set():
+            elapsed = time.monotonic() - start
+            self.metrics.observe("model_restore_seconds", elapsed, help="Time to bring a parked model back")
+            print(f"Model restored after {elapsed:.1f}s", file=sys.stderr)
 
+    def collect_process_metrics(self):
+        # Steady-state cost of the engine: CPU time, context switches (every
+        # wakeup of a thread that blocks costs one) and resident memory
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        self.metrics.set("process_cpu_seconds", usage.ru_utime + usage.ru_stime, help="CPU time of all threads")
+        self.metrics.set("process_context_switches", usage.ru_nvcsw + usage.ru_nivcsw,
+                         help="Voluntary and involuntary context switches of all threads")
+        self.metrics.set("process_resident_bytes", process_rss(), help="Resident memory")
+        self.metrics.set("model_parked", int(self.model_parked is not None),
+                         help="Whether the idle policy put the model away")
+        backend = self.backend
+        if isinstance(backend, ProcessBackend):
+            self.metrics.set("worker_restarts", backend.restarts, help="Restarts of the inference process")
+            self.metrics.set("worker_resident_bytes", process_rss(backend.process.pid),
+                             help="Resident memory of the inference process")
+
+    def dispatch(self, segment):
+        if segment.kind == "partial":
+            self.sources[segment.source].partial_pending = False
+            self.transcribe_partial(segment)
+        elif segment.kind == "request":
+            self.transcribe_request(segment)
+        elif segment.kind == "speculative":
+            self.transcribe_speculative(segment)
+        else:
+            prefix, audio = self.committed_prefix(segment)
+            if not self.commit_speculation(segment, audio):
+                self.transcribe_and_handle(audio, prefix, segment.timing, segment.source,
+                                           self.features_of(segment, audio), segment.continuation)
+            self.report_queue_depth()
+
+    def collect_batch(self, first):
+        # Finished utterances that are already waiting (typically from other
+        # sources while the model was busy) join first in one model call.
+        # With batch_wait the worker also holds the batch open that long for
+        # utterances ending at about the same time. Partials and requests
+        # met on the way are returned to be handled afterwards.
+        batch, deferred = [first], []
+        if self.INFERENCE_MAX_BATCH <= 1 or not self.backend.supports_batching:
+            return batch, deferred
+        deadline = time.monotonic() + self.INFERENCE_BATCH_WAIT
+        while len(batch) < self.INFERENCE_MAX_BATCH:
+            timeout = deadline - time.monotonic()
+            try:
+                segment = self.inference_queue.get(timeout=timeout) if timeout > 0 else self.inference_queue.get_nowait()
             except queue.Empty:
-                silence_samples += self.BLOCKSIZE
-                if silence_samples >= silence_limit and len(audio_buffer) >= min_samples and speech_started:
-                    if max_amplitude_seen >= self.SILENCE_THRESHOLD:
-                        self.transcribe_and_handle(audio_buffer)
-                    audio_buffer = np.array([], dtype=np.float32)
-                    silence_samples = 0
-                    max_amplitude_seen = 0.0
-                    speech_started = False
-
-    def transcribe_and_handle(self, audio_buffer):
+                break
+            if segment.kind == "final" and not self.speculation_ready(segment):
+                batch.append(segment)
+            else:
+                deferred.append(segment)
+        return batch, deferred
+
+    def transcribe_batch_and_handle(self, batch):
+        # The cascade is skipped here: the batch already shares one pass of
+        # the main model.
+        if self.muted:
+            print(f"Discarding {len(batch)} utterances due to mute", file=sys.stderr)
+            return
+        prefixes, audios = zip(*(self.committed_prefix(segment) for segment in batch))
+        for segment in batch:
+            self.discard_speculation(self.sources[segment.source])
+        profile = self.active_profile
+        options = profile.options()
+        if self.backend.supports_features:
+            options["features"] = [self.features_of(segment, audio) for segment, audio in zip(batch, audios)]
+        start = time.monotonic()
+        try:
+            results = self.backend.transcribe_batch(list(audios), language=self.language_policy.language,
+                                                    condition_on_previous_text=False, **options)
+        except Exception as e:
+            self.metrics.inc("inference_errors", len(batch), help="Failed transcriptions")
+            print(f"Whisper error: {e}", file=sys.stderr)
+            return
+        end = time.monotonic()
+        self.metrics.observe("inference_batch_size", len(batch), buckets=(1, 2, 4, 8, 16, 32),
+                             help="Utterances decoded per model call")
+        print(f"Decoded {len(batch)} utterances in one batch in {end - start:.2f}s", file=sys.stderr)
+        for segment, prefix, audio, result in zip(batch, prefixes, audios, results):
+            self.observe_language(result, len(audio))
+            timing = segment.timing or UtteranceTiming(audio_duration=len(segment.audio) / self.SAMPLE_RATE)
+            timing.inference_start, timing.inference_end = start, end
+            timing.model = self.backend.model_name
+            timing.profile = profile.name
+            text = " ".join(part for part in (prefix, result["text"].strip()) if part) if prefix else result["text"]
+            self.handle_text(text, timing, segment.source, segment.continuation)
+
+    def submit_request(self, audio, language=None):
+        # Audio submitted by a daemon client goes through the inference
+        # thread like everything else, so it never races the microphone
+        # pipeline for the model. Blocks until the result is ready, at most
+        # REQUEST_TIMEOUT seconds; errors are returned as {"error": ...}.
+        if self.model_error is not None:
+            return {"error": f"model failed to load: {self.model_error}"}
+        self.note_activity()
+        segment = Segment(audio, kind="request")
+        segment.language = language
+        segment.reply = queue.Queue(maxsize=1)
+        segment.cancelled = False
+        try:
+            self.inference_queue.put(segment, timeout=self.INFERENCE_BLOCK_TIMEOUT)
+        except queue.Full:
+            return {"error": "inference queue full"}
+        self.report_queue_depth()
+        try:
+            return segment.reply.get(timeout=self.REQUEST_TIMEOUT)
+        except queue.Empty:
+            # Not decoded once the worker gets to it
+            segment.cancelled = True
+            return {"error": f"no result within {self.REQUEST_TIMEOUT:g}s"}
+
+    def transcribe_request(self, segment):
+        if segment.cancelled:
+            return
+        try:
+            result = self.backend.transcribe(
+                segment.audio,
+                language=segment.language,
+                condition_on_previous_text=False,
+                **self.decoding_options()
+            )
+            segment.reply.put({"text": result["text"].strip(), "language": result.get("language")})
+        except Exception as e:
+            print(f"Whisper error: {e}", file=sys.stderr)
+            segment.reply.put({"error": str(e)})
+
+    def finals_waiting(self):
+        with self.inference_queue.mutex:
+            return any(waiting.kind in ("final", "request") for waiting in self.inference_queue.queue)
+
+    def speculation_ready(self, segment):
+        speculation = self.sources[segment.source].speculation
+        return (speculation is not None and not speculation.cancelled
+                and speculation.utterance_id == segment.utterance_id)
+
+    def transcribe_speculative(self, segment):
+        # Decodes what the utterance would be if it ended at this pause. The
+        # result is kept for the final segment and only used if that covers
+        # exactly the same audio.
+        source = self.sources[segment.source]
+        # It was queued while the model was idle; by now utterances that
+        # really ended (of other sources, or this one) may be waiting, and
+        # they go first
+        if segment.cancelled or self.muted or self.finals_waiting():
+            self.metrics.inc("speculation_cancelled", help="Speculative segments dropped before decoding")
+            return
+        transcript = source.stream_transcript
+        prefix, audio = "", segment.audio
+        if transcript is not None and transcript.utterance_id == segment.utterance_id:
+            prefix = transcript.committed_text()
+            audio = segment.audio[max(0, transcript.committed_samples - segment.offset):]
+        segment.start = segment.position + len(segment.audio) - len(audio)
+        segment.length = len(audio)
+        segment.timing = UtteranceTiming(audio_duration=len(audio) / self.SAMPLE_RATE)
+        start = time.monotonic()
+        try:
+            result = self.transcribe_routed(audio, segment.timing, allow_cascade=not prefix,
+                                            features=self.features_of(segment, audio),
+                                            language=self.language_policy.language,
+                                            condition_on_previous_text=False,
+                                            **self.decoding_options(segment.timing))
+        except Exception as e:
+            self.metrics.inc("inference_errors", help="Failed transcriptions")
+            print(f"Whisper error: {e}", file=sys.stderr)
+            return
+        segment.cost = time.monotonic() - start
+        # Counts for the language only once the utterance really ends here
+        segment.result = result
+        segment.text = " ".join(part for part in (prefix, result["text"].strip()) if part) if prefix else result["text"]
+        self.metrics.inc("speculation_decodes", help="Speculative decodes run")
+        self.metrics.observe("speculative_inference_seconds", segment.cost,
+                             help="Inference time of speculative decodes, used or not")
+        self.discard_speculation(source)
+        source.speculation = segment
+
+    def discard_speculation(self, source):
+        speculation, source.speculation = source.speculation, None
+        if speculation is not None:
+            self.metrics.inc("speculation_wasted", help="Speculative decodes not used")
+            self.metrics.inc("speculation_wasted_seconds", speculation.cost,
+                             help="Model time spent on unused speculative decodes")
+
+    def commit_speculation(self, segment, audio):
+        # Hands out the speculative result if it decoded exactly this audio
+        source = self.sources[segment.source]
+        speculation = source.speculation
+        start = segment.position + len(segment.audio) - len(audio)
+        if (speculation is None or speculation.cancelled or speculation.utterance_id != segment.utterance_id
+                or speculation.start != start or speculation.length != len(audio)):
+            self.discard_speculation(source)
+            return False
+        source.speculation = None
+        if self.muted:
+            return True
+        self.metrics.inc("speculation_hits", help="Final segments answered by a speculative decode")
+        self.metrics.inc("speculation_saved_seconds", speculation.cost,
+                         help="Model time after the endpoint saved by speculation")
+        timing = segment.timing or UtteranceTiming(audio_duration=len(audio) / self.SAMPLE_RATE)
+        # The decode happened before the endpoint; from there on only the
+        # hand-off counts
+        timing.inference_start = timing.inference_end = time.monotonic()
+        timing.speculative = True
+        timing.model = speculation.timing.model
+        timing.profile = speculation.timing.profile
+        self.observe_language(speculation.result, speculation.length)
+        self.handle_text(speculation.text, timing, segment.source, segment.continuation)
+        return True
+
+    def features_of(self, segment, audio):
+        # Precomputed features only describe the segment's whole audio
+        return segment.features if len(audio) == len(segment.audio) else None
+
+    def committed_prefix(self, segment):
+        # A partial queued ahead of the final segment may have committed
+        # words past the point where the segmenter cut, so skip that audio.
+        transcript = self.sources[segment.source].stream_transcript
+        if transcript is None or transcript.utterance_id != segment.utterance_id:
+            return "", segment.audio
+        prefix = transcript.committed_text()
+        audio = segment.audio[max(0, transcript.committed_samples - segment.offset):]
+        transcript.reset(None)
+        return prefix, audio
+
+    def transcribe_partial(self, segment):
+        if self.muted:
+            return
+        try:
+            result = self.backend.transcribe(
+                segment.audio,
+                language=self.language_policy.language,
+                condition_on_previous_text=False,
+                word_timestamps=True,
+                **self.decoding_options()
+            )
+        except Exception as e:
+            print(f"Whisper error: {e}", file=sys.stderr)
+            return
+        words = [(word["word"], word["end"]) for part in result["segments"] for word in part.get("words", [])]
+        source = self.sources[segment.source]
+        committed, tentative = source.stream_transcript.update(segment, words)
+        source.segmenter.commit(segment.utterance_id, source.stream_transcript.committed_samples)
+        event = PartialTextEvent(committed, tentative, source.name)
+        if self.event_queue:
+            self.event_queue.put(event)
+        if self.print_partials:
+            print(f"\r\033[K... {event.text}", end="", file=sys.stderr, flush=True)
+
+    def transcribe_and_handle(self, audio_buffer, prefix="", timing=None, source=0, features=None,
+                              continuation=False):
         if self.muted:
             print("Discarding audio input due to mute", file=sys.stderr)
             return
+        if timing is None:
+            timing = UtteranceTiming(audio_duration=len(audio_buffer) / self.SAMPLE_RATE)
         try:
-            result = self.model.transcribe(
+            timing.inference_start = time.monotonic()
+            # Streaming prefixes mean the tail of a longer utterance, never a command
+            result = self.transcribe_routed(
                 audio_buffer,
-                language=None,
-                condition_on_previous_text=False
+                timing,
+                allow_cascade=not prefix,
+                features=features,
+                language=self.language_policy.language,
+                condition_on_previous_text=False,
+                **self.decoding_options(timing)
             )
-            text = result["text"]
-            if self.event_queue:
-                self.event_queue.put(TextRecognizedEvent(text))
-            if not text:
-                print("[Empty]", flush=True)
-                if self.use_clipboard:
-                    print(f"Attempting to copy: '[Empty]' to clipboard", file=sys.stderr)
-                    pyperclip.copy("[Empty]")
-            else:
-                command_recognized = self.handle_command(text)
-                if not command_recognized:
-                    print(text, flush=True)
-                    if self.use_clipboard:
-                        print(f"Attempting to copy: '{text}' to clipboard", file=sys.stderr)
-                        pyperclip.copy(text)
-                    if self.use_typing:
-                        print(f"Attempting to type: '{text}'", file=sys.stderr)
-                        for char in text:
-                            try:
-                                self.keyboard_controller.type(char)
-                                time.sleep(self.TYPE_DELAY)
-                            except ValueError:
-                                print(f"Failed to type character: '{char}'", file=sys.stderr)
+            timing.inference_end = time.monotonic()
+            self.observe_language(result, len(audio_buffer))
+            text = " ".join(part for part in (prefix, result["text"].strip()) if part) if prefix else result["text"]
         except Exception as e:
+            self.metrics.inc("inference_errors", help="Failed transcriptions")
             print(f"Whisper error: {e}", file=sys.stderr)
+            return
+        self.handle_text(text, timing, source, continuation)
+
+    def handle_text(self, text, timing, source=0, continuation=False):
+        source_name = self.sources[source].name
+        if continuation:
+            stitched = stitch_overlap(self.sources[source].last_words, text)
+            if text.strip() and not stitched:
+                # Nothing but the overlap again
+                self.finish_timing(timing)
+                return
+            text = stitched
+        self.sources[source].last_words = [normalize_word(word) for word in text.split()[-self.STITCH_WORDS:]]
+        # With several sources every line says where it came from
+        label = f"[{source_name}] " if len(self.sources) > 1 else ""
+        if self.print_partials:
+            print("\r\033[K", end="", file=sys.stderr, flush=True)
+        entry = self.record_history(text)
+        if self.event_queue:
+            self.event_queue.put(TextRecognizedEvent(text, timing, entry, source_name))
+        if not text:
+            print(f"{label}[Empty]", flush=True)
+            output = "[Empty]"
+            copy, type_text = self.use_clipboard, False
+        elif self.handle_command(text):
+            output = text
+            copy, type_text = False, False
+        else:
+            print(f"{label}{text}", flush=True)
+            output = text
+            copy, type_text = self.use_clipboard, self.use_typing
+        if copy or type_text:
+            self.output_sink.deliver(output, copy, type_text, lambda: self.finish_timing(timing))
+        else:
+            self.finish_timing(timing)
+
+    def record_history(self, text):
+        text = text.strip()
+        if self.history is None or not text:
+            return None
+        try:
+            return self.history.add(text)
+        except sqlite3.Error as e:
+            print(f"Failed to save history entry: {e}", file=sys.stderr)
+            return None
+
+    def open_history(self):
+        path = os.path.expanduser(self.HISTORY_PATH or default_history_path())
+        try:
+            self.history = HistoryStore(path, self.HISTORY_MEMORY_LIMIT)
+            print(f"History: {path} ({self.history.count()} entries)", file=sys.stderr)
+        except (sqlite3.Error, OSError) as e:
+            print(f"History unavailable: {e}", file=sys.stderr)
+
+    def finish_timing(self, timing):
+        timing.output_done = time.monotonic()
+        self.record_timing(timing)
+
+    def record_timing(self, timing):
+        print(f"Timing: {timing.describe()}", file=sys.stderr)
+        self.metrics.inc("utterances", help="Transcribed utterances")
+        self.metrics.inc("audio_seconds", timing.audio_duration, help="Seconds of audio transcribed")
+        self.metrics.observe("audio_duration_seconds", timing.audio_duration, help="Utterance length")
+        spans = timing.spans()
+        for name, value in spans.items():
+            if value is not None:
+                self.metrics.observe(f"{name}_seconds", value, help=f"Per-utterance {name.replace('_', ' ')} time")
+        # None for speculation hits, whose decode isn't timed per utterance
+        inference = spans["inference"]
+        if inference is not None and timing.audio_duration:
+            self.metrics.observe("real_time_factor", inference / timing.audio_duration,
+                                 buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0), help="Inference time / audio time")
+        if timing.profile:
+            # The latency side of each profile's tradeoff
+            profile = re.sub(r"\W", "_", timing.profile)
+            end_to_end = timing.span("speech_end", "output_done")
+            self.metrics.inc(f"profile_{profile}_utterances",
+                             help=f"Utterances decoded with the {timing.profile} profile")
+            if inference is not None:
+                self.metrics.observe(f"profile_{profile}_inference_seconds", inference,
+                                     help=f"Inference time with the {timing.profile} profile")
+            if end_to_end is not None:
+                self.metrics.observe(f"profile_{profile}_end_to_end_seconds", end_to_end,
+                                     help=f"End-to-end latency with the {timing.profile} profile")
+
+    def stop_streams(self):
+        for stream in self.streams:
+            stream.stop()
+            stream.close()
+
+    def install_profiler_signal(self, signum=None):
+        # Must be called from the main thread
+        if self.profiler:
+            signal.signal(signum or signal.SIGUSR2, self.profiler.toggle)
+            print(f"Send SIGUSR2 to pid {os.getpid()} to toggle profiling", file=sys.stderr)
+
+    def match_command(self, text):
+        for command, regexes in self.command_regexes.items():
+            if any(regex.match(text) for regex in regexes):
+                return command
+        return None
 
     def handle_command(self, text):
         print(f"Received text: '{text}'", file=sys.stderr)
-        command_recognized = False
-        for command, regexes in self.command_regexes.items():
-            for regex in regexes:
-                if regex.match(text):
-                    print(f"Matched command: {command} with text: {text}", file=sys.stderr)
-                    command_recognized = True
-                    if command == "terminate":
-                        print("Terminating program on voice command...", file=sys.stderr)
-                        self.should_terminate = True
-                        if self.event_queue:
-                            self.event_queue.put(EngineTerminatedEvent())
-                    elif command == "clipboard_on":
-                        self.use_clipboard = True
-                        print("Clipboard enabled", file=sys.stderr)
-                        if self.event_queue:
-                            self.event_queue.put(ClipboardStateChangedEvent(True))
-                    elif command == "clipboard_off":
-                        self.use_clipboard = False
-                        print("Clipboard disabled", file=sys.stderr)
-                        if self.event_queue:
-                            self.event_queue.put(ClipboardStateChangedEvent(False))
-                    elif command == "typing_on":
-                        self.use_typing = True
-                        print("Typing enabled", file=sys.stderr)
-                        if self.event_queue:
-                            self.event_queue.put(TypingStateChangedEvent(True))
-                    elif command == "typing_off":
-                        self.use_typing = False
-                        print("Typing disabled", file=sys.stderr)
-                        if self.event_queue:
-                            self.event_queue.put(TypingStateChangedEvent(False))
-                    else:
-                        if self.use_clipboard:
-                            print(f"Attempting to copy: '{text}' to clipboard", file=sys.stderr)
-                            pyperclip.copy(text)
-                        if self.use_typing:
-                            for char in text:
-                                try:
-                                    self.keyboard_controller.type(char)
-                                    time.sleep(self.TYPE_DELAY)
-                                except ValueError:
-                                    pass
-                    break
-        return command_recognized
+        command = self.match_command(text)
+        if command is None:
+            return False
+        print(f"Matched command: {command} with text: {text}", file=sys.stderr)
+        if command == "terminate":
+            print("Terminating program on voice command...", file=sys.stderr)
+            self.should_terminate = True
+            if self.event_queue:
+                self.event_queue.put(EngineTerminatedEvent())
+        elif command == "clipboard_on":
+            self.use_clipboard = True
+            print("Clipboard enabled", file=sys.stderr)
+            if self.event_queue:
+                self.event_queue.put(ClipboardStateChangedEvent(True))
+        elif command == "clipboard_off":
+            self.use_clipboard = False
+            print("Clipboard disabled", file=sys.stderr)
+            if self.event_queue:
+                self.event_queue.put(ClipboardStateChangedEvent(False))
+        elif command == "typing_on":
+            self.use_typing = True
+            print("Typing enabled", file=sys.stderr)
+            if self.event_queue:
+                self.event_queue.put(TypingStateChangedEvent(True))
+        elif command == "typing_off":
+            self.use_typing = False
+            print("Typing disabled", file=sys.stderr)
+            if self.event_queue:
+                self.event_queue.put(TypingStateChangedEvent(False))
+        elif command.startswith("profile_") and command[len("profile_"):] in self.DECODING_PROFILES:
+            self.set_decoding_profile(command[len("profile_"):])
+            if self.event_queue:
+                self.event_queue.put(DecodingProfileChangedEvent(self.decoding_profile))
+        else:
+            self.output_sink.deliver(text, self.use_clipboard, self.use_typing)
+        return True
 
     def start(self):
-        default_input_device = sd.default.device[0]
-        if default_input_device is None:
-            print("No default input device found! Please check microphone.", file=sys.stderr)
-            sys.exit(1)
-        dev = sd.query_devices(default_input_device)
-        print(f"Selected device: {dev['name']}", file=sys.stderr)
-
-        self.stream = sd.InputStream(
-            device=default_input_device,
-            samplerate=self.SAMPLE_RATE,
-            channels=self.CHANNELS,
-            blocksize=self.BLOCKSIZE,
-            callback=self.audio_callback,
-            dtype='float32'
-        )
+        if self.backend is not None:
+            self.model_ready.set()
+            self.enable_features()
+        elif self.model_thread is None:
+            self.model_thread = threading.Thread(target=self.load_model, daemon=True)
+            self.model_thread.start()
+
+        devices = list(dict.fromkeys(source.device for source in self.sources))
+        stream_factory = self.stream_factory
+        rates = {}
+        device_channels = {}
+        if stream_factory is None:
+            import sounddevice as sd
+            if None in devices and sd.default.device[0] is None:
+                print("No default input device found! Please check microphone.", file=sys.stderr)
+                sys.exit(1)
+            for device in devices:
+                dev = sd.query_devices(sd.default.device[0] if device is None else device, kind="input")
+                # Capture at the device's native rate so the driver does no
+                # (often poor) resampling of its own
+                rates[device] = self.CAPTURE_RATE or int(dev['default_samplerate'])
+                # Opened with the configured channels where the device takes
+                # them: default devices such as ALSA's "default" report
+                # dozens of channels that would only dilute the microphone.
+                # A device that refuses them, e.g. one that only offers
+                # stereo, is opened with its own channels, mixed down.
+                device_channels[device] = self.CHANNELS
+                try:
+                    sd.check_input_settings(device=device, channels=self.CHANNELS, dtype='float32',
+                                            samplerate=rates[device])
+                except (sd.PortAudioError, ValueError):
+                    device_channels[device] = max(1, int(dev['max_input_channels']))
+                    print(f"{dev['name']} can't be opened with {self.CHANNELS} channel(s), "
+                          f"using {device_channels[device]}", file=sys.stderr)
+                print(f"Selected device: {dev['name']} ({rates[device]} Hz, {device_channels[device]} channel(s))",
+                      file=sys.stderr)
+            stream_factory = sd.InputStream
+        if device_channels or any(source.rate != (rates.get(source.device) or self.CAPTURE_RATE or self.SAMPLE_RATE)
+                                  for source in self.sources):
+            self.sources = self.create_sources(rates, device_channels)
+            self.audio_ring = self.sources[0].ring
+        source_of = {source.device: source for source in self.sources}
 
-        self.stream.start()
-        self.processing_thread = threading.Thread(target=self.process_audio, daemon=True)
-        self.processing_thread.start()
+        self.streams = [
+            stream_factory(
+                device=device,
+                samplerate=source_of[device].rate,
+                channels=device_channels.get(device, self.CHANNELS),
+                blocksize=source_of[device].blocksize,
+                callback=functools.partial(
+                    self.audio_callback, sources=[source for source in self.sources if source.device == device]
+                ),
+                dtype='float32'
+            )
+            for device in devices
+        ]
+
+        if self.HOTKEY_MODE in ("hold", "toggle") and self.hotkey is None:
+            self.start_hotkey()
+
+        if self.HISTORY_ENABLED and self.history is None:
+            self.open_history()
+
+        if self.METRICS_ENABLED and self.metrics_server is None:
+            self.metrics_server = start_metrics_server(
+                self.metrics, self.METRICS_HOST, self.METRICS_PORT, self.METRICS_SOCKET or None
+            )
+
+        self.output_sink.start()
+        self.last_activity = time.monotonic()
+        if not self.muted:
+            for stream in self.streams:
+                stream.start()
+        for source in self.sources:
+            name = "segmentation" if len(self.sources) == 1 else f"segmentation-{source.name}"
+            source.thread = threading.Thread(target=self.process_audio, args=(source,), name=name, daemon=True)
+            source.thread.start()
+        self.inference_thread = threading.Thread(target=self.inference_worker, name="inference", daemon=True)
+        self.inference_thread.start()
         print("Aufnahme läuft... (Strg+C zum Beenden)", file=sys.stderr)
 
+
+AUDIO_FILE_EXTENSIONS = (".wav", ".flac")
+
+
+def find_audio_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(AUDIO_FILE_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def pcm_to_float(data, sample_width, channels):
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = ((raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)) << 8 >> 8).astype(np.float32) / 8388608.0
+    else:
+        samples = np.frombuffer(data, dtype="<i4").astype(np.float32) / 2147483648.0
+    return samples.reshape(-1, channels).mean(axis=1)
+
+
+def iter_audio_file(path, sample_rate, block_seconds=30.0):
+    # Yields mono float32 blocks at sample_rate without loading the whole
+    # file. The reader is picked from the header alone: errors further in
+    # are raised, not retried with soundfile, which would yield the blocks
+    # read so far a second time.
+    try:
+        f = wave.open(path, "rb")
+    except (wave.Error, EOFError):
+        f = None
+
+    if f is not None:
+        with f:
+            rate, channels, width = f.getframerate(), f.getnchannels(), f.getsampwidth()
+            resampler = PolyphaseResampler(rate, sample_rate)
+            while True:
+                data = f.readframes(int(block_seconds * rate))
+                if not data:
+                    return
+                yield resampler.process(pcm_to_float(data, width, channels))
+
+    # FLAC and WAV variants the wave module can't read (e.g. float samples)
+    import soundfile
+    with soundfile.SoundFile(path) as f:
+        resampler = PolyphaseResampler(f.samplerate, sample_rate)
+        for block in f.blocks(blocksize=int(block_seconds * f.samplerate), dtype="float32", always_2d=True):
+            yield resampler.process(block.mean(axis=1))
+
+
+def batch_workers(backend_class, device, cpu_threads, requested=0):
+    # Threads sharing the one model. Only backends that serve concurrent
+    # calls get more than one: openai-whisper's decoder keeps its kv-cache
+    # in hooks on the shared modules, and torch's thread count is global.
+    # One worker per GPU model (batching does the rest); on the CPU as many
+    # workers as fit with the configured threads per worker.
+    if not backend_class.concurrent:
+        return 1
+    if requested:
+        return requested
+    if device == "cuda":
+        return 1
+    return max(1, (os.cpu_count() or 1) // max(1, cpu_threads or 4))
+
+
+class BatchTranscriber:
+    # Streams recorded files through the live segmenter and fans the
+    # segments out to a worker pool, batching them per model call where the
+    # backend supports it. Results are written as JSON lines.
+    def __init__(self, engine, output, workers, batch_size, gain=1.0):
+        self.engine = engine
+        self.output = output
+        self.workers = workers
+        self.batch_size = batch_size
+        self.gain = gain
+        self.pending = []
+        # Bounds the segments held in memory while the workers catch up
+        self.slots = threading.BoundedSemaphore(2 * workers)
+        self.lock = threading.Lock()
+        self.audio_seconds = 0.0
+        self.segments = 0
+        self.errors = 0
+
+    def run(self, paths):
+        from concurrent.futures import ThreadPoolExecutor
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for path in find_audio_files(paths):
+                try:
+                    self.transcribe_file(path, executor)
+                except Exception as e:
+                    print(f"Failed to read {path}: {e}", file=sys.stderr)
+                    self.errors += 1
+            self.submit_batch(executor)
+        wall_seconds = time.monotonic() - start
+
+        throughput = self.audio_seconds / wall_seconds if wall_seconds else 0.0
+        print(f"Transcribed {self.audio_seconds / 3600:.2f} audio hours in {wall_seconds / 3600:.3f} wall hours "
+              f"({self.segments} segments, {self.errors} errors): "
+              f"{throughput:.1f} audio-hours per wall-hour", file=sys.stderr)
+        return throughput
+
+    def transcribe_file(self, path, executor):
+        print(f"Transcribing {path}", file=sys.stderr)
+        # Segments are transcribed out of order here, so forced cuts get no
+        # overlap that would have to be stitched
+        segmenter = Segmenter(self.engine, lambda segment: self.add_segment(path, segment, executor), overlap=0)
+        blocksize = self.engine.BLOCKSIZE
+        for block in iter_audio_file(path, self.engine.SAMPLE_RATE):
+            if self.gain != 1.0:
+                block = np.clip(block * self.gain, -1.0, 1.0)
+            for i in range(0, len(block), blocksize):
+                segmenter.feed(block[i:i + blocksize])
+            self.audio_seconds += len(block) / self.engine.SAMPLE_RATE
+        segmenter.flush()
+
+    def add_segment(self, path, segment, executor):
+        self.pending.append((path, segment))
+        if len(self.pending) >= self.batch_size:
+            self.submit_batch(executor)
+
+    def submit_batch(self, executor):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        self.slots.acquire()
+        future = executor.submit(self.transcribe_batch, batch)
+        future.add_done_callback(lambda _: self.slots.release())
+
+    def transcribe_batch(self, batch):
+        sample_rate = self.engine.SAMPLE_RATE
+        start = time.monotonic()
+        try:
+            results = self.engine.backend.transcribe_batch(
+                [segment.audio for _, segment in batch],
+                language=self.engine.language,
+                condition_on_previous_text=False,
+                **self.engine.decoding_options()
+            )
+        except Exception as e:
+            print(f"Whisper error: {e}", file=sys.stderr)
+            results = [{"error": str(e)}] * len(batch)
+        inference_seconds = time.monotonic() - start
+
+        with self.lock:
+            for (path, segment), result in zip(batch, results):
+                text = result.get("text", "").strip()
+                record = {
+                    "file": path,
+                    "start": round(segment.position / sample_rate, 3),
+                    "end": round((segment.position + len(segment.audio)) / sample_rate, 3),
+                    "text": text,
+                    "language": result.get("language"),
+                    "command": self.engine.match_command(text) if text else None,
+                    "batch_size": len(batch),
+                    "inference_seconds": round(inference_seconds, 3),
+                }
+                if "error" in result:
+                    record["error"] = result["error"]
+                    self.errors += 1
+                self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self.segments += 1
+            self.output.flush()
+
+
+def run_batch_transcription(args):
+    engine = VoxtarixEngine(language=args.language)
+    backend_name, model_name, device, compute_type, cpu_threads = engine.backend_options
+    device = detect_device(device)
+    backend_class = resolve_backend(backend_name, device)
+    workers = batch_workers(backend_class, device, cpu_threads, args.workers)
+    if args.workers > workers:
+        print(f"The {backend_class.name} backend runs one segment at a time, ignoring --workers", file=sys.stderr)
+    if device == "cpu" and not cpu_threads:
+        cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+    engine.backend = create_backend(backend_class.name, model_name, device, compute_type, cpu_threads, workers)
+    batch_size = args.batch_size or (8 if engine.backend.supports_batching and device == "cuda" else 1)
+    print(f"Using {workers} worker(s), batch size {batch_size}", file=sys.stderr)
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        BatchTranscriber(engine, output, workers, batch_size, args.gain).run(args.paths)
+    finally:
+        if args.output:
+            output.close()
+
+
+def read_daemon_settings():
+    # The daemon settings are needed before an engine exists, by clients
+    # deciding whether to connect to one
+    option = functools.partial(config_option, read_settings())
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    default_socket = os.path.join(runtime_dir, f"voxtarix-{os.getuid()}.sock")
+    return {
+        "enabled": option("daemon", "enabled", True),
+        "socket": os.path.expanduser(option("daemon", "socket", "") or default_socket),
+        "connect_timeout": option("daemon", "connect_timeout", 10.0),
+        "subscriber_queue": option("daemon", "subscriber_queue", 256),
+    }
+
+
+def encode_audio(audio):
+    return base64.b64encode(np.ascontiguousarray(audio, dtype="<f4").tobytes()).decode("ascii")
+
+
+def decode_audio(data):
+    return np.frombuffer(base64.b64decode(data), dtype="<f4").astype(np.float32)
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    # One JSON object per line in both directions. Every request gets one
+    # reply ({"ok": true, ...} or {"ok": false, "error": ...}) except
+    # "subscribe", after which the connection only carries {"event": ...}
+    # lines until the client goes away.
+    # Seconds between checks whether a subscriber has gone away
+    EVENT_POLL = 0.2
+
+    def handle(self):
+        daemon = self.server.daemon
+        daemon.connect()
+        try:
+            self.serve(daemon)
+        finally:
+            daemon.disconnect()
+
+    def serve(self, daemon):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request.get("op")
+                if op == "subscribe":
+                    self.stream_events(daemon)
+                    return
+                reply = daemon.handle_request(op, request)
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            try:
+                self.send(reply)
+            except OSError:
+                return
+
+    def send(self, message):
+        self.wfile.write(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+        self.wfile.flush()
+
+    def stream_events(self, daemon):
+        # Subscribers send nothing after the request, so the socket turns
+        # readable only when the client goes away; checking it between
+        # events notices an idle client without waiting for a failed write.
+        events = daemon.subscribe()
+        try:
+            self.send(dict(daemon.state(), ok=True))
+            while not daemon.stopped:
+                if select.select([self.connection], [], [], 0)[0] and not self.connection.recv(4096):
+                    return
+                try:
+                    line = events.get(timeout=self.EVENT_POLL)
+                except queue.Empty:
+                    continue
+                self.wfile.write(line)
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            daemon.unsubscribe(events)
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class EngineDaemon:
+    # Owns the one VoxtarixEngine (stream, model, history) and shares it
+    # with any number of clients over a Unix socket. It stands in for the
+    # engine's event_queue and fans every event out to the subscribers;
+    # a subscriber that stops reading loses events instead of stalling
+    # the engine. A daemon started on demand by a client exits once the
+    # last client is gone; one started by hand keeps running, but stops
+    # typing and copying when nobody is left to see or switch them off.
+    # Seconds an on-demand daemon waits for a new client before exiting
+    EXIT_GRACE = 2.0
+
+    def __init__(self, engine, socket_path, subscriber_queue=256, on_demand=False):
+        self.engine = engine
+        self.socket_path = socket_path
+        self.subscriber_queue = subscriber_queue
+        self.on_demand = on_demand
+        self.subscribers = []
+        self.connections = 0
+        # When the last client disconnected; None while any is connected
+        # and before the first one came
+        self.unused_since = None
+        self.lock = threading.Lock()
+        self.server = None
+        self.lock_file = None
+        self.stopped = False
+        engine.event_queue = self
+
+    def acquire(self):
+        # A lock file next to the socket makes sure only one daemon binds it,
+        # even when several clients start one at the same moment
+        self.lock_file = open(self.socket_path + ".lock", "w")
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.lock_file.close()
+            self.lock_file = None
+            return False
+        return True
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        # The socket is created private rather than chmod'ed after bind,
+        # which would leave it open to others for a moment in /tmp
+        umask = os.umask(0o177)
+        try:
+            self.server = DaemonServer(self.socket_path, DaemonRequestHandler)
+        finally:
+            os.umask(umask)
+        self.server.daemon = self
+        threading.Thread(target=self.server.serve_forever, name="daemon", daemon=True).start()
+        print(f"Daemon listening on {self.socket_path}", file=sys.stderr)
+
+    def stop(self):
+        self.stopped = True
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        if self.lock_file:
+            self.lock_file.close()
+
+    def connect(self):
+        with self.lock:
+            self.connections += 1
+            self.unused_since = None
+
+    def disconnect(self):
+        with self.lock:
+            self.connections -= 1
+            if self.connections:
+                return
+            self.unused_since = time.monotonic()
+        print("Last client disconnected", file=sys.stderr)
+        if not self.on_demand:
+            self.release_outputs()
+
+    def release_outputs(self):
+        engine = self.engine
+        if engine.use_typing:
+            engine.use_typing = False
+            self.put(TypingStateChangedEvent(False))
+        if engine.use_clipboard:
+            engine.use_clipboard = False
+            self.put(ClipboardStateChangedEvent(False))
+
+    def unused(self):
+        # Whether an on-demand daemon has been without clients for too long
+        since = self.unused_since
+        return self.on_demand and since is not None and time.monotonic() - since > self.EXIT_GRACE
+
+    def subscribe(self):
+        events = queue.Queue(maxsize=self.subscriber_queue)
+        with self.lock:
+            self.subscribers.append(events)
+        print(f"Client subscribed ({len(self.subscribers)} connected)", file=sys.stderr)
+        return events
+
+    def unsubscribe(self, events):
+        with self.lock:
+            if events in self.subscribers:
+                self.subscribers.remove(events)
+
+    def put(self, event):
+        line = json.dumps({"event": event.to_dict()}, ensure_ascii=False).encode() + b"\n"
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait(line)
+            except queue.Full:
+                self.engine.metrics.inc("daemon_events_dropped", help="Events dropped for slow clients")
+
+    def state(self):
+        engine = self.engine
+        return {
+            "muted": engine.muted,
+            "clipboard": engine.use_clipboard,
+            "typing": engine.use_typing,
+            "model_ready": engine.model_ready.is_set(),
+            "model": engine.backend_options[1],
+            "language": engine.language,
+            "profile": engine.decoding_profile,
+            "profiles": engine.decoding_profiles,
+            "history": engine.history is not None,
+            "history_memory_limit": engine.HISTORY_MEMORY_LIMIT,
+            "history_page_size": engine.HISTORY_PAGE_SIZE,
+        }
+
+    def handle_request(self, op, request):
+        engine = self.engine
+        if op == "state":
+            return dict(self.state(), ok=True)
+        if op == "set":
+            # Changes are announced to every client, so all of them stay in sync
+            if "muted" in request and bool(request["muted"]) != engine.muted:
+                engine.muted = bool(request["muted"])
+                self.put(MuteStateChangedEvent(engine.muted))
+            if "clipboard" in request and bool(request["clipboard"]) != engine.use_clipboard:
+                engine.use_clipboard = bool(request["clipboard"])
+                self.put(ClipboardStateChangedEvent(engine.use_clipboard))
+            if "typing" in request and bool(request["typing"]) != engine.use_typing:
+                engine.use_typing = bool(request["typing"])
+                self.put(TypingStateChangedEvent(engine.use_typing))
+            if "profile" in request and request["profile"] != engine.decoding_profile:
+                if request["profile"] not in engine.decoding_profiles:
+                    return {"ok": False, "error": f"unknown decoding profile: {request['profile']}"}
+                engine.decoding_profile = request["profile"]
+                self.put(DecodingProfileChangedEvent(engine.decoding_profile))
+            return dict(self.state(), ok=True)
+        if op == "transcribe":
+            audio = decode_audio(request["audio"])
+            sample_rate = int(request.get("sample_rate", engine.SAMPLE_RATE))
+            if sample_rate != engine.SAMPLE_RATE:
+                audio = resample(audio, sample_rate, engine.SAMPLE_RATE)
+            result = engine.submit_request(audio, request.get("language"))
+            if "error" in result:
+                return {"ok": False, "error": result["error"]}
+            return dict(result, ok=True)
+        if op in ("history", "search"):
+            if engine.history is None:
+                return {"ok": False, "error": "history is disabled"}
+            limit = int(request.get("limit", engine.HISTORY_PAGE_SIZE))
+            if op == "history":
+                entries = engine.history.page(request.get("before_id"), limit)
+            else:
+                entries = engine.history.search(request.get("query", ""), limit)
+            return {"ok": True, "entries": entries}
+        if op == "shutdown":
+            engine.should_terminate = True
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown op: {op}"}
+
+
+class EngineClient:
+    # Client side of the daemon protocol: a request connection with one
+    # reply per request, and on subscribe() a second connection whose
+    # events are decoded on a reader thread.
+    def __init__(self, socket_path, timeout=5.0):
+        self.socket_path = socket_path
+        self.lock = threading.Lock()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self.sock.settimeout(None)
+        self.rfile = self.sock.makefile("rb")
+        self.event_sock = None
+
+    def request(self, op, **fields):
+        message = json.dumps(dict(fields, op=op), ensure_ascii=False).encode() + b"\n"
+        with self.lock:
+            self.sock.sendall(message)
+            line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("daemon closed the connection")
+        reply = json.loads(line)
+        if not reply.pop("ok", False):
+            raise RuntimeError(reply.get("error", "request failed"))
+        return reply
+
+    def subscribe(self, on_event):
+        self.event_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.event_sock.connect(self.socket_path)
+        self.event_sock.sendall(b'{"op": "subscribe"}\n')
+        events = self.event_sock.makefile("rb")
+        state = json.loads(events.readline())
+        threading.Thread(target=self.read_events, args=(events, on_event), name="events", daemon=True).start()
+        return state
+
+    def read_events(self, events, on_event):
+        for line in events:
+            on_event(EngineEvent.from_dict(json.loads(line)["event"]))
+        # The daemon went away; clients treat that like a terminate command
+        print("Connection to the daemon closed", file=sys.stderr)
+        on_event(EngineTerminatedEvent())
+
+    def close(self):
+        for sock in (self.sock, self.event_sock):
+            if sock:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                sock.close()
+
+
+class RemoteHistory:
+    # HistoryStore interface for daemon clients
+    def __init__(self, client):
+        self.client = client
+
+    def page(self, before_id=None, limit=50):
+        return [tuple(entry) for entry in self.client.request("history", before_id=before_id, limit=limit)["entries"]]
+
+    def search(self, query, limit=50):
+        return [tuple(entry) for entry in self.client.request("search", query=query, limit=limit)["entries"]]
+
+
+class RemoteEngine:
+    # Stands in for VoxtarixEngine in the applets and the CLI when the
+    # engine runs in the daemon. The toggles are forwarded to the daemon;
+    # their cached values follow the state events every client receives.
+    def __init__(self, client, event_queue=None):
+        self.client = client
+        self.event_queue = event_queue
+        state = client.request("state")
+        self.state = {key: state[key] for key in ("muted", "clipboard", "typing", "profile")}
+        self.decoding_profiles = state["profiles"]
+        self.language = state["language"]
+        self.HISTORY_MEMORY_LIMIT = state["history_memory_limit"]
+        self.HISTORY_PAGE_SIZE = state["history_page_size"]
+        self.history = RemoteHistory(client) if state["history"] else None
+        self.should_terminate = False
+
+    def set(self, key, value):
+        self.state[key] = value
+        self.client.request("set", **{key: value})
+
+    muted = property(lambda self: self.state["muted"], lambda self, value: self.set("muted", value))
+    use_clipboard = property(lambda self: self.state["clipboard"], lambda self, value: self.set("clipboard", value))
+    use_typing = property(lambda self: self.state["typing"], lambda self, value: self.set("typing", value))
+    decoding_profile = property(lambda self: self.state["profile"], lambda self, value: self.set("profile", value))
+
+    def install_profiler_signal(self, signum=None):
+        # Profiling happens in the daemon, which installs the handler itself
+        pass
+
+    def start(self):
+        state = self.client.subscribe(self.on_event)
+        self.state.update({key: state[key] for key in ("muted", "clipboard", "typing", "profile")})
+
+    def on_event(self, event):
+        if isinstance(event, MuteStateChangedEvent):
+            self.state["muted"] = event.enabled
+        elif isinstance(event, ClipboardStateChangedEvent):
+            self.state["clipboard"] = event.enabled
+        elif isinstance(event, TypingStateChangedEvent):
+            self.state["typing"] = event.enabled
+        elif isinstance(event, DecodingProfileChangedEvent):
+            self.state["profile"] = event.profile
+        if self.event_queue:
+            self.event_queue.put(event)
+
+    def transcribe(self, audio, sample_rate=16000, language=None):
+        return self.client.request("transcribe", audio=encode_audio(audio), sample_rate=sample_rate, language=language)
+
+    def stop(self):
+        self.client.close()
+
+
+def connect_engine(language=None, event_queue=None, partials=False):
+    # Returns a RemoteEngine for the running daemon, starting one first if
+    # needed, or None when daemons are disabled or it could not be reached
+    settings = read_daemon_settings()
+    if not settings["enabled"]:
+        return None
+    path = settings["socket"]
+    try:
+        return RemoteEngine(EngineClient(path), event_queue)
+    except (FileNotFoundError, ConnectionRefusedError):
+        pass
+
+    command = [sys.executable, os.path.abspath(__file__)]
+    if language:
+        command += ["--language", language]
+    if partials:
+        command.append("--partials")
+    command += ["daemon", "--on-demand"]
+    print(f"Starting daemon: {' '.join(command)}", file=sys.stderr)
+    try:
+        with open(path + ".log", "ab") as log:
+            process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True)
+    except OSError as e:
+        print(f"Could not start the daemon: {e}", file=sys.stderr)
+        return None
+    deadline = time.monotonic() + settings["connect_timeout"]
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        if process.poll() is not None and process.returncode != 0:
+            # Lost the race to another daemon (which we can connect to) or failed
+            try:
+                return RemoteEngine(EngineClient(path), event_queue)
+            except (FileNotFoundError, ConnectionRefusedError):
+                print(f"Daemon exited with status {process.returncode}, see {path}.log", file=sys.stderr)
+                return None
+        try:
+            return RemoteEngine(EngineClient(path), event_queue)
+        except (FileNotFoundError, ConnectionRefusedError):
+            continue
+    print(f"Daemon did not come up within {settings['connect_timeout']:.0f}s, see {path}.log", file=sys.stderr)
+    return None
+
+
+def create_engine(language=None, event_queue=None, partials=False):
+    # What the applets use: a client of the shared daemon if possible,
+    # otherwise an engine of their own
+    engine = connect_engine(language, event_queue, partials)
+    if engine is None:
+        print("Running the engine in this process", file=sys.stderr)
+        engine = VoxtarixEngine(language=language, event_queue=event_queue)
+        if partials:
+            engine.STREAMING = True
+    return engine
+
+
+def run_daemon(args):
+    settings = read_daemon_settings()
+    engine = VoxtarixEngine(language=args.language)
+    if args.partials:
+        engine.STREAMING = True
+    daemon = EngineDaemon(engine, settings["socket"], settings["subscriber_queue"], args.on_demand)
+    if not daemon.acquire():
+        print(f"A daemon is already running on {settings['socket']}", file=sys.stderr)
+        sys.exit(1)
+    signal.signal(signal.SIGTERM, lambda signum, frame: setattr(engine, "should_terminate", True))
+    engine.install_profiler_signal()
+    daemon.start()
+    engine.start()
+    try:
+        while not engine.should_terminate:
+            threading.Event().wait(0.1)
+            if daemon.unused():
+                print("No clients left", file=sys.stderr)
+                engine.should_terminate = True
+    except KeyboardInterrupt:
+        engine.should_terminate = True
+    finally:
+        print("Stopping daemon...", file=sys.stderr)
+        # Give the terminate event a moment to reach the clients
+        time.sleep(0.2)
+        daemon.stop()
+        engine.stop_streams()
+        engine.output_sink.stop()
+        if engine.history:
+            engine.history.close()
+
+
+def run_client(args, engine):
+    # The CLI as a daemon client: prints what the shared engine recognizes.
+    # Leaving stops only this client, "voxtarix.py stop" stops the daemon.
+    # The outputs -c and -t switch on are the daemon's, so they are
+    # switched back off on the way out.
+    switched_on = []
+    if args.clipboard and not engine.use_clipboard:
+        engine.use_clipboard = True
+        switched_on.append("clipboard")
+    if args.type and not engine.use_typing:
+        engine.use_typing = True
+        switched_on.append("typing")
+    engine.start()
+    print("Verbunden mit dem Daemon... (Strg+C zum Beenden)", file=sys.stderr)
+    try:
+        while not engine.should_terminate:
+            try:
+                event = engine.event_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if isinstance(event, TextRecognizedEvent):
+                if args.partials:
+                    print("\r\033[K", end="", file=sys.stderr, flush=True)
+                print(event.text or "[Empty]", flush=True)
+            elif isinstance(event, PartialTextEvent) and args.partials:
+                print(f"\r\033[K... {event.text}", end="", file=sys.stderr, flush=True)
+            elif isinstance(event, EngineTerminatedEvent):
+                engine.should_terminate = True
+    except KeyboardInterrupt:
+        print("Beende Verbindung...", file=sys.stderr)
+    finally:
+        for key in switched_on:
+            try:
+                engine.set(key, False)
+            except (OSError, RuntimeError):
+                # The daemon is gone already
+                break
+        engine.stop()
+
+
+def run_daemon_transcription(args, engine):
+    # transcribe --daemon: the files are decoded and segmented here, as in
+    # run_batch_transcription, and only the segments are sent, so the
+    # daemon's already loaded model does the work. The local engine only
+    # holds the segmentation settings; it never loads a model.
+    settings = VoxtarixEngine(language=args.language)
+    sample_rate = settings.SAMPLE_RATE
+    output = open(args.output, "w") if args.output else sys.stdout
+
+    def send(path, segment):
+        record = {
+            "file": path,
+            "start": round(segment.position / sample_rate, 3),
+            "end": round((segment.position + len(segment.audio)) / sample_rate, 3),
+        }
+        try:
+            result = engine.transcribe(segment.audio, sample_rate, args.language)
+            record.update(text=result["text"], language=result.get("language"))
+        except RuntimeError as e:
+            record.update(text="", error=str(e))
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+
+    try:
+        for path in find_audio_files(args.paths):
+            segmenter = Segmenter(settings, lambda segment: send(path, segment), overlap=0)
+            for block in iter_audio_file(path, sample_rate):
+                if args.gain != 1.0:
+                    block = np.clip(block * args.gain, -1.0, 1.0)
+                for i in range(0, len(block), settings.BLOCKSIZE):
+                    segmenter.feed(block[i:i + settings.BLOCKSIZE])
+            segmenter.flush()
+    finally:
+        if args.output:
+            output.close()
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Transkribiere Sprache mit Whisper.")
     parser.add_argument("-c", "--clipboard", action="store_true", help="Schreibe transkribierten Text in die Zwischenablage")
     parser.add_argument("-t", "--type", action="store_true", help="Simuliere Tastatureingaben für den transkribierten Text")
     parser.add_argument("-l", "--language", type=str, default=None, help="Sprache für die Transkription und die Befehle (z.B. 'en', 'de')")
+    parser.add_argument("-p", "--partials", action="store_true", help="Zeige Zwischenergebnisse während des Sprechens an")
+    parser.add_argument("-s", "--standalone", action="store_true", help="Starte eine eigene Engine statt den Daemon zu nutzen")
+    subparsers = parser.add_subparsers(dest="mode")
+    transcribe_parser = subparsers.add_parser("transcribe", help="Transkribiere WAV/FLAC-Dateien oder Verzeichnisse")
+    transcribe_parser.add_argument("paths", nargs="+", help="Audiodateien oder Verzeichnisse")
+    transcribe_parser.add_argument("-o", "--output", help="Schreibe die Ergebnisse als JSONL in diese Datei (Standard: stdout)")
+    transcribe_parser.add_argument("-j", "--workers", type=int, default=0, help="Anzahl paralleler Worker (Standard: nach Hardware)")
+    transcribe_parser.add_argument("-b", "--batch-size", type=int, default=0, help="Segmente pro Modellaufruf (Standard: nach Backend)")
+    transcribe_parser.add_argument("--gain", type=float, default=1.0, help="Verstärkung für die Dateien")
+    transcribe_parser.add_argument("-d", "--daemon", action="store_true", help="Nutze das bereits geladene Modell des Daemons")
+    daemon_parser = subparsers.add_parser("daemon", help="Starte den Daemon, der Mikrofon und Modell für alle Clients hält")
+    daemon_parser.add_argument("--on-demand", action="store_true",
+                               help="Beende den Daemon, sobald sich der letzte Client getrennt hat")
+    subparsers.add_parser("stop", help="Beende den laufenden Daemon")
     args = parser.parse_args()
 
+    if args.mode == "daemon":
+        run_daemon(args)
+        sys.exit(0)
+
+    if args.mode == "stop":
+        try:
+            EngineClient(read_daemon_settings()["socket"]).request("shutdown")
+        except (FileNotFoundError, ConnectionRefusedError):
+            print("No daemon running", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
+    if args.mode == "transcribe":
+        if args.daemon:
+            engine = connect_engine(args.language)
+            if engine is None:
+                sys.exit(1)
+            run_daemon_transcription(args, engine)
+            engine.stop()
+        else:
+            run_batch_transcription(args)
+        sys.exit(0)
+
+    if not args.standalone:
+        engine = connect_engine(args.language, EventChannel(), args.partials)
+        if engine is not None:
+            run_client(args, engine)
+            sys.exit(0)
+
     engine = VoxtarixEngine(language=args.language)
+    if args.partials:
+        engine.STREAMING = True
+        engine.print_partials = True
     engine.use_clipboard = args.clipboard
     engine.use_typing = args.type
+    engine.install_profiler_signal()
     engine.start()
     try:
         while not engine.should_terminate:
@@ -259,7 +4292,7 @@ if __name__ == "__main__":
         print("Beende Aufnahme...", file=sys.stderr)
         engine.should_terminate = True
     finally:
-        if engine.stream:
-            engine.stream.stop()
-            engine.stream.close()
-        engine.keyboard_controller = None
\ No newline at end of file
+        engine.stop_streams()
+        engine.output_sink.stop()
+        if engine.history:
+            engine.history.close()
@@ -6,7 +6,6 @@ gi.require_version("AppIndicator3", "0.1")
 from gi.repository import Gtk, AppIndicator3, GLib
 import locale
 import os
-import queue
 import sys
 import pyperclip
 import importlib.util
@@ -16,14 +15,28 @@ from datetime import datetime
 voxtarix_path = os.path.join(os.path.dirname(__file__), "voxtarix.py")
 spec = importlib.util.spec_from_file_location("voxtarix", voxtarix_path)
 voxtarix_module = importlib.util.module_from_spec(spec)
+# Registered under its name, so the inference worker process (spawned with
+# worker_process = true) can import the functions it is started with
+sys.modules["voxtarix"] = voxtarix_module
 spec.loader.exec_module(voxtarix_module)
 VoxtarixEngine = voxtarix_module.VoxtarixEngine
 ClipboardStateChangedEvent = voxtarix_module.ClipboardStateChangedEvent
 TypingStateChangedEvent = voxtarix_module.TypingStateChangedEvent
 EngineTerminatedEvent = voxtarix_module.EngineTerminatedEvent
+MuteStateChangedEvent = voxtarix_module.MuteStateChangedEvent
 TextRecognizedEvent = voxtarix_module.TextRecognizedEvent
+EventChannel = voxtarix_module.EventChannel
+PartialTextEvent = voxtarix_module.PartialTextEvent
+ModelLoadingEvent = voxtarix_module.ModelLoadingEvent
+ModelReadyEvent = voxtarix_module.ModelReadyEvent
+ModelLoadFailedEvent = voxtarix_module.ModelLoadFailedEvent
+DecodingProfileChangedEvent = voxtarix_module.DecodingProfileChangedEvent
+RemoteEngine = voxtarix_module.RemoteEngine
 
 class VoxtarixApplet:
+    # Number of recent transcriptions shown in the menu
+    HISTORY_ITEMS = 5
+
     def __init__(self):
         self.indicator = AppIndicator3.Indicator.new(
             "voxtarix-applet",
@@ -33,9 +46,8 @@ class VoxtarixApplet:
         self.indicator.set_status(AppIndicator3.IndicatorStatus.ACTIVE)
         self.indicator.set_menu(self.build_menu())
 
-        self.event_queue = queue.Queue()
+        self.event_queue = EventChannel()
         self.engine = None
-        self.history = []
         self.muted = False
         self.icon_unmuted = os.path.abspath(os.path.join(os.path.dirname(__file__), "icon/voxtarix-white.png"))
         self.icon_muted = os.path.abspath(os.path.join(os.path.dirname(__file__), "icon/voxtarix-white-muted.png"))
@@ -51,11 +63,22 @@ class VoxtarixApplet:
             language = "en"
 
         print(f"Detected GNOME language: {language}", file=sys.stderr)
+        # A language set in settings.conf wins over the desktop's
+        language = voxtarix_module.configured_language() or language
 
         try:
-            self.engine = VoxtarixEngine(language=language, event_queue=self.event_queue)
+            self.engine = voxtarix_module.create_engine(language=language, event_queue=self.event_queue)
+            self.engine.install_profiler_signal()
             self.engine.start()
-            GLib.timeout_add(100, self.process_events)
+            # A shared daemon may already have toggles set by another client
+            self.mute_toggle.set_active(self.engine.muted)
+            self.clipboard_toggle.set_active(self.engine.use_clipboard)
+            self.typing_toggle.set_active(self.engine.use_typing)
+            self.build_profile_menu()
+            if self.engine.history:
+                for _, _, text in reversed(self.engine.history.page(limit=self.HISTORY_ITEMS)):
+                    self.add_to_history(text)
+            GLib.io_add_watch(self.event_queue.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN, self.process_events)
         except Exception as e:
             print(f"Failed to start VoxtarixEngine: {e}", file=sys.stderr)
         print("Applet initialized", file=sys.stderr)
@@ -78,6 +101,11 @@ class VoxtarixApplet:
         self.typing_toggle.connect("toggled", self.on_typing_toggled)
         self.menu.append(self.typing_toggle)
 
+        # Submenu filled once the engine reports its decoding profiles
+        self.profile_item = Gtk.MenuItem(label="Decoding")
+        self.menu.append(self.profile_item)
+        self.profile_items = {}
+
         self.menu.append(Gtk.SeparatorMenuItem())
 
         self.history_items = []
@@ -108,28 +136,48 @@ class VoxtarixApplet:
             self.engine.use_typing = widget.get_active()
             print(f"Typing {'enabled' if self.engine.use_typing else 'disabled'}", file=sys.stderr)
 
+    def build_profile_menu(self):
+        submenu = Gtk.Menu()
+        group = None
+        for name in self.engine.decoding_profiles:
+            item = Gtk.RadioMenuItem.new_with_label_from_widget(group, name.capitalize())
+            group = item
+            submenu.append(item)
+            self.profile_items[name] = item
+        # Connected after the current profile is selected so that doesn't
+        # switch the engine
+        for name, item in self.profile_items.items():
+            item.set_active(name == self.engine.decoding_profile)
+            item.connect("toggled", self.on_profile_toggled, name)
+        submenu.show_all()
+        self.profile_item.set_submenu(submenu)
+
+    def on_profile_toggled(self, widget, name):
+        if widget.get_active() and self.engine and name != self.engine.decoding_profile:
+            self.engine.decoding_profile = name
+            print(f"Decoding profile: {name}", file=sys.stderr)
+
     def add_to_history(self, text):
         if not isinstance(text, str) or not text.strip():
             return
-        self.history.append(text.strip())
-        self.update_history_menu()
+        text = text.strip()
+        # Insert just the new item below the others and drop the oldest one
+        display_text = text[:20] + "..." if len(text) > 20 else text
+        item = Gtk.MenuItem(label=display_text)
+        item.connect("activate", lambda w, t=text: self.copy_to_clipboard(t))
+        self.menu.insert(item, len(self.menu.get_children()) - 2)
+        item.show()
+        self.history_items.append(item)
+        if len(self.history_items) > self.HISTORY_ITEMS:
+            self.menu.remove(self.history_items.pop(0))
 
     def copy_to_clipboard(self, text):
         pyperclip.copy(text)
 
-    def update_history_menu(self):
-        for item in self.history_items:
-            self.menu.remove(item)
-        self.history_items.clear()
-
-        for text in self.history[-5:]:
-            display_text = text[:20] + "..." if len(text) > 20 else text
-            item = Gtk.MenuItem(label=display_text)
-            item.connect("activate", lambda w, t=text: self.copy_to_clipboard(t))
-            self.history_items.append(item)
-            self.menu.insert(item, len(self.menu.get_children()) - 2)
-
-        self.menu.show_all()
+    def show_partial(self, text):
+        # Shown next to the tray icon while the user is still speaking
+        display_text = "..." + text[-30:] if len(text) > 30 else text
+        self.indicator.set_label(display_text, "")
 
     def update_icon(self):
         try:
@@ -144,26 +192,42 @@ class VoxtarixApplet:
     def quit(self, source):
         if self.engine and not self.engine.should_terminate:
             self.engine.should_terminate = True
+            if isinstance(self.engine, RemoteEngine):
+                # Disconnecting lets a daemon we started exit with us
+                self.engine.stop()
         Gtk.main_quit()
 
-    def process_events(self):
-        try:
-            while True:
-                event = self.event_queue.get_nowait()
-                if isinstance(event, EngineTerminatedEvent):
-                    print("Engine terminated via voice command, stopping applet...", file=sys.stderr)
-                    self.quit(None)
-                    return False  # Stop the timeout and don't process further events
-                elif isinstance(event, ClipboardStateChangedEvent):
-                    self.clipboard_toggle.set_active(event.enabled)
-                    print(f"Clipboard state updated: {'enabled' if event.enabled else 'disabled'}", file=sys.stderr)
-                elif isinstance(event, TypingStateChangedEvent):
-                    self.typing_toggle.set_active(event.enabled)
-                    print(f"Typing state updated: {'enabled' if event.enabled else 'disabled'}", file=sys.stderr)
-                elif isinstance(event, TextRecognizedEvent):
-                    self.add_to_history(event.text)
-        except queue.Empty:
-            pass
+    def process_events(self, fd=None, condition=None):
+        # Runs only when the engine's event descriptor becomes readable and
+        # handles everything that arrived since in one batch
+        for event in self.event_queue.drain():
+            if isinstance(event, EngineTerminatedEvent):
+                print("Engine terminated via voice command, stopping applet...", file=sys.stderr)
+                self.quit(None)
+                return False  # Remove the watch and don't process further events
+            elif isinstance(event, MuteStateChangedEvent):
+                self.mute_toggle.set_active(event.enabled)
+            elif isinstance(event, ClipboardStateChangedEvent):
+                self.clipboard_toggle.set_active(event.enabled)
+                print(f"Clipboard state updated: {'enabled' if event.enabled else 'disabled'}", file=sys.stderr)
+            elif isinstance(event, TypingStateChangedEvent):
+                self.typing_toggle.set_active(event.enabled)
+                print(f"Typing state updated: {'enabled' if event.enabled else 'disabled'}", file=sys.stderr)
+            elif isinstance(event, DecodingProfileChangedEvent):
+                if event.profile in self.profile_items:
+                    self.profile_items[event.profile].set_active(True)
+                print(f"Decoding profile updated: {event.profile}", file=sys.stderr)
+            elif isinstance(event, ModelLoadingEvent):
+                self.indicator.set_label(f"Loading {event.model_name}...", "")
+            elif isinstance(event, ModelReadyEvent):
+                self.indicator.set_label("", "")
+            elif isinstance(event, ModelLoadFailedEvent):
+                self.indicator.set_label("Model error", "")
+            elif isinstance(event, PartialTextEvent):
+                self.show_partial(event.text)
+            elif isinstance(event, TextRecognizedEvent):
+                self.show_partial("")
+                self.add_to_history(event.text)
         return True
 
 if __name__ == "__main__":
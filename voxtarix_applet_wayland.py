@@ -3,12 +3,11 @@
 import gi
 gi.require_version("Gtk", "3.0")
 gi.require_version("Gdk", "3.0")
-from gi.repository import Gtk, GLib, Gio, Gdk
+from gi.repository import Gtk, GLib, Gdk
+import collections
 import locale
 import os
-import queue
 import sys
-import pyperclip
 import importlib.util
 from datetime import datetime
 
@@ -16,12 +15,23 @@ from datetime import datetime
 voxtarix_path = os.path.join(os.path.dirname(__file__), "voxtarix.py")
 spec = importlib.util.spec_from_file_location("voxtarix", voxtarix_path)
 voxtarix_module = importlib.util.module_from_spec(spec)
+# Registered under its name, so the inference worker process (spawned with
+# worker_process = true) can import the functions it is started with
+sys.modules["voxtarix"] = voxtarix_module
 spec.loader.exec_module(voxtarix_module)
 VoxtarixEngine = voxtarix_module.VoxtarixEngine
 ClipboardStateChangedEvent = voxtarix_module.ClipboardStateChangedEvent
 TypingStateChangedEvent = voxtarix_module.TypingStateChangedEvent
 EngineTerminatedEvent = voxtarix_module.EngineTerminatedEvent
+MuteStateChangedEvent = voxtarix_module.MuteStateChangedEvent
 TextRecognizedEvent = voxtarix_module.TextRecognizedEvent
+EventChannel = voxtarix_module.EventChannel
+PartialTextEvent = voxtarix_module.PartialTextEvent
+ModelLoadingEvent = voxtarix_module.ModelLoadingEvent
+ModelReadyEvent = voxtarix_module.ModelReadyEvent
+ModelLoadFailedEvent = voxtarix_module.ModelLoadFailedEvent
+DecodingProfileChangedEvent = voxtarix_module.DecodingProfileChangedEvent
+RemoteEngine = voxtarix_module.RemoteEngine
 
 class VoxtarixWaylandApplet:
     def __init__(self):
@@ -42,6 +52,13 @@ class VoxtarixWaylandApplet:
         self.status_label = Gtk.Label()
         self.status_label.set_markup("<b>Voxtarix Status</b>")
         vbox.pack_start(self.status_label, False, False, 0)
+
+        # Live partial transcript while speaking
+        self.partial_label = Gtk.Label()
+        self.partial_label.set_line_wrap(True)
+        self.partial_label.set_max_width_chars(50)
+        self.partial_label.set_xalign(0.0)
+        vbox.pack_start(self.partial_label, False, False, 0)
         
         # Mute toggle
         self.mute_toggle = Gtk.CheckButton(label="Mute")
@@ -52,6 +69,14 @@ class VoxtarixWaylandApplet:
         self.clipboard_toggle = Gtk.CheckButton(label="Clipboard")
         self.clipboard_toggle.connect("toggled", self.on_clipboard_toggled)
         vbox.pack_start(self.clipboard_toggle, False, False, 0)
+
+        # Decoding profile, filled once the engine reports its profiles
+        profile_box = Gtk.Box(spacing=6)
+        profile_box.pack_start(Gtk.Label(label="Decoding"), False, False, 0)
+        self.profile_combo = Gtk.ComboBoxText()
+        self.profile_combo.connect("changed", self.on_profile_changed)
+        profile_box.pack_start(self.profile_combo, True, True, 0)
+        vbox.pack_start(profile_box, False, False, 0)
         
 
         
@@ -64,6 +89,7 @@ class VoxtarixWaylandApplet:
         self.scrolled_window = Gtk.ScrolledWindow()
         self.scrolled_window.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
         self.scrolled_window.set_size_request(-1, 200)
+        self.scrolled_window.connect("edge-reached", self.on_history_edge_reached)
         
         # Create list box for clickable history items
         self.history_listbox = Gtk.ListBox()
@@ -83,9 +109,12 @@ class VoxtarixWaylandApplet:
         self.window.show_all()
         
         # Initialize engine
-        self.event_queue = queue.Queue()
+        self.event_queue = EventChannel()
         self.engine = None
-        self.history = []
+        # (entry_id, row) for the rows currently shown, newest first
+        self.history_rows = collections.deque()
+        self.oldest_history_id = None
+        self.history_exhausted = False
         self.muted = False
         
         try:
@@ -99,11 +128,21 @@ class VoxtarixWaylandApplet:
             language = "en"
 
         print(f"Detected GNOME language: {language}", file=sys.stderr)
+        # A language set in settings.conf wins over the desktop's
+        language = voxtarix_module.configured_language() or language
 
         try:
-            self.engine = VoxtarixEngine(language=language, event_queue=self.event_queue)
+            self.engine = voxtarix_module.create_engine(language=language, event_queue=self.event_queue)
+            self.engine.install_profiler_signal()
             self.engine.start()
-            GLib.timeout_add(100, self.process_events)
+            # A shared daemon may already have toggles set by another client
+            self.mute_toggle.set_active(self.engine.muted)
+            self.clipboard_toggle.set_active(self.engine.use_clipboard)
+            for name in self.engine.decoding_profiles:
+                self.profile_combo.append(name, name.capitalize())
+            self.profile_combo.set_active_id(self.engine.decoding_profile)
+            self.load_older_history()
+            GLib.io_add_watch(self.event_queue.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN, self.process_events)
             self.update_status("Running")
         except Exception as e:
             print(f"Failed to start VoxtarixEngine: {e}", file=sys.stderr)
@@ -116,6 +155,11 @@ class VoxtarixWaylandApplet:
         else:
             self.status_label.set_markup(f"<b>Voxtarix Status: {status}</b>")
 
+    def show_partial(self, committed, tentative):
+        committed = GLib.markup_escape_text(committed)
+        tentative = GLib.markup_escape_text(tentative)
+        self.partial_label.set_markup(f"{committed} <i><span alpha=\"60%\">{tentative}</span></i>")
+
     def on_window_close(self, widget, event):
         # Use the same quit function as voice command
         self.quit(None)
@@ -135,31 +179,55 @@ class VoxtarixWaylandApplet:
 
 
 
-    def add_to_history(self, text):
+    def on_profile_changed(self, widget):
+        name = widget.get_active_id()
+        if name and self.engine and name != self.engine.decoding_profile:
+            self.engine.decoding_profile = name
+            print(f"Decoding profile: {name}", file=sys.stderr)
+
+    def add_to_history(self, text, entry_id=None):
         if not isinstance(text, str) or not text.strip():
             return
-        
-        text = text.strip()
-        
-        # Add to beginning of list (newest first)
-        self.history.insert(0, text)
-        
-        # Clear existing items
-        for child in self.history_listbox.get_children():
-            self.history_listbox.remove(child)
-        
-        # Add new items (newest first)
-        for item_text in self.history:
-            self.create_history_item(item_text)
-        
-        # Show all items and scroll to top
-        self.history_listbox.show_all()
-        
+
+        # Only the new row is created; the rows already shown are left alone
+        row = self.create_history_item(text.strip(), 0)
+        self.history_rows.appendleft((entry_id, row))
+
+        # Drop rows beyond the in-memory cap; they are paged back in from
+        # the history store when scrolled to
+        limit = self.engine.HISTORY_MEMORY_LIMIT if self.engine else 200
+        if len(self.history_rows) > limit:
+            while len(self.history_rows) > limit:
+                _, old_row = self.history_rows.pop()
+                self.history_listbox.remove(old_row)
+            # Rows without an id (history disabled or the insert failed)
+            # can't be paged from
+            oldest = next((entry_id for entry_id, _ in reversed(self.history_rows) if entry_id is not None), None)
+            if oldest is not None:
+                self.oldest_history_id = oldest
+                self.history_exhausted = False
+
         # Scroll to top
         adjustment = self.scrolled_window.get_vadjustment()
         adjustment.set_value(0)
 
-    def create_history_item(self, text):
+    def load_older_history(self):
+        store = self.engine.history if self.engine else None
+        if store is None or self.history_exhausted:
+            return
+        page_size = self.engine.HISTORY_PAGE_SIZE
+        entries = store.page(before_id=self.oldest_history_id, limit=page_size)
+        self.history_exhausted = len(entries) < page_size
+        for entry_id, _, text in entries:
+            self.history_rows.append((entry_id, self.create_history_item(text)))
+        if entries:
+            self.oldest_history_id = entries[-1][0]
+
+    def on_history_edge_reached(self, window, position):
+        if position == Gtk.PositionType.BOTTOM:
+            self.load_older_history()
+
+    def create_history_item(self, text, position=-1):
         # Create a clickable button instead of ListBoxRow for better click handling
         button = Gtk.Button()
         button.set_relief(Gtk.ReliefStyle.NONE)
@@ -191,7 +259,9 @@ class VoxtarixWaylandApplet:
         row.add(button)
         
         # Add row to listbox
-        self.history_listbox.add(row)
+        self.history_listbox.insert(row, position)
+        row.show_all()
+        return row
 
     def on_history_item_clicked(self, text):
         print(f"Button clicked with text: {text}", file=sys.stderr)
@@ -209,24 +279,38 @@ class VoxtarixWaylandApplet:
     def quit(self, source):
         if self.engine and not self.engine.should_terminate:
             self.engine.should_terminate = True
+            if isinstance(self.engine, RemoteEngine):
+                # Disconnecting lets a daemon we started exit with us
+                self.engine.stop()
         Gtk.main_quit()
 
-    def process_events(self):
-        try:
-            while True:
-                event = self.event_queue.get_nowait()
-                if isinstance(event, EngineTerminatedEvent):
-                    print("Engine terminated via voice command, stopping applet...", file=sys.stderr)
-                    self.quit(None)
-                    return False
-                elif isinstance(event, ClipboardStateChangedEvent):
-                    self.clipboard_toggle.set_active(event.enabled)
-                    print(f"Clipboard state updated: {'enabled' if event.enabled else 'disabled'}", file=sys.stderr)
-
-                elif isinstance(event, TextRecognizedEvent):
-                    self.add_to_history(event.text)
-        except queue.Empty:
-            pass
+    def process_events(self, fd=None, condition=None):
+        # Runs only when the engine's event descriptor becomes readable and
+        # handles everything that arrived since in one batch
+        for event in self.event_queue.drain():
+            if isinstance(event, EngineTerminatedEvent):
+                print("Engine terminated via voice command, stopping applet...", file=sys.stderr)
+                self.quit(None)
+                return False
+            elif isinstance(event, MuteStateChangedEvent):
+                self.mute_toggle.set_active(event.enabled)
+            elif isinstance(event, ClipboardStateChangedEvent):
+                self.clipboard_toggle.set_active(event.enabled)
+                print(f"Clipboard state updated: {'enabled' if event.enabled else 'disabled'}", file=sys.stderr)
+            elif isinstance(event, DecodingProfileChangedEvent):
+                self.profile_combo.set_active_id(event.profile)
+                print(f"Decoding profile updated: {event.profile}", file=sys.stderr)
+            elif isinstance(event, ModelLoadingEvent):
+                self.update_status(f"Loading {event.model_name}...")
+            elif isinstance(event, ModelReadyEvent):
+                self.update_status("Running")
+            elif isinstance(event, ModelLoadFailedEvent):
+                self.update_status("Error")
+            elif isinstance(event, PartialTextEvent):
+                self.show_partial(event.committed, event.tentative)
+            elif isinstance(event, TextRecognizedEvent):
+                self.show_partial("", "")
+                self.add_to_history(event.text, event.entry[0] if event.entry else None)
         return True
 
     def show_window(self):